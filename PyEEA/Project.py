@@ -1,4 +1,4 @@
-from .cashflow import Cashflow, NullCashflow
+from .cashflow import Cashflow, NullCashflow, Present
 from .cashflow import SinglePaymentFactory as sp
 from .cashflow import UniformSeriesFactory as us
 from .cashflow import DynamicSeriesFactory as ds
@@ -6,12 +6,20 @@ from .cashflow import DynamicSeriesFactory as ds
 from .taxation import TaxationHelper as th, DepreciationHelper as dh
 
 from .valuation import npw, nfw, eacf, epcf, bcr, irr, mirr
+from .valuation import payback, discounted_payback
+from .valuation.Valuators import get_net_cashflows
 
 from .output import generate_cashflow_diagram
 
-from .utilities import Scales, parse_d, parse_ns, get_final_period
+from .instrumentation import instrument
+
+from .utilities import Scales, parse_d, parse_ns, get_final_period, as_periods, get_amounts
 
 from math import isinf
+from numbers import Number
+from types import FunctionType, MethodType, BuiltinFunctionType
+
+import numpy as np
 
 class Project:
     """ Contains many cashflows and shortcuts for analysis
@@ -24,9 +32,16 @@ class Project:
     spreadsheets (traditionally used for economics) with vastly enhanced
     capabilities and ease-of-use.
 
+    Projects may optionally be valued incrementally. In this mode, the
+    project keeps a running Net Present Worth for each interest rate it has
+    been valued at, which is updated by the change in worth of any cashflow
+    added, removed or rescaled through the project. Valuations then cost a
+    single conversion per edit, rather than a conversion of every cashflow.
+
     Attributes:
         title: Human-readable summary of what the project represents
         interest: The interest rate to be applied to all cashflow conversions
+        incremental: If true, valuations are maintained incrementally
     
     See Also:
         Cashflow
@@ -34,7 +49,9 @@ class Project:
         Tax
     """
 
-    def __init__(self, title=None, interest=0):
+    MAX_RUNNING_RATES = 8  # Interest rates tracked in incremental mode
+
+    def __init__(self, title=None, interest=0, incremental=False):
         """ Creates a project containing no cashflows or related constructs """
         self._title = str(title) if title else None
         self._interest = float(interest)
@@ -43,6 +60,44 @@ class Project:
         self._depreciations = list()
         self._taxes = list()
 
+        self._incremental = bool(incremental)
+        self._running = dict()  # Maps interest rates to _RunningWorth
+
+        self._version = 0
+        self._series = dict()  # Period series cached for the current version
+        self._in_context = False
+
+    def __getstate__(self):
+        # Running worths are keyed by the identity of each cashflow, which a
+        # copy (or an unpickled project) does not share, so they are dropped
+        # and rebuilt on the next running valuation
+        state = self.__dict__.copy()
+        state["_running"] = dict()
+        return state
+
+    @classmethod
+    def from_components(cls, title=None, interest=0, cashflows=(), depreciations=(), taxes=()):
+        """ Creates a project from all of its constituents at once
+
+        Unlike add_depreciation(), the cashflows of depreciations are not
+        added to the project again, so cashflows should already include them.
+        Used to rebuild many projects in bulk, e.g. from a Portfolio.
+
+        Raises:
+            TypeError: A constituent is of the wrong type
+        """
+        project = cls(title, interest)
+        project._cashflows = list(cashflows)
+        project._depreciations = list(depreciations)
+        project._taxes = list(taxes)
+        if not all([isinstance(cashflow, Cashflow) for cashflow in project._cashflows]):
+            raise TypeError("Cashflows must be children of Cashflow")
+        if not all([isinstance(dp, dh.Depreciation) for dp in project._depreciations]):
+            raise TypeError("Depreciations must be children of Depreciation")
+        if not all([isinstance(tax, th.Tax) for tax in project._taxes]):
+            raise TypeError("Taxes must be Tax instances")
+        return project
+
     @property
     def title(self):
         return self._title or f"Project with {len(self.get_cashflows())} cashflows"
@@ -57,6 +112,47 @@ class Project:
     def set_interest(self, interest):
         self._interest = interest
 
+    @property
+    def version(self):
+        """ A counter incremented whenever the project is edited """
+        return self._version
+
+    def _touch(self):
+        """ Marks the project as edited, invalidating cached period series """
+        self._version += 1
+        self._series.clear()
+
+    def fingerprint(self):
+        """ Returns a digest identifying the contents of the project
+
+        Projects with the same interest rate, cashflows, depreciations and
+        taxes have the same fingerprint, whether or not they are the same
+        instance. Cashflows are compared by type and attributes, including
+        their titles and tags; functions, such as those of Dynamic cashflows,
+        are compared by identity. The fingerprint is recomputed on each call,
+        so it also reflects cashflows edited in place.
+
+        Returns:
+            A hexadecimal string
+        """
+        from hashlib import sha1
+
+        state = (self._interest, self._cashflows, self._depreciations, self._taxes)
+        return sha1(repr(_describe(state)).encode()).hexdigest()
+
+    @property
+    def incremental(self):
+        return self._incremental
+
+    def set_incremental(self, incremental=True):
+        """ Enables or disables incremental valuation
+
+        Running valuations are discarded either way, and are rebuilt from
+        scratch the first time the project is valued at each interest rate.
+        """
+        self._incremental = bool(incremental)
+        self._running.clear()
+
     def get_final_period(self, finite=False):
         """ Returns the highest period in which Cashflows are still active
 
@@ -79,15 +175,62 @@ class Project:
             raise TypeError("Argument must be a child of Cashflow")
 
         self._cashflows.append(cashflow)
+        self._touch()
+        for i, running in self._running.items():
+            running.add(cashflow, *self._contribution(cashflow, i))
 
         return self  # Daisy Chaining!
 
+    def remove_cashflow(self, cashflow):
+        """ Removes a single cashflow from the project cashflow list
+
+        Args:
+            cashflow: A Cashflow instance contained by the project
+
+        Returns:
+            The instance of Project, allowing for daisy-chaining
+
+        Raises:
+            ValueError: The cashflow is not contained by the project
+        """
+        self._cashflows.remove(cashflow)
+        self._touch()
+        for running in self._running.values():
+            running.remove(cashflow)
+
+        return self
+
+    def scale_cashflow(self, cashflow, scalar):
+        """ Multiplies the amount of a project cashflow by a scalar
+
+        Equivalent to scaling cashflow.amount directly, except that any
+        running valuations are updated by the resulting change in worth.
+        Cashflows of an incremental project should always be rescaled
+        through this method.
+
+        Args:
+            cashflow: A Cashflow instance contained by the project
+            scalar: The factor by which the amount is multiplied
+
+        Returns:
+            The instance of Project, allowing for daisy-chaining
+        """
+        cashflow.amount *= scalar
+        self._touch()
+        for i, running in self._running.items():
+            running.update(cashflow, *self._contribution(cashflow, i))
+
+        return self
+
     def add_depreciation(self, depreciation):
         if not isinstance(depreciation, dh.Depreciation):
             raise TypeError("Argument must be a child of Depreciation")
 
         self._depreciations.append(depreciation)
+        self._touch()
         self.add_cashflows(depreciation.cashflows)
+        for i, running in self._running.items():
+            running.add(depreciation, *self._contribution(depreciation, i))
 
         return self
 
@@ -169,6 +312,8 @@ class Project:
             raise TypeError("Argument must be a Tax instance!")
 
         self._taxes.append(tax)
+        self._touch()
+        self._running.clear()  # After-tax contributions have all changed
 
         return self
 
@@ -189,6 +334,7 @@ class Project:
         """
         return self._taxes
 
+    @instrument("taxation")
     def get_taxflows(self, tags=None):
         """ Gets all or specific cashflows generated by taxation models
 
@@ -259,32 +405,122 @@ class Project:
         """
         return self.get_cashflows(tags=tags) + self.get_taxflows(tags=tags)
 
-    def to_dataframe(self, to_period=None, net=False):
-        """ Returns the project as a Pandas DataFrame instance
-        
+    @instrument("project")
+    def net_cashflows(self, n=None, after_tax=True, tags=None):
+        """ Returns the net cashflow amount in each period
+
+        Evaluates every cashflow over all periods in a single vectorized pass
+        and sums them by period. The result is cached until the project is
+        next edited, so that valuations such as IRR, MIRR and payback, and
+        exports, can share it.
+
+        Args:
+            n: Optional; The final period. Defaults to the final finite period
+            after_tax: Optional; If true, taxflows are included
+            tags: Optional; A string or sequence of strings to filter cashflows
+
+        Returns:
+            A float NumPy array of length n + 1, indexed by period
+        """
+        n = int(n if n is not None else self.get_final_period(finite=True))
+        key = ("net", n, after_tax, tags)
+        return self._cached_series(key, lambda: get_net_cashflows(
+            self.get_taxed_cashflows(tags=tags) if after_tax else self.get_cashflows(tags=tags),
+            n))
+
+    def discounted_net_cashflows(self, i=None, n=None, after_tax=True, tags=None):
+        """ Returns the present worth of the net cashflow in each period
+
+        See net_cashflows(). The interest defaults to that of the project.
+        """
+        i = i if i is not None else self.interest
+        ncfs = self.net_cashflows(n, after_tax, tags)
+        key = ("discounted", i, len(ncfs), after_tax, tags)
+        return self._cached_series(key, lambda: ncfs * (1 + i) ** -np.arange(len(ncfs), dtype=float))
+
+    def cumulative_npw(self, i=None, n=None, after_tax=True, tags=None):
+        """ Returns the cumulative net present worth at the end of each period
+
+        See net_cashflows(). The interest defaults to that of the project.
+        """
+        i = i if i is not None else self.interest
+        dncfs = self.discounted_net_cashflows(i, n, after_tax, tags)
+        key = ("cumulative", i, len(dncfs), after_tax, tags)
+        return self._cached_series(key, lambda: np.cumsum(dncfs))
+
+    def _cached_series(self, key, compute):
+        """ Gets a period series from the cache, computing it if needed
+
+        Cashflows may be modified directly while the project is used as a
+        context manager, so nothing is cached there.
+        """
+        if self._in_context:
+            return compute()
+        key = tuple(tuple(part) if isinstance(part, list) else part for part in key)
+        if key not in self._series:
+            series = compute()
+            series.flags.writeable = False  # Shared between callers
+            self._series[key] = series
+        return self._series[key]
+
+    def to_frame(self, periods=None, net=False, discounted=False, i=None,
+                 after_tax=True, tags=None):
+        """ Returns the cashflows of the project as a numeric DataFrame
+
+        Evaluates every cashflow over all periods in a single vectorized pass,
+        producing a float64 DataFrame whose rows correspond to periods and
+        whose columns correspond to cashflows (including taxflows, if after
+        tax). Amounts are not formatted; to display them as currency, use e.g.
+
+            frame.to_string(float_format=Cashflow.CURRENCY_FMT_STR.format)
+
         Args:
-            to_period - Change to d
+            periods: Optional; The final period, or a sequence of periods.
+                Defaults to every period up to the final finite period
+            net: Optional; If true, a single column of net cashflows is returned
+            discounted: Optional; If true, amounts are discounted to present worth
+            i: Optional; The interest rate for discounting. Defaults to that
+                of the project
+            after_tax: Optional; If true, taxflows are included
+            tags: Optional; A string or sequence of strings to filter cashflows
 
+        Returns:
+            A Pandas DataFrame of floats indexed by period
         """
         import pandas as pd
-        to_period = int(to_period or self.get_final_period(finite=True) or 5)
-        periods = list(range(to_period + 1))
-        titles = [cf.get_title() for cf in self.get_taxed_cashflows()]
-        cashflows = [[cf[n] for cf in self.get_taxed_cashflows()] for n in periods]
-        
+
+        if periods is None:
+            periods = self.get_final_period(finite=True)
+        ns = np.arange(int(periods) + 1) if np.ndim(periods) == 0 else as_periods(periods)
+
         if net:
-            titles=["Net Cashflows"]
-            cashflows = [[sum(cashflows[n])] for n in periods]
-       
-        str_cashflows = [
-            [str(cashflow).split(" ")[-1] for cashflow in cashflows[n]]
-            for n in periods
-        ]
-        
+            ncfs = self.net_cashflows(int(ns.max(initial=0)), after_tax, tags)
+            amounts = ncfs[ns][None, :]
+            titles = ["Net Cashflow"]
+        else:
+            cashflows = (
+                self.get_taxed_cashflows(tags=tags) if after_tax
+                else self.get_cashflows(tags=tags))
+            amounts = get_amounts(cashflows, ns)
+            titles = [cashflow.get_title() for cashflow in cashflows]
+
+        if discounted:
+            i = i if i is not None else self.interest
+            amounts = amounts * (1 + i) ** -ns.astype(float)
+
+        # Rows of amounts correspond to cashflows, which pandas stores as is
+        return pd.DataFrame(
+            amounts.T, index=pd.Index(ns, name="Period"), columns=titles, copy=False)
 
-        return pd.DataFrame(str_cashflows, index=periods, columns=titles)
+    def to_dataframe(self, to_period=None, net=False):
+        """ Returns the project as a Pandas DataFrame instance
 
-    def to_cashflowdiagram(self, n=None, net=False, scale=None, color=None, size=None):
+        Proxy to to_frame(), returning the cashflows up to to_period.
+        """
+        return self.to_frame(to_period, net=net)
+
+    def to_cashflowdiagram(
+            self, n=None, net=False, scale=None, color=None, size=None, ax=None):
         """ Plots the project as a bar plot of cashflow by period
 
         Args:
@@ -293,6 +529,7 @@ class Project:
                 of splitting cashflows into colored bars
             scale: Optional: Applies a scalar multiplier to all cashflows
             size: Optional; The size of the output plot, in inches
+            ax: Optional; An Axes to draw on, instead of a new Figure
 
         Returns:
             The Figure and Axis objects generated
@@ -303,7 +540,8 @@ class Project:
                 net=net,
                 scale=scale,
                 color=color,
-                title=self.title)
+                title=self.title,
+                ax=ax)
         if size:
             fig.set_size_inches(size)
         return fig, ax
@@ -311,10 +549,11 @@ class Project:
     def show(self, n=None, net=False, scale=None, size=None):
         """ Wrapper to show the results of to_cashflowdiagram """
         from matplotlib import pyplot as plt
-        self.to_cashflowdiagram(n, net, scale, size)
+        self.to_cashflowdiagram(n, net, scale, size=size)
         plt.show()
 
 
+    @instrument("valuator")
     def npw(self, i=None, after_tax=True, tags=None):
         i = i if i is not None else self.interest
         if i is None:
@@ -322,9 +561,12 @@ class Project:
                 "No interest provided for npw calculations."
                 "Did you mean to use set_interest(i)?"
             )
+        if self._is_running(after_tax, tags):
+            return Present(self._get_running(i).get(after_tax), "Net Present Worth")
         cashflows = self.get_taxed_cashflows(tags=tags) if after_tax else self.get_cashflows(tags=tags)
         return npw(cashflows, i)
 
+    @instrument("valuator")
     def nfw(self, n, i=None, after_tax=True, tags=None):
         i = i if i is not None else self.interest
         if i is None:
@@ -332,9 +574,14 @@ class Project:
                 "No interest provided for nfw calculations."
                 "Did you mean to use set_interest(i)?"
             )
+        if self._is_running(after_tax, tags):
+            fw = self.npw(i, after_tax).to_fv(i, n)
+            fw.set_title("Net Future Worth")
+            return fw
         cashflows = self.get_taxed_cashflows(tags=tags) if after_tax else self.get_cashflows(tags=tags)
         return nfw(cashflows, i, n)
 
+    @instrument("valuator")
     def eacf(self, d=None, i=None, after_tax=True, tags=None):
         d = parse_d(d if d is not None else self.get_final_period())
 
@@ -347,9 +594,14 @@ class Project:
                 "No interest provided for eacf calculations."
                 "Did you mean to use set_interest(i)?"
             )
+        if self._is_running(after_tax, tags):
+            av = self.npw(i, after_tax).to_av(i, d)
+            av.set_title("Equivalent Annual Cashflow")
+            return av
         cashflows = self.get_taxed_cashflows(tags=tags) if after_tax else self.get_cashflows(tags=tags)
         return eacf(cashflows, i, d)
 
+    @instrument("valuator")
     def epcf(self, d0=0, i=None, after_tax=True, tags=None):
         i = i if i is not None else self.interest
         if i is None:
@@ -360,10 +612,12 @@ class Project:
         cashflows = self.get_taxed_cashflows(tags=tags) if after_tax else self.get_cashflows(tags=tags)
         return epcf(cashflows, i, d0)
 
+    @instrument("valuator")
     def bcr(self, after_tax=True, tags=None):
         cashflows = self.get_taxed_cashflows(tags=tags) if after_tax else self.get_cashflows(tags=tags)
         return bcr(cashflows)
 
+    @instrument("valuator")
     def irr(self, i0=None, after_tax=True, tags=None):
         i0 = i0 if i0 is not None else self.interest
         if i0 is None:
@@ -373,17 +627,68 @@ class Project:
             )
 
         cashflows = self.get_taxed_cashflows(tags=tags) if after_tax else self.get_cashflows(tags=tags)
-        return irr(cashflows, i0)
+        # Check past the final finite period to detect perpetuities
+        ncfs = self.net_cashflows(self.get_final_period(finite=True) + 1, after_tax, tags)
+        return irr(cashflows, i0, ncfs)
 
+    @instrument("valuator")
     def mirr(self, e_inv=None, e_fin=None, after_tax=True, tags=None):
         e_inv = e_inv if e_inv is not None else self.interest
         e_fin = e_fin if e_fin is not None else e_inv
         cashflows = self.get_taxed_cashflows(tags=tags) if after_tax else self.get_cashflows(tags=tags)
-        return mirr(cashflows, e_inv, e_fin)
+        nf = self.get_final_period()
+        ncfs = None if isinf(nf) else self.net_cashflows(nf, after_tax, tags)
+        return mirr(cashflows, e_inv, e_fin, ncfs)
     
+    @instrument("valuator")
+    def payback(self, n=None, after_tax=True, tags=None):
+        cashflows = self.get_taxed_cashflows(tags=tags) if after_tax else self.get_cashflows(tags=tags)
+        return payback(cashflows, self.net_cashflows(n, after_tax, tags))
+
+    @instrument("valuator")
+    def discounted_payback(self, i=None, n=None, after_tax=True, tags=None):
+        i = i if i is not None else self.interest
+        cashflows = self.get_taxed_cashflows(tags=tags) if after_tax else self.get_cashflows(tags=tags)
+        return discounted_payback(cashflows, i, self.net_cashflows(n, after_tax, tags))
+
+    def _is_running(self, after_tax, tags):
+        """ Returns true if a valuation can use the running present worth """
+        if not self._incremental or tags is not None:
+            return False
+        return not after_tax or all([tax.is_linear() for tax in self._taxes])
+
+    def _get_running(self, i):
+        """ Gets the running present worth at rate i, building it if needed """
+        if i not in self._running:
+            if len(self._running) >= Project.MAX_RUNNING_RATES:
+                del self._running[next(iter(self._running))]  # Oldest first
+            running = _RunningWorth()
+            for cashflow in self._cashflows:
+                running.add(cashflow, *self._contribution(cashflow, i))
+            for depreciation in self._depreciations:
+                running.add(depreciation, *self._contribution(depreciation, i))
+            self._running[i] = running
+        return self._running[i]
+
+    def _contribution(self, item, i):
+        """ Computes the present worth a cashflow contributes at rate i
+
+        Returns the before-tax and after-tax present worths. Under linear taxes,
+        each tax whose tag matches a cashflow adds a fixed proportion of its
+        present worth, and each tax whose tag matches a depreciation removes
+        a fixed proportion of the present worth of the depreciation expenses.
+        """
+        rate = sum([tax.get_rate() for tax in self._taxes if tax.get_tag() in item.tags])
+        if isinstance(item, dh.Depreciation):
+            ns = np.arange(item.d[0] + 1, item.d[1] + 1)
+            pv = float(np.dot(item.amounts_at(ns), (1 + i) ** -ns.astype(float)))
+            return 0.0, -pv * rate
+        pv = item.to_pv(i).amount
+        return pv, pv * (1 + rate)
+
     def __repr__(self):
         """ Prints table of Cashflows vs periods """
-        return self.to_dataframe().to_string()
+        return self.to_frame().to_string(float_format=Cashflow.CURRENCY_FMT_STR.format)
 
     def __getitem__(self, val):
         """ Retrieves cashflows by tags or periods
@@ -416,13 +721,77 @@ class Project:
                 ]
             return cashflows[0] if len(cashflows) == 1 else cashflows
 
+    @instrument("project")
     def __enter__(self):
         from copy import deepcopy
 
+        # Cashflows may be modified freely within the context, so running
+        # valuations are suspended until it exits
         self._cashflows_copy = deepcopy(self._cashflows)
+        self._incremental_copy = self._incremental
+        self.set_incremental(False)
+        self._in_context = True
+        self._touch()
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
         self._cashflows = self._cashflows_copy
+        self.set_incremental(self._incremental_copy)
+        self._in_context = False
+        self._touch()
         del self._cashflows_copy
+        del self._incremental_copy
+
+
+def _describe(obj):
+    """ Reduces an object to nested tuples of its type and attributes """
+    if obj is None or isinstance(obj, (Number, str)):
+        return obj
+    if isinstance(obj, (list, tuple)):
+        return tuple([_describe(item) for item in obj])
+    if isinstance(obj, dict):
+        return tuple(sorted([(repr(k), _describe(v)) for k, v in obj.items()]))
+    if isinstance(obj, np.ndarray):
+        return ("ndarray", obj.shape, obj.tobytes())
+    if isinstance(obj, (FunctionType, MethodType, BuiltinFunctionType)):
+        return ("function", obj.__qualname__, id(obj))
+    if hasattr(obj, "__dict__"):
+        attributes = [(k, _describe(v)) for k, v in vars(obj).items() if k != "_id"]
+        return (type(obj).__qualname__, tuple(sorted(attributes)))
+    return repr(obj)
+
+
+class _RunningWorth:
+    """ Running before-tax and after-tax present worth at one interest rate
+
+    Stores the contribution of every cashflow and depreciation of a project,
+    keyed by identity, so that edits can be applied as differences.
+    """
+
+    def __init__(self):
+        self._contributions = dict()  # Maps id to (count, before, after)
+        self.before_tax = 0.0
+        self.after_tax = 0.0
+
+    def get(self, after_tax):
+        return self.after_tax if after_tax else self.before_tax
+
+    def add(self, item, before, after):
+        count, _, _ = self._contributions.get(id(item), (0, 0.0, 0.0))
+        self._contributions[id(item)] = (count + 1, before, after)
+        self.before_tax += before
+        self.after_tax += after
+
+    def remove(self, item):
+        count, before, after = self._contributions.pop(id(item))
+        if count > 1:
+            self._contributions[id(item)] = (count - 1, before, after)
+        self.before_tax -= before
+        self.after_tax -= after
+
+    def update(self, item, before, after):
+        count, old_before, old_after = self._contributions[id(item)]
+        self._contributions[id(item)] = (count, before, after)
+        self.before_tax += count * (before - old_before)
+        self.after_tax += count * (after - old_after)
 
@@ -27,8 +27,20 @@ from .analysis import (
     ScalarAnalysis,
     WhatIfAnalysis,
     SensitivityAnalysis,
+    ScenarioSet,
+    SimulationResult,
     simulation_analysis,
-    sensitivity_analysis
+    sensitivity_analysis,
+    incremental_analysis,
+    capital_budgeting,
+    break_even_analysis,
+    economic_life,
+    replacement_analysis,
+    DecisionTree,
+    DecisionNode,
+    ChanceNode,
+    TerminalNode,
+    binomial_lattice,
 )
 
 from .valuation import (
@@ -39,11 +51,39 @@ from .valuation import (
     bcr,
     irr,
     mirr,
+    payback,
+    discounted_payback,
+    payback_periods,
+    irr_batch,
 )
 
 from .output import write_excel
 
 from .utilities import Scales
 
+from .instrumentation import Profiler, instrument
+
+# Attributes whose subpackages are slow to import, or rarely needed, are
+# imported on first access rather than with the package
+_LAZY_ATTRIBUTES = {
+    "AsyncValuator": ".aio",
+    "Portfolio": ".portfolio",
+}
+
+
+def __getattr__(name):
+    if name in _LAZY_ATTRIBUTES:
+        from importlib import import_module
+
+        value = getattr(import_module(_LAZY_ATTRIBUTES[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted([*globals(), *_LAZY_ATTRIBUTES])
+
+
 __version__ = "0-A2"
 __author__ = "Thomas Richmond"
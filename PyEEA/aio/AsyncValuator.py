@@ -0,0 +1,184 @@
+import asyncio
+from copy import deepcopy
+from functools import partial
+
+from ..analysis import SimulationResult, simulation_analysis as _simulation_analysis
+
+
+class AsyncValuator:
+    """ Awaitable valuations of projects, for use within an event loop
+
+    Valuations are CPU-bound, so calling them from a coroutine blocks the
+    event loop for their duration. An AsyncValuator instead runs each
+    valuation in an executor and awaits its result.
+
+    Concurrent requests for the same valuation of projects with the same
+    contents (as given by Project.fingerprint) are coalesced: the valuation
+    is performed once, and every request awaits the same result. Projects
+    are fingerprinted in the default executor of the event loop, a thread
+    pool, as fingerprints of functions only hold within one process. A
+    request may be cancelled without affecting the others; the valuation
+    itself is cancelled once every request awaiting it has been.
+
+    Each valuation values a copy of the project, so that the caches of the
+    project are never written by several threads at once. Simulations are
+    run in chunks of iterations, so that a cancelled simulation stops at the
+    end of its current chunk, and each chunk simulates its own copy. Projects
+    should not be edited while requests on them are in flight.
+
+    Attributes:
+        executor: Optional; A concurrent.futures.Executor. Defaults to the
+            default executor of the event loop. A ProcessPoolExecutor may be
+            used if projects (and simulation functions) can be pickled.
+
+    See Also:
+        Project.fingerprint
+        simulation_analysis
+    """
+
+    def __init__(self, executor=None):
+        self._executor = executor
+        self._in_flight = dict()  # Maps request keys to _Request
+
+    @property
+    def executor(self):
+        return self._executor
+
+    def set_executor(self, executor):
+        self._executor = executor
+        return self
+
+    def get_in_flight(self):
+        """ Returns the number of distinct valuations currently running """
+        return len(self._in_flight)
+
+    async def valuate(self, project, valuator, *args, **kwargs):
+        """ Awaits a valuation method of a project
+
+        Args:
+            project: A Project instance
+            valuator: The name of a valuation method of Project, e.g. "npw"
+            *args, **kwargs: Arguments to the valuation method
+
+        Returns:
+            The result of the valuation method
+        """
+        key = (await _fingerprint(project), valuator, repr(args), repr(sorted(kwargs.items())))
+        job = partial(_valuate, project, valuator, args, kwargs)
+        return await self._coalesce(key, lambda: self._run(job))
+
+    async def npw(self, project, i=None, after_tax=True, tags=None):
+        """ Awaitable counterpart to Project.npw """
+        return await self.valuate(project, "npw", i=i, after_tax=after_tax, tags=tags)
+
+    async def irr(self, project, i0=None, after_tax=True, tags=None):
+        """ Awaitable counterpart to Project.irr """
+        return await self.valuate(project, "irr", i0=i0, after_tax=after_tax, tags=tags)
+
+    async def simulation_analysis(
+            self, project, sim_dict, iterations=250, valuator="npw", chunksize=50):
+        """ Awaitable counterpart to simulation_analysis
+
+        Args:
+            project: A Project instance
+            sim_dict: See simulation_analysis
+            iterations: Optional; The number of iterations to simulate
+            valuator: Optional; The name of a valuation method of Project, or
+                a function taking a Project. Defaults to "npw".
+            chunksize: Optional; The number of iterations run per executor
+                job, which bounds the time taken to cancel the simulation
+
+        Returns:
+            A SimulationResult of the valuation of each iteration
+        """
+        key = (
+            await _fingerprint(project), "simulation_analysis",
+            repr(sorted(sim_dict.items())), iterations, repr(valuator))
+
+        async def simulate():
+            valuations = []
+            for start in range(0, iterations, chunksize):
+                job = partial(
+                    _simulate, project, sim_dict,
+                    min(chunksize, iterations - start), valuator)
+                valuations.extend(await self._run(job))
+            return SimulationResult(valuations, f"Simulation of {project.title}")
+
+        return await self._coalesce(key, simulate)
+
+    async def _run(self, job):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, job)
+
+    async def _coalesce(self, key, start):
+        """ Awaits the in-flight valuation for key, starting it if needed """
+        request = self._in_flight.get(key)
+        if request is None:
+            request = _Request(asyncio.ensure_future(start()))
+            self._in_flight[key] = request
+            request.task.add_done_callback(partial(self._release, key, request))
+
+        request.waiters += 1
+        try:
+            return await asyncio.shield(request.task)
+        except asyncio.CancelledError:
+            if request.waiters == 1:
+                request.task.cancel()
+            raise
+        finally:
+            request.waiters -= 1
+
+    def _release(self, key, request, task):
+        if self._in_flight.get(key) is request:
+            del self._in_flight[key]
+
+
+class _Request:
+    """ A valuation in flight, and the number of requests awaiting it """
+
+    def __init__(self, task):
+        self.task = task
+        self.waiters = 0
+
+
+async def _fingerprint(project):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, project.fingerprint)
+
+
+def _valuate(project, valuator, args, kwargs):
+    project = deepcopy(project)
+    return getattr(project, valuator)(*args, **kwargs)
+
+
+def _simulate(project, sim_dict, iterations, valuator):
+    project = deepcopy(project)
+    if isinstance(valuator, str):
+        valuator = getattr(project, valuator)
+    else:
+        valuator = partial(valuator, project)
+    return _simulation_analysis(project, sim_dict, iterations, valuator)
+
+
+_default = AsyncValuator()
+
+
+def set_executor(executor):
+    """ Sets the executor used by the module-level coroutines """
+    _default.set_executor(executor)
+
+
+async def npw(project, i=None, after_tax=True, tags=None):
+    """ Awaitable counterpart to Project.npw; see AsyncValuator """
+    return await _default.npw(project, i, after_tax, tags)
+
+
+async def irr(project, i0=None, after_tax=True, tags=None):
+    """ Awaitable counterpart to Project.irr; see AsyncValuator """
+    return await _default.irr(project, i0, after_tax, tags)
+
+
+async def simulation_analysis(project, sim_dict, iterations=250, valuator="npw", chunksize=50):
+    """ Awaitable counterpart to simulation_analysis; see AsyncValuator """
+    return await _default.simulation_analysis(
+        project, sim_dict, iterations, valuator, chunksize)
@@ -0,0 +1,9 @@
+# __init__.py
+
+from .AsyncValuator import (
+    AsyncValuator,
+    set_executor,
+    npw,
+    irr,
+    simulation_analysis,
+)
@@ -0,0 +1,137 @@
+import numpy as np
+
+from .ScenarioAnalysis import ScenarioSet
+from ..cashflow import Perpetuity, GeoPerpetuity
+from ..valuation.Valuators import payback_periods
+from ..instrumentation import instrument
+
+
+@instrument("engine")
+def break_even_analysis(
+        project, tags=None, i=None, after_tax=True, tol=1e-8, maxiter=50):
+    """ Finds the break-even values of a project's cashflows, interest and life
+
+    For each tag, finds the scale factor on the amounts of all cashflows with
+    that tag at which the project's Net Present Worth is zero. NPW is linear
+    in the amount of each cashflow, so the break-even scale follows in closed
+    form from the NPW with and without the tagged cashflows, which are found
+    for every tag at once with a single ScenarioSet evaluation. Where taxes
+    with loss carry windows make NPW nonlinear, the scales are refined by
+    secant iterations, again across every tag at once.
+
+    The break-even interest rate is the rate at which NPW is zero, found by
+    bracketed root-finding; the break-even duration is the shortest life at
+    which NPW is non-negative, which is the discounted payback period.
+
+    The margin of safety is the relative change from the base value to the
+    break-even value. For tags, the base and break-even values are the total
+    amount of the tagged cashflows.
+
+    Args:
+        project: A Project instance
+        tags: Optional; A string or sequence of strings. Defaults to every tag
+            of the project's cashflows
+        i: Optional; The interest rate. Defaults to that of the project
+        after_tax: Optional; If true, taxes are applied
+        tol: Optional; The tolerance on NPW for nonlinear refinement
+        maxiter: Optional; The maximum number of refining iterations
+
+    Returns:
+        A Pandas DataFrame indexed by tag, "interest" and "duration", with
+        columns "base", "break_even" and "margin". Values which do not exist,
+        e.g. for tags whose cashflows have no effect on NPW, are NaN.
+    """
+    import pandas as pd
+
+    i = i if i is not None else project.interest
+    if tags is None:
+        tags = list(dict.fromkeys(
+            [tag for cashflow in project.get_cashflows() for tag in cashflow.tags]))
+    elif isinstance(tags, str):
+        tags = [tags]
+
+    scales = break_even_scales(project, tags, i, after_tax, tol, maxiter)
+    totals = np.array([
+        sum([cashflow.amount for cashflow in project[tag]]) for tag in tags])
+
+    nf = project.get_final_period(finite=True)
+    base = list(totals) + [i, nf]
+    break_even = list(totals * scales) + [
+        break_even_interest(project, after_tax=after_tax),
+        payback_periods([project.net_cashflows(nf, after_tax)], i)[0],
+    ]
+
+    base, break_even = np.array(base, dtype=float), np.array(break_even, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        margin = np.where(base != 0, (break_even - base) / np.abs(base), np.nan)
+    margin[:len(tags)] = scales - 1  # Also defined for zero totals
+
+    return pd.DataFrame(
+        {"base": base, "break_even": break_even, "margin": margin},
+        index=pd.Index(tags + ["interest", "duration"], name="Variable"))
+
+
+def break_even_scales(project, tags, i=None, after_tax=True, tol=1e-8, maxiter=50):
+    """ Finds the scale factor on each tag at which NPW is zero
+
+    See break_even_analysis.
+
+    Returns:
+        A float array of break-even scale factors, one per tag
+    """
+    i = i if i is not None else project.interest
+
+    def npws(scales):
+        scenarios = ScenarioSet(project)
+        for tag, scale in zip(tags, scales):
+            scenarios.add_scenario(tag, {tag: scale})
+        return scenarios.npw(i, after_tax)
+
+    npw_base = project.npw(i, after_tax).amount
+    s0, f0 = np.ones(len(tags)), np.full(len(tags), npw_base)
+    s1 = np.zeros(len(tags))
+    f1 = npws(s1)
+
+    linear = not after_tax or all([tax.is_linear() for tax in project.get_taxes()])
+    for _ in range(1 if linear else maxiter):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            s2 = np.where(f1 != f0, s1 - f1 * (s1 - s0) / (f1 - f0), np.nan)
+        s0, f0, s1 = s1, f1, s2
+        if linear:
+            break
+        diverged = ~np.isfinite(s1)
+        f1 = npws(np.where(diverged, 1.0, s1))
+        if np.all(diverged | (np.abs(f1) < tol)):
+            break
+
+    return s1
+
+
+def break_even_interest(project, lo=-0.5, hi=10.0, after_tax=True):
+    """ Finds the interest rate at which a project's NPW is zero
+
+    NPW is evaluated in vectorized form, including the closed-form tails of
+    any perpetuities, and the root is found with Brent's method between lo
+    and hi. Perpetuities only have a finite worth at interest rates above
+    their growth rate, so lo is raised accordingly if needed.
+
+    Returns:
+        The break-even interest rate, or NaN if NPW does not change sign
+            between lo and hi
+    """
+    from scipy.optimize import brentq
+
+    scenarios = ScenarioSet(project).add_scenario("Base")
+    growths = [
+        getattr(cashflow, "g", 0.0) for cashflow in project.get_cashflows()
+        if isinstance(cashflow, (Perpetuity, GeoPerpetuity))]
+    if growths:
+        lo = max(lo, max(growths) + 1e-9)
+
+    def npw(i):
+        return scenarios.npw(i, after_tax)[0]
+
+    f_lo, f_hi = npw(lo), npw(hi)
+    if not np.isfinite(f_lo) or not np.isfinite(f_hi) or f_lo * f_hi > 0:
+        return np.nan
+    return brentq(npw, lo, hi)
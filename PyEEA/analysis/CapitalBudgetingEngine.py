@@ -0,0 +1,262 @@
+import numpy as np
+
+from ..valuation.Valuators import stack_net_cashflows
+from ..instrumentation import instrument
+
+EXACT_DP_LIMIT = 100000  # The largest integral budget portfolio_frontier solves by DP
+
+
+@instrument("engine")
+def capital_budgeting(
+        projects, budgets, i=None, dependencies=None, exclusions=None,
+        after_tax=True, method=None):
+    """ Selects the portfolio of projects of greatest NPW within a budget
+
+    Chooses the subset of independent projects which maximizes the total Net
+    Present Worth, subject to capital budgets on the outlays made in each
+    period. Selections may be further restricted by dependencies between
+    projects and by groups of mutually exclusive projects.
+
+    The NPW of each project and its outlays (net negative cashflows) per
+    period are computed from the projects, and the selection is solved by
+    select_portfolio.
+
+    Args:
+        projects: A sequence of Project instances
+        budgets: A budget for period zero, or a sequence of budgets for
+            periods zero onwards. Outlays in later periods are unconstrained.
+        i: Optional; The interest rate for NPW. Defaults to each project's own
+        dependencies: Optional; A sequence of (project, prerequisite) pairs,
+            where a project may only be selected if its prerequisite is too
+        exclusions: Optional; A sequence of collections of projects, of which
+            at most one per collection may be selected
+        after_tax: Optional; If true, taxflows are included
+        method: Optional; See select_portfolio
+
+    Returns:
+        A list of the selected Project instances
+    """
+    projects = list(projects)
+    index = {id(project): k for k, project in enumerate(projects)}
+
+    npws = np.array([project.npw(i, after_tax).amount for project in projects])
+    outlays = -np.clip(stack_net_cashflows(
+        [project.net_cashflows(after_tax=after_tax) for project in projects]), None, 0)
+    dependencies = [
+        (index[id(project)], index[id(prerequisite)])
+        for project, prerequisite in dependencies or []]
+    exclusions = [
+        [index[id(project)] for project in exclusive]
+        for exclusive in exclusions or []]
+
+    selected, _ = select_portfolio(npws, outlays, budgets, dependencies, exclusions, method)
+    return [project for project, chosen in zip(projects, selected) if chosen]
+
+
+@instrument("engine")
+def select_portfolio(
+        npws, outlays, budgets, dependencies=None, exclusions=None, method=None,
+        resolution=1000):
+    """ Solves the 0-1 capital budgeting problem
+
+    Maximizes the total NPW of a selection of projects such that, in every
+    budgeted period, the sum of the outlays of the selected projects does not
+    exceed the budget. This is solved exactly as a mixed-integer linear
+    program using scipy's milp.
+
+    Where there is a single budget and no dependencies or exclusions, the
+    problem is a 0-1 knapsack, which may instead be solved by dynamic
+    programming. Outlays are then measured in steps of budget / resolution,
+    rounded up, so a selection never exceeds the budget but may fall short of
+    the exact optimum. Without a positive budget, only projects without a
+    positive outlay are selected. Dynamic programming is used whenever milp is
+    unavailable (scipy < 1.9).
+
+    Args:
+        npws: A sequence of the NPW of each project
+        outlays: A sequence of outlays per project, or a two-dimensional array
+            of outlays whose rows correspond to projects and whose columns
+            correspond to periods
+        budgets: A budget for period zero, or a sequence of budgets for
+            periods zero onwards
+        dependencies: Optional; A sequence of (project, prerequisite) index
+            pairs, where a project may only be selected if its prerequisite is too
+        exclusions: Optional; A sequence of collections of project indices,
+            of which at most one per collection may be selected
+        method: Optional; "milp" or "dp". Chosen automatically by default.
+        resolution: Optional; The number of budget steps used by "dp"
+
+    Returns:
+        A tuple of a boolean array indicating the selected projects, and the
+            total NPW of the selection
+
+    Raises:
+        ValueError: Dynamic programming was requested for a problem with
+            several budgets, dependencies or exclusions
+    """
+    npws = np.asarray(npws, dtype=float)
+    outlays, budgets = _parse_budgets(outlays, budgets)
+    single = len(budgets) == 1 and not dependencies and not exclusions
+
+    if method is None:
+        try:
+            from scipy.optimize import milp
+            method = "milp"
+        except ImportError:
+            method = "dp"
+
+    if method == "dp":
+        if not single:
+            raise ValueError(
+                "Dynamic programming only supports a single budget without "
+                "dependencies or exclusions")
+        values, selections = _knapsack(npws, outlays[:, 0], budgets[0], resolution)
+        return selections[-1], values[-1]
+    elif method == "milp":
+        selected = _milp(npws, outlays, budgets, dependencies or [], exclusions or [])
+        return selected, float(npws[selected].sum())
+    else:
+        raise ValueError("Method must be one of 'milp' or 'dp'")
+
+
+@instrument("engine")
+def portfolio_frontier(
+        npws, outlays, budget_levels, dependencies=None, exclusions=None, method=None,
+        resolution=1000):
+    """ Computes the efficient frontier of NPW against capital budget
+
+    Solves the capital budgeting problem for each of several budgets for
+    period zero. With method "dp", dynamic programming solves every budget
+    level from a single table, in steps of the largest budget / resolution.
+    With method "milp", a separate program is solved per budget level.
+
+    By default, a single table is used when it is exact: when there are no
+    dependencies or exclusions, and the outlays and budget levels are whole
+    numbers no greater than EXACT_DP_LIMIT, the table is built in unit
+    steps. Otherwise, as with "milp", each budget level is solved in turn
+    by select_portfolio. Budget levels of zero or less select only projects
+    without a positive outlay.
+
+    Args:
+        npws: A sequence of the NPW of each project
+        outlays: See select_portfolio
+        budget_levels: A sequence of budgets for period zero
+        dependencies: Optional; See select_portfolio
+        exclusions: Optional; See select_portfolio
+        method: Optional; "milp" or "dp". Chosen as described above by default
+        resolution: Optional; The number of steps up to the largest budget
+            used by "dp"
+
+    Returns:
+        A tuple of a float array of the greatest total NPW at each budget
+            level, and a two-dimensional boolean array whose rows are the
+            corresponding selections of projects
+    """
+    npws = np.asarray(npws, dtype=float)
+    budget_levels = np.asarray(budget_levels, dtype=float)
+    outlays, _ = _parse_budgets(outlays, budget_levels.max())
+    top = budget_levels.max()
+
+    exact = (
+        not dependencies and not exclusions and 0 < top <= EXACT_DP_LIMIT
+        and np.all(outlays[:, 0] == np.round(outlays[:, 0]))
+        and np.all(budget_levels == np.round(budget_levels)))
+    if method is None and exact:
+        values, selections = _knapsack(npws, outlays[:, 0], top, int(top))
+        levels = np.clip(budget_levels, 0, None).astype(int)
+        return values[levels], selections[levels]
+
+    if method == "dp":
+        if dependencies or exclusions:
+            raise ValueError(
+                "Dynamic programming does not support dependencies or exclusions")
+        step = top / resolution if top > 0 else 1.0
+        values, selections = _knapsack(npws, outlays[:, 0], top, resolution)
+        levels = np.floor(np.clip(budget_levels, 0, None) / step + 1e-9).astype(int)
+        return values[levels], selections[levels]
+
+    solutions = [
+        select_portfolio(npws, outlays, budget, dependencies, exclusions, method, resolution)
+        for budget in budget_levels]
+    selections = np.array([selected for selected, _ in solutions]).reshape(-1, len(npws))
+    values = np.array([value for _, value in solutions])
+    return values, selections
+
+
+def _parse_budgets(outlays, budgets):
+    """ Shapes outlays into a 2D array matching a sequence of budgets """
+    budgets = np.atleast_1d(np.asarray(budgets, dtype=float))
+    outlays = np.asarray(outlays, dtype=float)
+    if outlays.ndim == 1:
+        outlays = outlays[:, None]
+
+    padded = np.zeros((outlays.shape[0], len(budgets)))
+    width = min(outlays.shape[1], len(budgets))
+    padded[:, :width] = outlays[:, :width]
+    return padded, budgets
+
+
+def _milp(npws, outlays, budgets, dependencies, exclusions):
+    """ Solves the capital budgeting problem with scipy's milp """
+    from scipy.optimize import milp, LinearConstraint, Bounds
+
+    n_projects = len(npws)
+    constraints = [LinearConstraint(outlays.T, -np.inf, budgets)]
+
+    if dependencies:
+        # x_project - x_prerequisite <= 0
+        rows = np.zeros((len(dependencies), n_projects))
+        for row, (project, prerequisite) in enumerate(dependencies):
+            rows[row, project] += 1
+            rows[row, prerequisite] -= 1
+        constraints.append(LinearConstraint(rows, -np.inf, 0))
+
+    if exclusions:
+        rows = np.zeros((len(exclusions), n_projects))
+        for row, exclusive in enumerate(exclusions):
+            rows[row, list(exclusive)] = 1
+        constraints.append(LinearConstraint(rows, -np.inf, 1))
+
+    result = milp(
+        -npws,
+        integrality=np.ones(n_projects),
+        bounds=Bounds(0, 1),
+        constraints=constraints)
+    if not result.success:
+        raise ValueError(f"Capital budgeting problem could not be solved: {result.message}")
+    return result.x > 0.5
+
+
+def _knapsack(npws, outlays, budget, resolution):
+    """ Solves the single-budget problem for every budget up to budget
+
+    Returns the greatest total NPW and the corresponding selection for each
+    budget step from zero to resolution. Without a positive budget, only the
+    projects with no outlay (or a negative one) can be selected, at every step.
+    """
+    if budget <= 0:
+        selected = (npws > 0) & (outlays <= 0)
+        values = np.full(resolution + 1, npws[selected].sum())
+        return values, np.tile(selected, (resolution + 1, 1))
+
+    step = budget / resolution
+    weights = np.clip(np.ceil(outlays / step - 1e-9), 0, None).astype(int)
+
+    values = np.zeros(resolution + 1)
+    keep = np.zeros((len(npws), resolution + 1), dtype=bool)
+    for k, (npw, weight) in enumerate(zip(npws, weights)):
+        if npw <= 0 or weight > resolution:
+            continue
+        candidates = np.full(resolution + 1, -np.inf)
+        candidates[weight:] = values[:resolution + 1 - weight] + npw
+        keep[k] = candidates > values
+        values = np.maximum(values, candidates)
+
+    # Walk back through the table to recover the selection at every budget
+    selections = np.zeros((resolution + 1, len(npws)), dtype=bool)
+    capacity = np.arange(resolution + 1)
+    for k in reversed(range(len(npws))):
+        chosen = keep[k, capacity]
+        selections[:, k] = chosen
+        capacity = capacity - np.where(chosen, weights[k], 0)
+    return values, selections
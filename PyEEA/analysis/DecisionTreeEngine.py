@@ -0,0 +1,267 @@
+from abc import ABC, abstractmethod
+from collections.abc import Mapping
+from math import isclose
+
+from ..cashflow import Cashflow, Present
+from ..instrumentation import instrument
+
+
+class Node(ABC):
+    """ A node of a decision tree
+
+    Every node carries the cashflows incurred upon reaching it. Periods of
+    cashflows are measured from the root of the tree, not from the node, so
+    that the cashflows of every node are discounted to the same present.
+
+    Nodes may be shared between several parents, as in recombining trees
+    such as binomial lattices; a shared node is evaluated only once. Distinct
+    nodes which are known to be identical may also be given the same key, so
+    that only one of them is evaluated.
+
+    Attributes:
+        cashflows: The Cashflows incurred upon reaching the node
+        title: Optional; A human-readable description of the node
+        key: Optional; A hashable key identifying identical subtrees
+    """
+
+    node_id = 1  # Unique ID for each node
+
+    def __init__(self, cashflows=None, title=None, key=None):
+        if cashflows is None:
+            cashflows = []
+        elif isinstance(cashflows, Cashflow):
+            cashflows = [cashflows]
+        self._cashflows = list(cashflows)
+        self._title = title or f"{type(self).__name__} {Node.node_id}"
+        self._key = key
+        Node.node_id += 1
+
+    @property
+    def title(self):
+        return self._title
+
+    @property
+    def key(self):
+        return self._key if self._key is not None else id(self)
+
+    def get_cashflows(self):
+        return self._cashflows
+
+    def pv(self, i):
+        """ Returns the present worth of this node's own cashflows """
+        return sum([cashflow.to_pv(i).amount for cashflow in self._cashflows])
+
+    @abstractmethod
+    def get_children(self):
+        """ Returns the child nodes, in a fixed order """
+        pass
+
+    @abstractmethod
+    def resolve(self, values):
+        """ Combines the expected worths of the children
+
+        Args:
+            values: The expected present worth of each child, in the order
+                given by get_children()
+
+        Returns:
+            A tuple of the expected present worth of the children as seen from
+            this node, and the index of the chosen child (or None)
+        """
+        pass
+
+    def __repr__(self):
+        return self.title
+
+
+class TerminalNode(Node):
+    """ A node ending a branch of a decision tree """
+
+    def get_children(self):
+        return []
+
+    def resolve(self, values):
+        return 0.0, None
+
+
+class ChanceNode(Node):
+    """ A node whose outcome is determined by chance
+
+    Attributes:
+        outcomes: A sequence of (probability, Node) pairs, whose
+            probabilities must sum to one
+    """
+
+    def __init__(self, outcomes, cashflows=None, title=None, key=None):
+        super().__init__(cashflows, title, key)
+        self._probabilities = [float(p) for p, _ in outcomes]
+        self._children = [node for _, node in outcomes]
+        if not isclose(sum(self._probabilities), 1.0):
+            raise ValueError("Probabilities of a ChanceNode must sum to one!")
+
+    def get_children(self):
+        return self._children
+
+    def get_probabilities(self):
+        return self._probabilities
+
+    def resolve(self, values):
+        return sum([p * value for p, value in zip(self._probabilities, values)]), None
+
+
+class DecisionNode(Node):
+    """ A node at which the alternative of greatest worth is chosen
+
+    Attributes:
+        alternatives: A Mapping of alternative names to Nodes
+    """
+
+    def __init__(self, alternatives, cashflows=None, title=None, key=None):
+        super().__init__(cashflows, title, key)
+        if not isinstance(alternatives, Mapping) or not alternatives:
+            raise TypeError("Alternatives must be a non-empty Mapping of names to Nodes")
+        self._names = list(alternatives.keys())
+        self._children = list(alternatives.values())
+
+    def get_children(self):
+        return self._children
+
+    def get_alternatives(self):
+        return self._names
+
+    def resolve(self, values):
+        choice = max(range(len(values)), key=lambda k: values[k])
+        return values[choice], choice
+
+
+class DecisionTree:
+    """ A staged investment whose later cashflows depend on earlier outcomes
+
+    Valuates a tree of DecisionNode, ChanceNode and TerminalNode instances by
+    backward induction: the worth of a chance node is the probability-weighted
+    worth of its outcomes, and the worth of a decision node is the worth of
+    its best alternative. Every distinct subtree is evaluated exactly once,
+    so recombining trees are evaluated in time proportional to their number
+    of distinct nodes, rather than their number of paths.
+
+    Attributes:
+        root: The Node at which the tree begins
+    """
+
+    def __init__(self, root, title=None):
+        self._root = root
+        self._title = title
+
+    @property
+    def title(self):
+        return self._title or f"Decision Tree from {self._root.title}"
+
+    def get_root(self):
+        return self._root
+
+    @instrument("engine")
+    def npw(self, i):
+        """ Returns the expected Net Present Worth under the optimal policy """
+        values, _ = self._evaluate(i)
+        return Present(values[self._root.key], "Expected Net Present Worth")
+
+    @instrument("engine")
+    def get_policy(self, i):
+        """ Returns the optimal policy
+
+        Returns:
+            A dict mapping each DecisionNode reached under the optimal policy
+            to the name of its chosen alternative
+        """
+        _, choices = self._evaluate(i)
+        policy = dict()
+        stack, visited = [self._root], set()
+        while stack:
+            node = stack.pop()
+            if node.key in visited:
+                continue
+            visited.add(node.key)
+            children = node.get_children()
+            if isinstance(node, DecisionNode):
+                choice = choices[node.key]
+                policy[node] = node.get_alternatives()[choice]
+                children = [children[choice]]
+            stack.extend(children)
+        return policy
+
+    def _evaluate(self, i):
+        """ Performs the backward induction without recursion
+
+        Returns:
+            Dicts mapping node keys to their expected worth and, for decision
+            nodes, to the index of their chosen alternative
+        """
+        values, choices = dict(), dict()
+        stack = [(self._root, False)]
+        while stack:
+            node, expanded = stack.pop()
+            if node.key in values:
+                continue
+            children = node.get_children()
+            if expanded:
+                value, choice = node.resolve([values[child.key] for child in children])
+                values[node.key] = node.pv(i) + value
+                choices[node.key] = choice
+            else:
+                stack.append((node, True))
+                stack.extend(
+                    [(child, False) for child in children if child.key not in values])
+        return values, choices
+
+
+@instrument("engine")
+def binomial_lattice(value, up, p, periods, exercise, down=None, title=None):
+    """ Builds a recombining binomial lattice for valuing a real option
+
+    The underlying value of a project moves up by a factor of up, or down by
+    a factor of down, in each period, with probabilities p and 1 - p (which
+    should be risk-neutral probabilities if the lattice is valued at the
+    risk-free rate). At every node, the holder may exercise the option,
+    receiving the cashflows returned by exercise, or wait. Upon expiry at
+    the final period, the holder may exercise or let the option lapse.
+
+    Nodes at the same period and with the same number of up moves are
+    shared, so the lattice has (periods + 1)(periods + 2) / 2 distinct value
+    nodes rather than 2^periods paths.
+
+    For example, an option to expand a project by 30% at a cost of 500 is:
+
+        binomial_lattice(2000, 1.2, 0.55, 5,
+                         lambda n, v: [Future(0.3 * v - 500, n)])
+
+    Args:
+        value: The present underlying value of the project
+        up: The factor by which the value increases in an up move
+        p: The probability of an up move
+        periods: The number of periods until the option expires
+        exercise: A function of a period and underlying value, returning
+            the Cashflow or sequence of Cashflows received upon exercise
+        down: Optional; The factor by which the value decreases in a down
+            move. Defaults to 1 / up
+        title: Optional; A title for the tree
+
+    Returns:
+        A DecisionTree instance
+    """
+    down = down if down is not None else 1 / up
+    lattice = dict()
+    for n in reversed(range(periods + 1)):
+        for j in range(n + 1):
+            underlying = value * up ** j * down ** (n - j)
+            exercised = TerminalNode(
+                exercise(n, underlying), title=f"Exercise at ({n}, {j})")
+            if n == periods:
+                wait = TerminalNode(title=f"Lapse at ({n}, {j})")
+            else:
+                wait = ChanceNode(
+                    [(p, lattice[(n + 1, j + 1)]), (1 - p, lattice[(n + 1, j)])],
+                    title=f"Wait at ({n}, {j})")
+            lattice[(n, j)] = DecisionNode(
+                {"exercise": exercised, "wait": wait},
+                title=f"Decide at ({n}, {j})")
+    return DecisionTree(lattice[(0, 0)], title)
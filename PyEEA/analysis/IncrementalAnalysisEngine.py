@@ -1,26 +1,142 @@
-from scipy.optimize import fsolve
+import numpy as np
+
+from ..valuation.Valuators import irr_batch, stack_net_cashflows
+from ..instrumentation import instrument
+
+
+@instrument("engine")
+def incremental_analysis(
+        projects, marr, criterion="irr", do_nothing=True, after_tax=True, full_output=False):
+    """ Selects the best of several mutually exclusive projects
+
+    Performs an incremental analysis of a set of mutually exclusive projects.
+    Projects are ranked from lowest to highest present worth of costs at the
+    MARR. Starting from the cheapest alternative, each project in turn
+    challenges the current defender, and replaces it if the increment in
+    cashflows between the two is worthwhile by the chosen criterion:
+
+        "irr": The incremental IRR exceeds the MARR, for an increment that
+            is an investment (its first nonzero cashflow is negative); or
+            falls short of it, for a borrowing (its first is positive)
+        "npw": The incremental NPW at the MARR is positive
+        "bcr": The incremental benefit-to-cost ratio at the MARR exceeds one
+
+    The difference cashflows of every pair of alternatives are built as a
+    single matrix from the projects' net cashflows, and the incremental IRRs
+    of all pairs are solved together by irr_batch. Increments whose IRR is
+    undefined, or not simple (changing sign more than once), and increments
+    with no additional cost, are judged by their incremental NPW instead. An increment of zero, as between identical
+    alternatives, is a tie, and the defender is kept. Note that the matrix
+    grows with the square of the number of projects.
+
+    Incremental IRRs and BCRs are computed over each project's finite
+    horizon; incremental NPWs are exact.
+
+    Args:
+        projects: A sequence of Project instances
+        marr: The minimum acceptable rate of return, expressed as a decimal
+        criterion: Optional; One of "irr", "npw" or "bcr"
+        do_nothing: Optional; If true, the first defender is the alternative
+            of doing nothing, and no project need be selected. Otherwise, the
+            cheapest project is the first defender.
+        after_tax: Optional; If true, taxflows are included
+        full_output: Optional; If true, a list of every comparison made is
+            returned along with the preferred project
+
+    Returns:
+        The preferred Project, or None if doing nothing is preferred.
+        If full_output is true, a tuple of the preferred Project and a list
+            of dicts describing each defender-challenger comparison.
+
+    Raises:
+        ValueError: The criterion was not recognized
+    """
+    criterion = criterion.lower()
+    if criterion not in ("irr", "npw", "bcr"):
+        raise ValueError("Criterion must be one of 'irr', 'npw' or 'bcr'")
+
+    alternatives = ([None] if do_nothing else []) + list(projects)
+    ncfs = stack_net_cashflows(
+        [np.zeros(1) if project is None else project.net_cashflows(after_tax=after_tax)
+         for project in alternatives])
+    npws = np.array(
+        [0.0 if project is None else project.npw(marr, after_tax).amount
+         for project in alternatives])
+
+    # Present worth of benefits and costs, for ranking and BCR
+    discount = (1 + marr) ** -np.arange(ncfs.shape[1], dtype=float)
+    benefits = np.clip(ncfs, 0, None) @ discount
+    costs = -(np.clip(ncfs, None, 0) @ discount)
+
+    order = np.argsort(costs, kind="stable")
+    ncfs, npws = ncfs[order], npws[order]
+    benefits, costs = benefits[order], costs[order]
+    alternatives = [alternatives[k] for k in order]
+
+    # Every challenger k against every cheaper defender j, as one matrix
+    defenders, challengers = np.triu_indices(len(alternatives), 1)
+    pairs = np.full((len(alternatives), len(alternatives)), -1)
+    pairs[defenders, challengers] = np.arange(len(defenders))
+
+    increments = ncfs[challengers] - ncfs[defenders]
+    d_irrs = irr_batch(increments) if criterion == "irr" else None
+    zero = ~np.any(increments, axis=1)
+    d_npws = npws[challengers] - npws[defenders]
+    d_benefits = benefits[challengers] - benefits[defenders]
+    d_costs = costs[challengers] - costs[defenders]
+
+    defender = 0
+    comparisons = []
+    for challenger in range(1, len(alternatives)):
+        pair = pairs[defender, challenger]
+        d_npw = d_npws[pair]
+        d_irr = d_irrs[pair] if d_irrs is not None else None
+        d_bcr = d_benefits[pair] / d_costs[pair] if d_costs[pair] > 0 else None
+
+        kind = _classify(increments[pair]) if criterion == "irr" else None
+
+        tied = zero[pair] and np.isclose(npws[challenger], npws[defender], rtol=1e-9, atol=1e-9)
+        if tied:
+            accepted = False
+        elif criterion == "irr" and not np.isnan(d_irr) and kind is not None:
+            accepted = d_irr > marr if kind == "investment" else d_irr < marr
+        elif criterion == "bcr" and d_bcr is not None:
+            accepted = d_bcr > 1
+        else:
+            accepted = d_npw > 0
+
+        comparisons.append({
+            "defender": alternatives[defender],
+            "challenger": alternatives[challenger],
+            "delta_npw": float(d_npw),
+            "delta_irr": None if d_irr is None or np.isnan(d_irr) else float(d_irr),
+            "delta_bcr": None if d_bcr is None else float(d_bcr),
+            "tied": bool(tied),
+            "accepted": bool(accepted),
+        })
+        if accepted:
+            defender = challenger
+
+    preferred = alternatives[defender]
+    return (preferred, comparisons) if full_output else preferred
+
+
+def _classify(increment):
+    """ Classifies a simple increment as an "investment" or a "borrowing"
+
+    Returns None for an increment which changes sign more than once, whose
+    IRR does not determine whether it is worthwhile.
+    """
+    signs = np.sign(increment[increment != 0])
+    if len(signs) == 0 or np.count_nonzero(np.diff(signs)) > 1:
+        return None
+    return "investment" if signs[0] < 0 else "borrowing"
 
 
 def dirr_analysis(projects, marr):
     """
     Incremental IRR Analysis
+
+    Retained for compatibility; see incremental_analysis.
     """
-    # Sort from lowest to highest cost
-    sorted_projects = iter(sorted(projects, key=lambda p: -p.npw().amount))
-
-    # Phase 1: Find a defender
-    defender = None
-    try:
-        while candidate := next(sorted_projects):
-            if candidate.irr() > marr:
-                defender = candidate
-                break
-
-        # Phase 2: Perform Incremental IRR Analysis
-        while challenger := next(sorted_projects):
-            inc = lambda i: challenger.npw(i) - defender.npw(i)
-            dirr = fsolve(inc, challenger.interest)  # Not guaranteed to work!
-            if dirr > marr:
-                defender = challenger
-    except StopIteration:
-        return defender
+    return incremental_analysis(projects, marr, criterion="irr")
@@ -0,0 +1,135 @@
+import numpy as np
+
+from ..cashflow import Cashflow
+from ..instrumentation import instrument
+
+
+@instrument("engine")
+def equivalent_annual_costs(capital, salvages, costs, i):
+    """ Computes the Equivalent Annual Cost of an asset for every retention life
+
+    For each life n from 1 to N, the asset is bought for the capital cost,
+    incurs the operating and maintenance cost of each year of age up to n,
+    and is then sold for its salvage value at age n. The present worth of
+    every life is computed at once from a cumulative sum of discounted costs,
+    and converted to an annual cost with the capital recovery factor:
+
+        EAC(n) = [P - S(n) (1 + i)^-n + sum C(k) (1 + i)^-k] (A/P, i, n)
+
+    All amounts are magnitudes, so that costs and salvage values are positive.
+
+    Args:
+        capital: The capital cost (or, for a defender, current market value)
+        salvages: A sequence of salvage values by age, from age 1 to N
+        costs: A sequence of operating costs by age, from age 1 to N, or a
+            Cashflow whose (negative) amounts in periods 1 to N are the costs
+        i: The interest rate, expressed as a decimal
+
+    Returns:
+        A float array of length N, whose element n - 1 is the EAC for a life
+            of n periods
+    """
+    salvages = np.asarray(salvages, dtype=float)
+    ns = np.arange(1, len(salvages) + 1)
+    if isinstance(costs, Cashflow):
+        costs = -costs.amounts_at(ns)
+    costs = np.asarray(costs, dtype=float)
+    if len(costs) != len(salvages):
+        raise ValueError("Salvage values and costs must be given for the same ages")
+
+    discount = (1 + i) ** -ns.astype(float)
+    pws = capital - salvages * discount + np.cumsum(costs * discount)
+    crfs = 1 / ns if i == 0 else i / (1 - discount)
+    return pws * crfs
+
+
+@instrument("engine")
+def economic_life(capital, salvages, costs, i):
+    """ Finds the retention life of least Equivalent Annual Cost
+
+    See equivalent_annual_costs.
+
+    Returns:
+        A tuple of the economic life, in periods, and its EAC
+    """
+    eacs = equivalent_annual_costs(capital, salvages, costs, i)
+    life = int(np.argmin(eacs)) + 1
+    return life, float(eacs[life - 1])
+
+
+def marginal_costs(value, salvages, costs, i):
+    """ Computes the cost of retaining an asset for each additional period
+
+    The marginal cost of keeping an asset from age k - 1 to age k is the
+    return forgone on its salvage value, plus its loss in value, plus its
+    operating cost for the year:
+
+        MC(k) = S(k - 1) (1 + i) - S(k) + C(k)
+
+    Args:
+        value: The salvage value at the start of the first period
+        salvages: A sequence of salvage values for each subsequent period
+        costs: A sequence of operating costs for each subsequent period, or
+            a Cashflow; see equivalent_annual_costs
+        i: The interest rate, expressed as a decimal
+
+    Returns:
+        A float array of marginal costs, one per period
+    """
+    salvages = np.asarray(salvages, dtype=float)
+    if isinstance(costs, Cashflow):
+        costs = -costs.amounts_at(np.arange(1, len(salvages) + 1))
+    costs = np.asarray(costs, dtype=float)
+
+    previous = np.concatenate(([value], salvages[:-1]))
+    return previous * (1 + i) - salvages + costs
+
+
+@instrument("engine")
+def replacement_analysis(
+        defender_value, defender_salvages, defender_costs,
+        challenger_capital, challenger_salvages, challenger_costs, i):
+    """ Compares an existing asset (defender) with a replacement (challenger)
+
+    The challenger is assumed to be replaced at its economic life by an
+    identical challenger, so its minimum EAC is its cost per period forever.
+    The defender should be replaced now if its own minimum EAC, held from its
+    current market value, exceeds the challenger's. Otherwise, it is kept for
+    as long as the marginal cost of retaining it for one more period does not
+    exceed the challenger's minimum EAC.
+
+    Args:
+        defender_value: The current market value of the defender
+        defender_salvages: The defender's salvage values for each remaining
+            period of life
+        defender_costs: The defender's operating costs for each remaining
+            period of life
+        challenger_capital: The capital cost of the challenger
+        challenger_salvages: The challenger's salvage values by age
+        challenger_costs: The challenger's operating costs by age
+        i: The interest rate, expressed as a decimal
+
+    Returns:
+        A dict containing the economic life and EAC of the defender (over its
+        remaining life) and of the challenger, and the number of periods for
+        which the defender should be retained
+    """
+    defender_life, defender_eac = economic_life(
+        defender_value, defender_salvages, defender_costs, i)
+    challenger_life, challenger_eac = economic_life(
+        challenger_capital, challenger_salvages, challenger_costs, i)
+
+    if defender_eac > challenger_eac:
+        retain = 0
+    else:
+        mcs = marginal_costs(defender_value, defender_salvages, defender_costs, i)
+        exceeded = mcs > challenger_eac
+        retain = int(np.argmax(exceeded)) if exceeded.any() else len(mcs)
+
+    return {
+        "defender_life": defender_life,
+        "defender_eac": defender_eac,
+        "challenger_life": challenger_life,
+        "challenger_eac": challenger_eac,
+        "retain": retain,
+    }
@@ -110,7 +110,7 @@ class ScalarAnalysis(ValueAnalysis):
         
         for tag in scalarmap:
             for cashflow in self._project[tag]:
-                cashflow.amount *= scalarmap[tag]
+                self._project.scale_cashflow(cashflow, scalarmap[tag])
     
 class SensitivityAnalysis(ValueAnalysis):
     """ Scalar analysis applied across a sequence of scalars
@@ -0,0 +1,253 @@
+from collections.abc import Mapping
+
+import numpy as np
+
+from ..cashflow import Cashflow, Perpetuity, GeoPerpetuity
+from ..utilities import get_amounts, get_final_period
+from ..valuation.Valuators import irr_batch, payback_periods, tail_worths
+from ..instrumentation import instrument
+
+
+class ScenarioSet:
+    """ Many named scenarios evaluated against a shared base project
+
+    A scenario is defined as an overlay on a base project: a mapping of tags
+    to scalar multipliers, applied to every base cashflow with a matching tag,
+    plus any cashflows added to the project. Scenarios only store their
+    overlay, so the base project is never copied or modified.
+
+    All scenarios are evaluated together. Each cashflow of the base project
+    and of every overlay is evaluated over all periods once, after which the
+    net cashflows of every scenario are a single (sparse) matrix product.
+    Taxes of the base project are applied to each scenario, including any
+    loss carry windows.
+
+    Unlike ScalarAnalysis, which multiplies only the amount of a cashflow,
+    a scalar multiplies every payment of the cashflows it applies to. For
+    example, the gradient G of a Gradient is scaled along with its amount.
+
+    Attributes:
+        project: The base Project instance
+
+    See Also:
+        ScalarAnalysis
+        WhatIfAnalysis
+    """
+
+    METRICS = ("npw", "nfw", "eacf", "irr", "payback", "discounted_payback")
+
+    def __init__(self, project):
+        self._project = project
+        self._names = list()
+        self._scalars = list()  # A dict of tag multipliers per scenario
+        self._additions = list()  # A list of added cashflows per scenario
+
+    def add_scenario(self, name, scalars=None, cashflows=None):
+        """ Adds a named scenario to the set
+
+        Args:
+            name: A unique name for the scenario
+            scalars: Optional; A Mapping or sequence of tag-multiplier pairs.
+                Every payment of a base cashflow with a matching tag is
+                scaled. Base cashflows matching several tags are scaled by
+                each.
+            cashflows: Optional; A Cashflow or sequence of Cashflows added to
+                the base project in this scenario. These are not scaled.
+
+        Returns:
+            The instance of ScenarioSet, allowing for daisy-chaining
+
+        Raises:
+            ValueError: A scenario of the same name already exists
+        """
+        if name in self._names:
+            raise ValueError(f"Scenario '{name}' already exists!")
+        if scalars is None:
+            scalars = dict()
+        elif not isinstance(scalars, Mapping):
+            scalars = {tag: scalar for tag, scalar in scalars}
+        if cashflows is None:
+            cashflows = []
+        elif isinstance(cashflows, Cashflow):
+            cashflows = [cashflows]
+
+        self._names.append(name)
+        self._scalars.append(dict(scalars))
+        self._additions.append(list(cashflows))
+        return self
+
+    def get_scenarios(self):
+        return self._names
+
+    def get_project(self):
+        return self._project
+
+    def get_final_period(self):
+        """ Returns the final finite period across the base and all overlays """
+        cashflows = self._project.get_cashflows() + [
+            cashflow for additions in self._additions for cashflow in additions]
+        return max(
+            get_final_period(cashflows, finite=True),
+            get_final_period(self._project.get_depreciations(), finite=True))
+
+    def net_cashflows(self, after_tax=True):
+        """ Returns the net cashflows of every scenario
+
+        Returns:
+            A two-dimensional float array whose rows correspond to scenarios
+            and whose columns correspond to periods from zero to the final
+            finite period
+        """
+        return self._evaluate(None, after_tax)[0]
+
+    def npw(self, i=None, after_tax=True):
+        """ Returns the Net Present Worth of every scenario as a float array """
+        i = i if i is not None else self._project.interest
+        return self._evaluate(i, after_tax)[1]
+
+    @instrument("engine")
+    def evaluate(self, metrics=None, i=None, after_tax=True):
+        """ Valuates every scenario at once
+
+        Args:
+            metrics: Optional; A sequence of metric names, drawn from METRICS.
+                Defaults to all metrics. NFW and EACF are taken at (and over)
+                the final finite period. The IRR includes the payments of
+                perpetuities beyond it, as Project.irr does.
+            i: Optional; The interest rate. Defaults to that of the project
+            after_tax: Optional; If true, taxes are applied
+
+        Returns:
+            A Pandas DataFrame of floats indexed by scenario name, with a
+            column per metric
+
+        Raises:
+            ValueError: A metric was not recognized
+        """
+        import pandas as pd
+
+        metrics = [metric.lower() for metric in (metrics or self.METRICS)]
+        if unknown := [metric for metric in metrics if metric not in self.METRICS]:
+            raise ValueError(f"Unrecognized metrics: {unknown}")
+
+        i = i if i is not None else self._project.interest
+        ncfs, npws, tail_worth = self._evaluate(i, after_tax)
+        nf = ncfs.shape[1] - 1
+
+        columns = dict()
+        for metric in metrics:
+            if metric == "npw":
+                columns[metric] = npws
+            elif metric == "nfw":
+                columns[metric] = npws * (1 + i) ** nf
+            elif metric == "eacf":
+                crf = 1 / nf if i == 0 else i * (1 + i) ** nf / ((1 + i) ** nf - 1)
+                columns[metric] = npws * crf
+            elif metric == "irr":
+                columns[metric] = irr_batch(ncfs, tails=tail_worth)
+            elif metric == "payback":
+                columns[metric] = payback_periods(ncfs)
+            elif metric == "discounted_payback":
+                columns[metric] = payback_periods(ncfs, i)
+
+        return pd.DataFrame(columns, index=pd.Index(self._names, name="Scenario"))
+
+    def _evaluate(self, i, after_tax):
+        """ Computes the net cashflows of all scenarios
+
+        Returns:
+            A tuple of the net cashflows, the NPWs if i is given (or else
+            None), and a function of an interest rate per scenario returning
+            the present worth of the perpetuities of each scenario beyond the
+            final finite period, for irr_batch
+        """
+        from scipy.sparse import csr_matrix
+
+        base = self._project.get_cashflows()
+        added = [cashflow for additions in self._additions for cashflow in additions]
+        rows = base + added
+        ns = np.arange(self.get_final_period() + 1)
+        amounts = get_amounts(rows, ns)
+
+        # Scenario weights of each row, as the ones of the base project plus
+        # a sparse overlay of differences
+        tagged_rows = dict()
+        for r, cashflow in enumerate(base):
+            for tag in set(cashflow.tags):
+                tagged_rows.setdefault(tag, []).append(r)
+
+        entries, scenario_idx, row_idx = [], [], []
+        offset = len(base)
+        for s, (scalars, additions) in enumerate(zip(self._scalars, self._additions)):
+            multipliers = dict()
+            for tag, scalar in scalars.items():
+                for r in tagged_rows.get(tag, []):
+                    multipliers[r] = multipliers.get(r, 1.0) * scalar
+            for r, multiplier in multipliers.items():
+                if multiplier != 1:
+                    entries.append(multiplier - 1)
+                    scenario_idx.append(s)
+                    row_idx.append(r)
+            for r in range(offset, offset + len(additions)):
+                entries.append(1.0)
+                scenario_idx.append(s)
+                row_idx.append(r)
+            offset += len(additions)
+        overlay = csr_matrix(
+            (entries, (scenario_idx, row_idx)), shape=(len(self._names), len(rows)))
+        in_base = np.zeros(len(rows))
+        in_base[:len(base)] = 1
+
+        def weigh(values, mask=None):
+            """ Sums values over the rows of each scenario """
+            mask = np.ones(len(rows), dtype=bool) if mask is None else mask
+            weighted = overlay[:, mask] @ values[mask]
+            return np.asarray(weighted) + in_base[mask] @ values[mask]
+
+        ncfs = weigh(amounts)
+        if i is not None:
+            discount = (1 + i) ** -ns.astype(float)
+            tail_pvs = np.array([_tail_pv(cashflow, i, ns[-1]) for cashflow in rows])
+            npws = ncfs @ discount + weigh(tail_pvs)
+
+        if after_tax:
+            depreciations = self._project.get_depreciations()
+            for tax in self._project.get_taxes():
+                taxed = np.array([tax.get_tag() in cashflow.tags for cashflow in rows], dtype=bool)
+                shields = [dp for dp in depreciations if tax.get_tag() in dp.tags]
+                income = weigh(amounts, taxed) if taxed.any() else np.zeros(ncfs.shape)
+                if shields:
+                    income = income - get_amounts(shields, ns).sum(axis=0)
+                taxes = tax.assess(income)
+                ncfs = ncfs + taxes
+                if i is not None:
+                    npws = npws + taxes @ discount
+                    if taxed.any():
+                        npws = npws + weigh(tail_pvs, taxed) * tax.get_rate()
+
+        # The tails of perpetuities, taxed as in the NPWs above
+        perpetual = np.array(
+            [isinstance(cashflow, (Perpetuity, GeoPerpetuity)) for cashflow in rows], dtype=bool)
+        perpetuities = [rows[r] for r in np.flatnonzero(perpetual)]
+        tax_rates = np.zeros(len(perpetuities))
+        if after_tax:
+            for tax in self._project.get_taxes():
+                tax_rates += tax.get_rate() * np.array(
+                    [tax.get_tag() in cashflow.tags for cashflow in perpetuities], dtype=float)
+        weights = (np.asarray(overlay[:, perpetual].todense()) + in_base[perpetual]) * (1 + tax_rates)
+        perpetuity_amounts = np.array([cashflow.amount for cashflow in perpetuities])
+        g = np.array([getattr(cashflow, "g", 0.0) for cashflow in perpetuities])
+        d0 = np.array([cashflow.d[0] for cashflow in perpetuities])
+
+        def tail_worth(rates):
+            worths = tail_worths(perpetuity_amounts, g, d0, ns[-1], np.asarray(rates)[:, None])
+            return np.where(weights != 0, weights * worths, 0.0).sum(axis=1)
+
+        return ncfs, (npws if i is not None else None), tail_worth
+
+
+def _tail_pv(cashflow, i, n):
+    """ Returns the present worth of the payments a cashflow makes after n """
+    if isinstance(cashflow, (Perpetuity, GeoPerpetuity)):
+        return cashflow.tail_pv(i, n).amount
+    return 0.0
@@ -1,3 +1,7 @@
+from ..instrumentation import instrument
+
+
+@instrument("engine")
 def sensitivity_analysis(project, factors, cf_tags=None, valuator=None):
     valuator = valuator or project.npw
     cf_tags = cf_tags or [cf.get_title() for cf in project.get_cashflows()]
@@ -1,27 +1,28 @@
 from numpy.random import standard_normal
 from numbers import Number
+from os import makedirs
+from os.path import join
 
+from .SimulationResult import SimulationResult
+from ..instrumentation import instrument
 
+
+@instrument("engine")
 def simulation_analysis(project, sim_dict, iterations=250, valuator=None):
     """
     Purpose:
         Analyses the effects of uncertainty of a system by performing a Monte Carlo simulation.
     Args:
         project:    An instance of Project to perform the simulation on
-        sim_dict:   A dict where the key is the name of the cashflow to simulate and the value 
-                    is either a number defining the standard deviation for the cashflow as a percentage, or a 
+        sim_dict:   A dict where the key is the name of the cashflow to simulate and the value
+                    is either a number defining the standard deviation for the cashflow as a percentage, or a
                     function defining some way to modify the cashflow by an amount
+        iterations: Optional; The number of iterations to simulate
+        valuator:   Optional; A callable returning a number or Cashflow. Defaults to project.npw
+    Returns:
+        A SimulationResult of the valuation of each iteration
     """
-
-    # Make every sim_fun value a callable, converting numbers to stdev functions
-    for key in sim_dict:
-        if isinstance(sim_dict[key], Number):
-            stdev = sim_dict[key]
-
-            def std_dist(amt):
-                return amt * stdev * standard_normal()
-
-            sim_dict[key] = std_dist
+    sim_dict = _parse_sim_dict(sim_dict)
 
     valuator = valuator or project.npw
     if not callable(valuator):
@@ -31,12 +32,88 @@ def simulation_analysis(project, sim_dict, iterations=250, valuator=None):
     valuations = []
     for _ in range(iterations):
         with project as p:
-            for key in sim_dict:
-                sim_fun = sim_dict[key]
-                n_cashflows = len(p[key])
-                for n in range(n_cashflows):
-                    cf = p[key][n]
-                    cf.amount += sim_fun(cf.amount)
+            _perturb(p, sim_dict)
             valuations.append(valuator())
 
-    return valuations
+    return SimulationResult(valuations, f"Simulation of {project.title}")
+
+
+@instrument("engine")
+def simulate_paths(
+        project, sim_dict, iterations, directory, valuator=None, after_tax=True,
+        chunksize=1000):
+    """ Performs a Monte Carlo simulation, storing every path on disk
+
+    As simulation_analysis, but also records the net cashflows of every
+    iteration. The net cashflows and valuations are written to the files
+    paths.npy and valuations.npy in a directory, one chunk of iterations at a
+    time, so that memory use is bounded by the chunk size rather than the
+    number of iterations.
+
+    Args:
+        project: An instance of Project to perform the simulation on
+        sim_dict: See simulation_analysis
+        iterations: The number of iterations to simulate
+        directory: The directory to write to, which is created if needed.
+            Existing results in the directory are overwritten.
+        valuator: Optional; A callable returning a number or Cashflow.
+            Defaults to project.npw
+        after_tax: Optional; If true, the recorded net cashflows are after tax
+        chunksize: Optional; The number of iterations held in memory at once
+
+    Returns:
+        A SimulationPaths instance reading the directory
+    """
+    import numpy as np
+    from .SimulationPaths import SimulationPaths
+
+    sim_dict = _parse_sim_dict(sim_dict)
+    valuator = valuator or project.npw
+    if not callable(valuator):
+        raise TypeError("Valuator must be a callable construct!")
+
+    nf = project.get_final_period(finite=True)
+    makedirs(directory, exist_ok=True)
+    paths = np.lib.format.open_memmap(
+        join(directory, SimulationPaths.PATHS), mode="w+", shape=(iterations, nf + 1))
+    valuations = np.lib.format.open_memmap(
+        join(directory, SimulationPaths.VALUATIONS), mode="w+", shape=(iterations,))
+
+    for start in range(0, iterations, chunksize):
+        stop = min(start + chunksize, iterations)
+        path_chunk = np.empty((stop - start, nf + 1))
+        valuation_chunk = np.empty(stop - start)
+        for k in range(stop - start):
+            with project as p:
+                _perturb(p, sim_dict)
+                path_chunk[k] = p.net_cashflows(nf, after_tax)
+                valuation = valuator()
+                valuation_chunk[k] = getattr(valuation, "amount", valuation)
+        paths[start:stop] = path_chunk
+        valuations[start:stop] = valuation_chunk
+        paths.flush()
+        valuations.flush()
+
+    del paths, valuations  # Closes the memory maps
+    return SimulationPaths(directory)
+
+
+def _parse_sim_dict(sim_dict):
+    """ Makes every sim_fun value a callable, converting numbers to stdev functions """
+    sim_dict = dict(sim_dict)  # Leaves the caller's dict unchanged
+    for key in sim_dict:
+        if isinstance(sim_dict[key], Number):
+
+            def std_dist(amt, stdev=sim_dict[key]):
+                return amt * stdev * standard_normal()
+
+            sim_dict[key] = std_dist
+    return sim_dict
+
+
+def _perturb(project, sim_dict):
+    """ Modifies the amount of each simulated cashflow by its sim_fun """
+    for key in sim_dict:
+        sim_fun = sim_dict[key]
+        for cf in project[key]:
+            cf.amount += sim_fun(cf.amount)
@@ -0,0 +1,172 @@
+from os.path import join
+
+import numpy as np
+
+
+class SimulationPaths:
+    """ Simulated net cashflows and valuations stored on disk
+
+    Reads the results written by simulate_paths as memory-mapped arrays: a
+    two-dimensional array of net cashflows, whose rows correspond to
+    iterations and whose columns correspond to periods, and an array of the
+    valuation of each iteration.
+
+    Statistics are computed in streaming passes over chunks of iterations,
+    so that memory use is bounded regardless of the number of iterations.
+    Percentiles are found from a fine histogram of each period, so they are
+    accurate to within a bin width; histograms themselves are exact.
+    Iterations whose values are NaN (e.g. an undefined IRR) are ignored.
+
+    Attributes:
+        directory: The directory containing paths.npy and valuations.npy
+
+    See Also:
+        simulate_paths
+    """
+
+    PATHS = "paths.npy"
+    VALUATIONS = "valuations.npy"
+    CHUNK_ELEMENTS = 2 ** 22  # Array elements read per streaming chunk
+
+    def __init__(self, directory):
+        self._directory = directory
+        self._paths = np.load(join(directory, self.PATHS), mmap_mode="r")
+        self._valuations = np.load(join(directory, self.VALUATIONS), mmap_mode="r")
+
+    @property
+    def directory(self):
+        return self._directory
+
+    @property
+    def iterations(self):
+        return len(self._valuations)
+
+    def get_paths(self):
+        return self._paths
+
+    def get_valuations(self):
+        return self._valuations
+
+    def percentiles(self, qs, bins=4096):
+        """ Returns percentiles of the valuations
+
+        Args:
+            qs: A percentile or sequence of percentiles, from 0 to 100
+            bins: Optional; The resolution of the underlying histogram
+
+        Returns:
+            A float or float array of percentiles, matching qs
+        """
+        result = streaming_percentiles(self._valuations, qs, bins, self.CHUNK_ELEMENTS)
+        return result[..., 0]
+
+    def histogram(self, bins=50):
+        """ Returns a histogram of the valuations
+
+        Returns:
+            A tuple of an integer array of counts and a float array of the
+            bins + 1 bin edges, as numpy.histogram
+        """
+        lo, hi = streaming_range(self._valuations, self.CHUNK_ELEMENTS)
+        counts = streaming_histogram(self._valuations, bins, lo, hi, self.CHUNK_ELEMENTS)
+        return counts[0], np.linspace(lo[0], hi[0], bins + 1)
+
+    def fan_chart(self, qs=(5, 25, 50, 75, 95), bins=4096):
+        """ Returns percentiles of the net cashflow in every period
+
+        Returns:
+            A float array whose rows correspond to qs and whose columns
+            correspond to periods
+        """
+        return streaming_percentiles(self._paths, qs, bins, self.CHUNK_ELEMENTS)
+
+    def to_fan_chart(self, qs=(5, 25, 50, 75, 95), scale=None, size=None):
+        """ Plots a fan chart of the net cashflow in every period
+
+        Returns:
+            The Figure and Axis objects generated
+        """
+        from ..output import generate_fan_chart
+
+        fig, ax = generate_fan_chart(self.fan_chart(qs), qs, scale=scale)
+        if size:
+            fig.set_size_inches(size)
+        return fig, ax
+
+
+def _chunks(array, chunk_elements):
+    """ Yields two-dimensional chunks of consecutive rows of an array """
+    array = array.reshape(len(array), -1)
+    rows = max(1, chunk_elements // max(1, array.shape[1]))
+    for start in range(0, len(array), rows):
+        yield np.asarray(array[start:start + rows], dtype=float)
+
+
+def streaming_range(array, chunk_elements=2 ** 22):
+    """ Returns the minimum and maximum of each column, ignoring NaNs """
+    width = int(np.prod(array.shape[1:]))
+    lo, hi = np.full(width, np.inf), np.full(width, -np.inf)
+    for chunk in _chunks(array, chunk_elements):
+        with np.errstate(invalid="ignore"):
+            lo = np.fmin(lo, np.nanmin(chunk, axis=0, initial=np.inf))
+            hi = np.fmax(hi, np.nanmax(chunk, axis=0, initial=-np.inf))
+    return lo, hi
+
+
+def streaming_histogram(array, bins, lo, hi, chunk_elements=2 ** 22):
+    """ Counts the values of each column in equal bins between lo and hi
+
+    Returns:
+        An integer array whose rows correspond to columns of the array, and
+        whose columns correspond to bins
+    """
+    width = len(lo)
+    span = np.where(hi > lo, hi - lo, 1.0)
+    counts = np.zeros(width * bins, dtype=np.int64)
+    offsets = np.arange(width) * bins
+    for chunk in _chunks(array, chunk_elements):
+        valid = ~np.isnan(chunk)
+        with np.errstate(invalid="ignore"):
+            idx = np.floor((chunk - lo) / span * bins)
+        idx = np.clip(np.nan_to_num(idx), 0, bins - 1).astype(np.int64) + offsets
+        counts += np.bincount(idx[valid], minlength=width * bins)
+    return counts.reshape(width, bins)
+
+
+def streaming_percentiles(array, qs, bins=4096, chunk_elements=2 ** 22):
+    """ Approximates percentiles of each column in two streaming passes
+
+    The first pass finds the range of each column, and the second counts its
+    values in a fine histogram. The order statistics either side of each
+    percentile's rank are located within their bins and interpolated between,
+    as numpy.percentile does, so percentiles are accurate to within a bin width.
+
+    Returns:
+        A float array whose rows correspond to qs (or a one-dimensional array,
+        if qs is a number) and whose columns correspond to columns of the array
+    """
+    scalar = np.ndim(qs) == 0
+    qs = np.atleast_1d(np.asarray(qs, dtype=float))
+
+    lo, hi = streaming_range(array, chunk_elements)
+    counts = streaming_histogram(array, bins, lo, hi, chunk_elements)
+    totals = counts.sum(axis=1)
+    cumulative = np.cumsum(counts, axis=1)
+    widths = np.where(hi > lo, hi - lo, 0.0) / bins
+
+    def order_statistic(col, k):
+        """ Estimates the k-th smallest value of a column """
+        b = min(int(np.searchsorted(cumulative[col], k, side="right")), bins - 1)
+        before = cumulative[col, b - 1] if b > 0 else 0
+        fraction = (k - before + 0.5) / counts[col, b]
+        return lo[col] + (b + min(max(fraction, 0.0), 1.0)) * widths[col]
+
+    result = np.full((len(qs), len(lo)), np.nan)
+    for row, q in enumerate(qs):
+        ranks = q / 100 * (totals - 1)
+        for col in np.flatnonzero(totals):
+            k = int(np.floor(ranks[col]))
+            below = order_statistic(col, k)
+            above = order_statistic(col, min(k + 1, totals[col] - 1))
+            result[row, col] = below + (ranks[col] - k) * (above - below)
+    return result[0] if scalar else result
@@ -0,0 +1,204 @@
+from functools import cached_property
+from numbers import Number
+
+import numpy as np
+
+
+class SimulationResult:
+    """ The valuations produced by a Monte Carlo simulation
+
+    Stores one valuation per iteration as a float array, and provides the
+    statistics commonly drawn from a simulation. Each statistic is computed
+    once and cached; percentile-based statistics share a single sorted copy
+    of the valuations, after which each costs a constant-time lookup.
+
+    Risk metrics treat the valuations as a worth, such as NPW, so that losses
+    are negative valuations. Iterations with NaN valuations (e.g. an undefined
+    IRR) are excluded from every statistic.
+
+    SimulationResult may also be used as a sequence of the valuations, as
+    the valuator returned them. simulation_analysis formerly returned a list
+    of these valuations, e.g. of Present instances by default, so code
+    reading the amount of each element keeps working. get_valuations(), and
+    NumPy functions, see the valuations as floats.
+
+    Attributes:
+        valuations: A sequence of numbers or Cashflows, one per iteration
+        title: Optional; A human-readable description of the simulation
+
+    See Also:
+        simulation_analysis
+    """
+
+    def __init__(self, valuations, title=None):
+        valuations = list(valuations)
+        self._valuations = np.array(
+            [getattr(valuation, "amount", valuation) for valuation in valuations],
+            dtype=float)
+        # The valuations as returned, if they were not all plain numbers
+        self._items = None if all(
+            [isinstance(valuation, Number) for valuation in valuations]) else valuations
+        self._valuations.setflags(write=False)
+        self._title = title
+        self._histograms = dict()
+
+    @property
+    def title(self):
+        return self._title or f"Simulation of {len(self)} iterations"
+
+    def get_valuations(self):
+        return self._valuations
+
+    @cached_property
+    def _sorted(self):
+        """ The non-NaN valuations in ascending order """
+        valuations = np.sort(self._valuations[~np.isnan(self._valuations)])
+        valuations.setflags(write=False)
+        return valuations
+
+    @cached_property
+    def mean(self):
+        return float(self._sorted.mean()) if len(self._sorted) else np.nan
+
+    @cached_property
+    def stdev(self):
+        """ The sample standard deviation of the valuations """
+        return float(self._sorted.std(ddof=1)) if len(self._sorted) > 1 else np.nan
+
+    @cached_property
+    def p_loss(self):
+        """ The probability that the valuation is negative, i.e. P(NPW < 0) """
+        return self.cdf(0.0, inclusive=False) if len(self._sorted) else np.nan
+
+    @cached_property
+    def _cumulative(self):
+        """ Cumulative sums of the sorted valuations, for CVaR """
+        return np.concatenate(([0.0], np.cumsum(self._sorted)))
+
+    def percentiles(self, qs):
+        """ Returns percentiles of the valuations
+
+        Percentiles are linearly interpolated between valuations, as
+        numpy.percentile does.
+
+        Args:
+            qs: A percentile or sequence of percentiles, from 0 to 100
+
+        Returns:
+            A float or float array of percentiles, matching qs
+        """
+        if not len(self._sorted):
+            return np.full(np.shape(qs), np.nan)[()]
+        ranks = np.asarray(qs, dtype=float) / 100 * (len(self._sorted) - 1)
+        result = np.interp(ranks, np.arange(len(self._sorted)), self._sorted)
+        return float(result) if np.ndim(result) == 0 else result
+
+    def var(self, confidence=0.95):
+        """ Returns the Value at Risk of the valuations
+
+        The Value at Risk is the loss which is exceeded with probability of
+        only 1 - confidence, i.e. the negative of the (1 - confidence)
+        quantile of the valuations.
+        """
+        return -self.percentiles(100 * (1 - np.asarray(confidence, dtype=float)))
+
+    def cvar(self, confidence=0.95):
+        """ Returns the Conditional Value at Risk of the valuations
+
+        The Conditional Value at Risk (or expected shortfall) is the mean loss
+        over the worst 1 - confidence of iterations.
+        """
+        confidence = np.asarray(confidence, dtype=float)
+        if not len(self._sorted):
+            return np.full(confidence.shape, np.nan)[()]
+        tail = np.ceil(np.round((1 - confidence) * len(self._sorted), 9))
+        tail = np.maximum(tail, 1).astype(int)
+        result = -self._cumulative[tail] / tail
+        return float(result) if np.ndim(result) == 0 else result
+
+    def cdf(self, x, inclusive=True):
+        """ Returns the empirical cumulative probability of the valuations
+
+        Args:
+            x: A valuation or sequence of valuations
+            inclusive: Optional; If true, P(V <= x) is returned, else P(V < x)
+
+        Returns:
+            A float or float array of probabilities, matching x
+        """
+        side = "right" if inclusive else "left"
+        result = np.searchsorted(self._sorted, x, side=side) / max(len(self._sorted), 1)
+        return float(result) if np.ndim(result) == 0 else result
+
+    def histogram(self, bins=50):
+        """ Returns a histogram of the valuations
+
+        Returns:
+            A tuple of an integer array of counts and a float array of the
+            bin edges, as numpy.histogram
+        """
+        key = bins if np.ndim(bins) == 0 else tuple(bins)
+        if key not in self._histograms:
+            self._histograms[key] = np.histogram(self._sorted, bins)
+        return self._histograms[key]
+
+    def summary(self, confidence=0.95):
+        """ Returns the principal statistics as a dict """
+        return {
+            "mean": self.mean,
+            "stdev": self.stdev,
+            "min": float(self._sorted[0]) if len(self._sorted) else np.nan,
+            "median": self.percentiles(50),
+            "max": float(self._sorted[-1]) if len(self._sorted) else np.nan,
+            "var": self.var(confidence),
+            "cvar": self.cvar(confidence),
+            "p_loss": self.p_loss,
+        }
+
+    def to_histogram(self, bins=50, scale=None, size=None):
+        """ Plots a histogram of the valuations
+
+        Args:
+            bins: Optional; The number of bins, or a sequence of bin edges
+            scale: Optional; The x-axis scale; must be a member or key of Scales
+            size: Optional; The size of the output plot, in inches
+
+        Returns:
+            The Figure and Axis objects generated
+        """
+        from ..output import generate_histogram
+
+        counts, edges = self.histogram(bins)
+        fig, ax = generate_histogram(counts, edges, scale=scale, title=self.title)
+        if size:
+            fig.set_size_inches(size)
+        return fig, ax
+
+    def to_cdf(self, scale=None, size=None):
+        """ Plots the cumulative distribution of the valuations """
+        from ..output import generate_cdf
+
+        probabilities = np.arange(1, len(self._sorted) + 1) / max(len(self._sorted), 1)
+        fig, ax = generate_cdf(self._sorted, probabilities, scale=scale, title=self.title)
+        if size:
+            fig.set_size_inches(size)
+        return fig, ax
+
+    def __len__(self):
+        return len(self._valuations)
+
+    def __getitem__(self, val):
+        if self._items is None:
+            return self._valuations[val]
+        return self._items[val]
+
+    def __iter__(self):
+        return iter(self._valuations if self._items is None else self._items)
+
+    def __array__(self, dtype=None, copy=None):
+        return self._valuations if dtype is None else self._valuations.astype(dtype)
+
+    def __repr__(self):
+        return (
+            f"SimulationResult({len(self)} iterations, mean={self.mean:,.2f}, "
+            f"stdev={self.stdev:,.2f})")
@@ -5,6 +5,28 @@ from .ScalarAnalysis import (
     WhatIfAnalysis,
     SensitivityAnalysis,
 )
+from .ScenarioAnalysis import ScenarioSet
 
-from .SimulationAnalysisEngine import simulation_analysis
+from .SimulationAnalysisEngine import simulation_analysis, simulate_paths
+from .SimulationPaths import SimulationPaths
+from .SimulationResult import SimulationResult
 from .SensitivityAnalysisEngine import sensitivity_analysis
+from .IncrementalAnalysisEngine import incremental_analysis
+from .CapitalBudgetingEngine import (
+    capital_budgeting,
+    select_portfolio,
+    portfolio_frontier,
+)
+from .BreakEvenAnalysisEngine import break_even_analysis
+from .ReplacementAnalysisEngine import (
+    equivalent_annual_costs,
+    economic_life,
+    replacement_analysis,
+)
+from .DecisionTreeEngine import (
+    DecisionTree,
+    DecisionNode,
+    ChanceNode,
+    TerminalNode,
+    binomial_lattice,
+)
@@ -1,8 +1,10 @@
 from abc import ABC, abstractmethod
 from enum import Enum
 from collections.abc import Iterable
-from ..utilities import parse_ns
+from ..utilities import parse_ns, as_periods
+from ..instrumentation import instrument_methods
 from numbers import Number
+import numpy as np
 
 class Cashflow(ABC):
     """ Representation of a cash transfer
@@ -20,6 +22,18 @@ class Cashflow(ABC):
 
     CURRENCY_FMT_STR = "${:,.2f}"
     cashflow_id = 1  # Unique ID for each cashflow
+    INSTRUMENTED = ("amounts_at", "to_pv", "to_fv", "to_av")
+
+    def __init_subclass__(cls, **kwargs):
+        """ Instruments the conversions and evaluations a subclass defines
+
+        When profiling, calls are counted and timed per Cashflow type.
+
+        See Also:
+            PyEEA.instrumentation
+        """
+        super().__init_subclass__(**kwargs)
+        instrument_methods(cls, Cashflow.INSTRUMENTED, "cashflow")
 
     def __init__(self, amount, title=None, tags=None):
         """ Creates a new Cashflow instance
@@ -73,6 +87,26 @@ class Cashflow(ABC):
         """
         pass
 
+    def amounts_at(self, ns):
+        """ Gets the amounts transferred at one or multiple periods
+
+        Vectorized counterpart to cashflow_at(). Rather than constructing a
+        Future instance for every period, the amounts are returned directly
+        as an array of floats, with zeros in periods where the Cashflow is
+        inactive. Children should override this method with a closed-form
+        implementation wherever one is available; the default falls back
+        on cashflow_at() one period at a time.
+
+        Args:
+            ns: An integer or sequence of integers representing periods
+
+        Returns:
+            A one-dimensional NumPy array of amounts, one per period in ns
+        """
+        ns = as_periods(ns)
+        return np.array(
+            [self.cashflow_at((n,)).amount for n in ns.tolist()], dtype=float)
+
     @abstractmethod
     def to_pv(self, i):
         """ Converts this Cashflow to an equivalent Present cashflow
@@ -140,7 +174,6 @@ class Cashflow(ABC):
         self._tags[0] = self.title  # Position zero contains the title
 
     def get_title(self):
-        print("")
         return self.title
 
     @property
@@ -225,6 +258,9 @@ class Cashflow(ABC):
         return cls.__name__
 
 
+instrument_methods(Cashflow, Cashflow.INSTRUMENTED, "cashflow")  # The subclass hook skips the base
+
+
 class NullCashflow(Cashflow):
     """ A cash transfer of value zero
     
@@ -263,6 +299,10 @@ class NullCashflow(Cashflow):
     def cashflow_at(self, n):
         """ See base class """
         return self
+
+    def amounts_at(self, ns):
+        """ See base class """
+        return np.zeros(as_periods(ns).shape)
     
     def __repr__(self):
         info = ('N',)  # Explicitly indicates that Cashflow is null
@@ -1,7 +1,8 @@
 from math import log, copysign
 from . import Cashflow, NullCashflow
 from . import Present, Future, Annuity
-from ..utilities import parse_d
+from ..utilities import parse_d, as_periods
+import numpy as np
 
 
 class LearningCurve(Annuity):
@@ -50,6 +51,18 @@ class LearningCurve(Annuity):
                 cashflows.append(NullCashflow())
         return cashflows[0] if len(cashflows) == 1 else cashflows
 
+    def amounts_at(self, ns):
+        ns = as_periods(ns)
+        active = self.is_active(ns)
+        years = np.where(active, ns - self.d[0], 1)
+        amounts = self.amount * years.astype(float) ** self.b
+
+        if self.final_amount is not None:
+            dirn = copysign(1.0, self.final_amount - self.amount)
+            amounts = np.where(
+                dirn * (amounts - self.amount) < 0, self.final_amount, amounts)
+        return np.where(active, amounts, 0.0)
+
     def to_pv(self, i):
         pv = sum([cf_n.to_pv(i) for cf_n in self[self.d[0] : self.d[1] + 1]])
         return Present(pv.amount, self.title, self.tags)
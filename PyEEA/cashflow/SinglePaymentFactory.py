@@ -1,7 +1,8 @@
 from .Cashflow import Cashflow, NullCashflow
 from .UniformSeriesFactory import Annuity
-from ..utilities import parse_d
+from ..utilities import parse_d, as_periods
 from numbers import Number
+import numpy as np
 
 
 class Future(Cashflow):
@@ -37,6 +38,10 @@ class Future(Cashflow):
         cfs = [self if self.n == n else NullCashflow() for n in ns]
         return cfs[0] if len(cfs) == 1 else cfs
 
+    def amounts_at(self, ns):
+        """ See base class """
+        return np.where(as_periods(ns) == self.n, self.amount, 0.0)
+
     def to_pv(self, i):
         """ See base class """
         present_worth_factor = (1 + i) ** -self.n
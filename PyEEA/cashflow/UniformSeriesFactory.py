@@ -1,7 +1,8 @@
 from .Cashflow import Cashflow, NullCashflow
 from . import SinglePaymentFactory as sp
-from ..utilities import parse_d
+from ..utilities import parse_d, as_periods
 from math import inf
+import numpy as np
 
 class Annuity(Cashflow):
     """ A recurring uniform payment
@@ -46,6 +47,15 @@ class Annuity(Cashflow):
                 cashflows.append(NullCashflow())
         return cashflows[0] if len(ns) == 1 else cfs
 
+    def amounts_at(self, ns):
+        """ See base class """
+        ns = as_periods(ns)
+        return np.where(self.is_active(ns), self.amount, 0.0)
+
+    def is_active(self, ns):
+        """ Returns a boolean mask of the periods in which payments are made """
+        return (self.d[0] < ns) & (ns <= self.d[1])
+
     def to_pv(self, i):
         """ See base class """
         if i == 0:
@@ -139,6 +149,11 @@ class Gradient(Annuity):
                 cfs.append(NullCashflow())
         return cfs[0] if len(cfs) == 1 else cfs
 
+    def amounts_at(self, ns):
+        ns = as_periods(ns)
+        fvs = self.amount + self.G * (ns - self.d[0] - 1)
+        return np.where(self.is_active(ns), fvs, 0.0)
+
     def to_pv(self, i):
         # Annual Present Worth Factor
         apwf = self.D if i == 0 else ((1 + i) ** self.D - 1) / (i * (1 + i) ** self.D)
@@ -154,7 +169,7 @@ class Gradient(Annuity):
         if self.d[0] == 0:  # Requested gradient is equivalet to this instance
             return sp.Present(pv, self.title, self.tags)
         else:  # The gradient starts at n > 0, so we need to convert a "future present value" to a present value
-            return sp.Future(pv, d[0], self.title, self.tags).to_pv(i)
+            return sp.Future(pv, self.d[0], self.title, self.tags).to_pv(i)
 
     def to_fv(self, i, n):
         return self.to_pv(i).to_fv(i, n)
@@ -188,6 +203,12 @@ class Geometric(Annuity):
                 cfs.append(NullCashflow())
         return cfs[0] if len(cfs) == 1 else cfs
 
+    def amounts_at(self, ns):
+        ns = as_periods(ns)
+        active = self.is_active(ns)
+        years = np.where(active, ns - self.d[0] - 1, 0)
+        return np.where(active, self.amount * (1 + self.g) ** years, 0.0)
+
     def to_pv(self, i):
         if i == self.g:
             xv = self.amount * self.D * (1 + i) ** -1
@@ -257,19 +278,45 @@ class Perpetuity(Annuity):
     def to_av(self, i, d):
         return self.to_pv(i).to_av(i, d)
 
+    def tail_pv(self, i, n):
+        """ Converts the payments made after period n to a Present
+
+        Computes the present worth of every payment made in periods n + 1
+        onwards in closed form. This is used to value the infinite tail of a
+        Perpetuity beyond some finite horizon, for example by TaxCashflow.
+
+        Args:
+            i: The decimal interest rate to be applied in the conversion
+            n: The final period excluded from the tail
+
+        Returns:
+            Present
+        """
+        n = max(n, self.d[0])
+        xv = self.amount / i * (1 + i) ** -n
+        return sp.Present(xv, self.title, self.tags)
+
 
 class GeoPerpetuity(Geometric):
     def __init__(self, amount, g, d0=0, title=None, tags=None):
         super().__init__(amount, g, [d0, inf], title, tags)
 
     def to_pv(self, i):
+        return self.tail_pv(i, self.d[0])
+
+    def tail_pv(self, i, n):
+        """ Converts the payments made after period n to a Present
+
+        See Perpetuity.tail_pv(). The payment in period n + 1 has grown by
+        a factor of (1 + g) for every period elapsed since the first payment,
+        after which the tail is a standard geometric perpetuity.
+        """
         if i <= self.g:
             raise ValueError(
-                "Geometric Perpetuity rate (g) must be greater than the interest rate (i)!"
+                "Interest rate (i) must be greater than the Geometric Perpetuity rate (g)!"
             )
 
-        xv = self.amount / (i - self.g)
-        if self.d[0] > 0:
-            return sp.Future(xv, n, self.title, self.tags)
-        else:
-            return sp.Present(xv, self.title, self.tags)
+        n = max(n, self.d[0])
+        first_amount = self.amount * (1 + self.g) ** (n - self.d[0])
+        xv = first_amount / (i - self.g) * (1 + i) ** -n
+        return sp.Present(xv, self.title, self.tags)
@@ -0,0 +1,208 @@
+""" Opt-in counters and timers for profiling valuations
+
+Functions and methods of interest are marked with @instrument, and their
+calls are counted and timed while a Profiler is active:
+
+    with Profiler() as profiler:
+        project.irr()
+    print(profiler.format_report())
+
+Calls are grouped by category and label. The categories used are:
+
+    cashflow: Conversions (to_pv, to_fv, to_av) and evaluations
+        (amounts_at) of each Cashflow type, labelled by the type
+    depreciation: Evaluations of each Depreciation type
+    taxation: Taxflow generation and tax assessment
+    project: Project methods, such as entering its context (which
+        deep-copies its cashflows) and computing net cashflows
+    valuator: Valuation functions and Project valuation methods
+    solver: Evaluations made by numerical solvers, e.g. fsolve in irr
+    engine: Analysis engines, such as simulation_analysis
+    portfolio: Vectorized Portfolio valuations
+
+Times are inclusive of nested instrumented calls: the time of Project.irr
+includes that of the irr valuator, and of every to_pv it calls. Recursive
+calls under the same label are counted, but timed only at the outermost.
+
+When no Profiler is active, a call of a function marked with @instrument
+costs one extra function call and a global lookup. Methods called too often
+for that, such as the conversions of cashflows, are instead registered with
+instrument_methods, and are wrapped only while a Profiler is active, so they
+cost nothing otherwise. Profiling is process-wide and is not intended for
+use from several threads at once.
+"""
+from collections import defaultdict
+from functools import wraps
+from time import perf_counter
+
+_profiler = None  # The active Profiler, if any
+_methods = []  # (class, name, function, category) wrapped while profiling
+
+
+def instrument(category, label=None, per_type=False):
+    """ Marks a function or method to be counted and timed when profiling
+
+    Args:
+        category: The category of the calls, e.g. "valuator"
+        label: Optional; The label of the calls. Defaults to the qualified
+            name of the function
+        per_type: Optional; If true, calls of a method are labelled by the
+            type of the instance they are called on, e.g. "Annuity.to_pv"
+
+    Returns:
+        A decorator
+    """
+    def decorate(function):
+        name = label or function.__qualname__
+
+        @wraps(function)
+        def instrumented(*args, **kwargs):
+            if _profiler is None:
+                return function(*args, **kwargs)
+            key = f"{type(args[0]).__name__}.{function.__name__}" if per_type else name
+            return _profiler.call(category, key, function, args, kwargs)
+
+        return instrumented
+
+    return decorate
+
+
+def instrument_methods(cls, names, category):
+    """ Registers methods of a class to be instrumented per type when profiling
+
+    The methods are replaced by instrumented wrappers while a Profiler is
+    active, and restored once none is. Only methods that cls itself defines
+    are registered; inherited methods are registered by the class defining
+    them.
+
+    Args:
+        cls: The class defining the methods
+        names: A sequence of method names
+        category: The category of the calls, e.g. "cashflow"
+    """
+    for name in names:
+        if name in vars(cls):
+            method = (cls, name, vars(cls)[name], category)
+            _methods.append(method)
+            if _profiler is not None:
+                _wrap(*method)
+
+
+def _wrap(cls, name, function, category):
+    setattr(cls, name, instrument(category, per_type=True)(function))
+
+
+def count(category, label, n=1):
+    """ Adds n to a counter of the active Profiler, if any """
+    if _profiler is not None:
+        _profiler.count(category, label, n)
+
+
+class Profiler:
+    """ Collects counts and times of instrumented calls
+
+    A Profiler collects while it is used as a context manager. Profilers may
+    be nested, in which case only the innermost collects. A Profiler may be
+    entered several times to accumulate statistics, and reset to clear them.
+
+    See Also:
+        instrument
+    """
+
+    def __init__(self):
+        self._stats = defaultdict(lambda: [0, 0.0])  # Maps keys to [calls, seconds]
+        self._counters = defaultdict(int)  # Maps keys to counts
+        self._depths = defaultdict(int)  # Maps keys to the depth of calls in progress
+        self._previous = []
+        self._elapsed = 0.0
+        self._start = None
+
+    def __enter__(self):
+        global _profiler
+        if _profiler is None:
+            for method in _methods:
+                _wrap(*method)
+        self._previous.append(_profiler)
+        self._start = perf_counter()
+        _profiler = self
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        global _profiler
+        self._elapsed += perf_counter() - self._start
+        _profiler = self._previous.pop()
+        if _profiler is None:
+            for cls, name, function, _ in _methods:
+                setattr(cls, name, function)
+
+    def call(self, category, label, function, args, kwargs):
+        """ Calls a function, counting and timing it under category and label """
+        key = (category, label)
+        stats = self._stats[key]
+        stats[0] += 1
+        if self._depths[key]:  # A recursive call, timed by the outermost
+            return function(*args, **kwargs)
+
+        self._depths[key] += 1
+        start = perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            stats[1] += perf_counter() - start
+            self._depths[key] -= 1
+
+    def count(self, category, label, n=1):
+        self._counters[(category, label)] += n
+
+    def reset(self):
+        self._stats.clear()
+        self._counters.clear()
+        self._elapsed = 0.0
+        return self
+
+    def get_elapsed(self):
+        """ Returns the total time the Profiler has been active, in seconds """
+        running = perf_counter() - self._start if _profiler is self else 0.0
+        return self._elapsed + running
+
+    def report(self):
+        """ Returns the collected statistics as nested dicts
+
+        Returns:
+            A dict with the elapsed seconds, and a dict mapping each category
+            to a dict mapping labels to dicts of calls, seconds and
+            mean_seconds (for timed calls) or count (for counters)
+        """
+        categories = defaultdict(dict)
+        for (category, label), (calls, seconds) in self._stats.items():
+            categories[category][label] = {
+                "calls": calls,
+                "seconds": seconds,
+                "mean_seconds": seconds / calls if calls else 0.0,
+            }
+        for (category, label), n in self._counters.items():
+            categories[category][label] = {"count": n}
+        return {"elapsed_seconds": self.get_elapsed(), "categories": dict(categories)}
+
+    def format_report(self, top=None):
+        """ Returns the collected statistics as a table, slowest first
+
+        Args:
+            top: Optional; The number of timed rows to include per category
+        """
+        report = self.report()
+        lines = [f"Profiled {report['elapsed_seconds'] * 1000:.3f} ms"]
+        for category, labels in sorted(report["categories"].items()):
+            lines.append(f"\n{category}")
+            timed = sorted(
+                [(stats["seconds"], label, stats) for label, stats in labels.items()
+                 if "calls" in stats],
+                key=lambda row: -row[0])
+            for seconds, label, stats in timed[:top]:
+                lines.append(
+                    f"  {label:<40} {stats['calls']:>9} calls {seconds * 1000:12.3f} ms "
+                    f"{stats['mean_seconds'] * 1e6:12.2f} us/call")
+            for label, stats in sorted(labels.items()):
+                if "count" in stats:
+                    lines.append(f"  {label:<40} {stats['count']:>9} total")
+        return "\n".join(lines)
@@ -1,3 +1,5 @@
 # __init__.py
 from .spreadsheet import write_csv, write_excel, SpreadsheetFeature
 from .cashflowdiagram import generate_cashflow_diagram
+from .simulationplots import generate_histogram, generate_cdf, generate_fan_chart
+from .batchrender import render_cashflow_diagrams
@@ -0,0 +1,94 @@
+import os
+import re
+from os.path import join
+
+FORMATS = ("png", "svg", "pdf")
+
+
+def render_cashflow_diagrams(
+        projects, directory, formats=("png",), n=None, net=False, scale=None,
+        size=None, dpi=100, processes=None, filenames=None):
+    """ Writes the cashflow diagrams of many projects to image files
+
+    Diagrams are drawn without pyplot, on a single Figure with an Agg
+    canvas, so that no windows are opened and the pyplot backend is left
+    unchanged. The Figure is cleared and reused for each project, and
+    cleared once more when rendering ends, even if it fails.
+
+    Given processes, the projects are split into chunks rendered in that
+    many worker processes, each with its own Figure. The projects (and
+    their cashflows) must then be picklable.
+
+    Args:
+        projects: A sequence of Project instances, or a Portfolio
+        directory: The directory to write to, which is created if needed
+        formats: Optional; A sequence of FORMATS to write each diagram in
+        n: Optional; The period to plot to. Defaults to each project's
+            final period
+        net: Optional; If true, the net cashflows are plotted
+        scale: Optional; The y-axis scale; must be a member or key of Scales
+        size: Optional; The size of each diagram, in inches
+        dpi: Optional; The resolution of raster formats, in dots per inch
+        processes: Optional; The number of worker processes. By default,
+            diagrams are rendered in the calling process.
+        filenames: Optional; A filename, without extension, per project.
+            Defaults to the index and title of each project.
+
+    Returns:
+        A list of the paths written, grouped by project in order
+
+    Raises:
+        ValueError: A format is not one of FORMATS
+    """
+    formats = [formats] if isinstance(formats, str) else list(formats)
+    if unknown := [fmt for fmt in formats if fmt.lower() not in FORMATS]:
+        raise ValueError(f"Unsupported formats {unknown}; expected some of {FORMATS}")
+    formats = [fmt.lower() for fmt in formats]
+
+    projects = list(projects)
+    if filenames is None:
+        filenames = [f"{k:04d}_{_safe(project.title)}" for k, project in enumerate(projects)]
+    os.makedirs(directory, exist_ok=True)
+    options = dict(
+        directory=directory, formats=formats, n=n, net=net, scale=scale, size=size, dpi=dpi)
+
+    if not processes or processes <= 1 or len(projects) <= 1:
+        return _render(projects, filenames, **options)
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    chunksize = max(1, -(-len(projects) // (4 * processes)))
+    chunks = range(0, len(projects), chunksize)
+    with ProcessPoolExecutor(processes) as executor:
+        futures = [
+            executor.submit(
+                _render, projects[start:start + chunksize],
+                filenames[start:start + chunksize], **options)
+            for start in chunks]
+        return [path for future in futures for path in future.result()]
+
+
+def _render(projects, filenames, directory, formats, n, net, scale, size, dpi):
+    """ Renders projects in turn on one reused Figure """
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=size, dpi=dpi)
+    FigureCanvasAgg(fig)
+    paths = []
+    try:
+        for project, filename in zip(projects, filenames):
+            fig.clear()
+            project.to_cashflowdiagram(n, net, scale, ax=fig.add_subplot())
+            for fmt in formats:
+                path = join(directory, f"{filename}.{fmt}")
+                fig.savefig(path, format=fmt, dpi=dpi)
+                paths.append(path)
+    finally:
+        fig.clear()
+    return paths
+
+
+def _safe(title):
+    """ Makes a title usable within a filename """
+    return re.sub(r"[^\w.-]+", "_", str(title)).strip("_") or "project"
@@ -1,20 +1,44 @@
-import pandas as pd
-from matplotlib import pyplot as plt
-from matplotlib.cm import get_cmap
-from matplotlib.colors import ListedColormap
-from ..utilities import Scales, parse_d, get_final_period
+from functools import lru_cache
+
+import numpy as np
+
+from ..utilities import Scales, parse_d, get_final_period, get_amounts
 from ..cashflow import Cashflow
 name = "tab20"
-default_colormap = get_cmap(name)  # type: matplotlib.colors.ListedColormap
+other_color = "#404040"  # The color of the series of minor cashflows
+
+
+@lru_cache(maxsize=None)
+def get_default_colormap():
+    """ Returns the default colormap, loading matplotlib on first use """
+    import matplotlib
+
+    return matplotlib.colormaps[name]  # type: matplotlib.colors.ListedColormap
+
+
+def __getattr__(attr):
+    # default_colormap is created on first access, rather than at import
+    if attr == "default_colormap":
+        return get_default_colormap()
+    raise AttributeError(f"module {__name__!r} has no attribute {attr!r}")
+
 
 def generate_cashflow_diagram(
-        cashflows, d=None, net=False, scale=None, color=None, title=None, **kwargs):
+        cashflows, d=None, net=False, scale=None, color=None, title=None,
+        max_bars=60, max_series=12, ax=None, **kwargs):
     """ Generates a barplot showing cashflows over time
 
     Given a set of cashflows, produces a stacked barplot with bars at each
     period. The height of each bar is set by the amount of cash produced
     by a cashflow at the specified period.
 
+    The amounts are evaluated for every cashflow and period at once, and
+    the number of bars drawn is bounded, so that plotting long horizons of
+    many cashflows takes roughly constant time. Beyond max_bars periods,
+    consecutive periods are grouped into bins, each showing the total cash
+    of its periods. Beyond max_series cashflows, those with the smallest
+    total absolute amounts are combined into a single "Other" series.
+
     Note that this function does not display the produced plot; call
     matplotlib.pyplot.show() to view the plot.
 
@@ -25,50 +49,97 @@ def generate_cashflow_diagram(
         net: Optional; When true, only the net cashflows are shown, and the
             individual cashflow information is omitted.
         scale: Optional; The y-axis scale; must be a member or key of Scales
-        kwargs: A list of keyword arguments to be passed to Dataframe.plot()
-    
+        color: Optional; A ListedColormap or sequence of colors
+        title: Optional; A title for the plot
+        max_bars: Optional; The most bars drawn per series
+        max_series: Optional; The most series drawn, including "Other"
+        ax: Optional; An Axes to draw on. Defaults to the Axes of a new
+            pyplot Figure
+        kwargs: A list of keyword arguments to be passed to Axes.bar()
+
     Returns:
         A Figure and Axis for the plot
     """
+    from matplotlib.colors import ListedColormap
+
     # Parse Args
-    cashflows = (cashflows,) if isinstance(cashflows, Cashflow) else cashflows
+    cashflows = (cashflows,) if isinstance(cashflows, Cashflow) else list(cashflows)
     d = parse_d(d or get_final_period(cashflows, finite=True) or 5)
     net = bool(net)
     if color:
         color = color.colors if isinstance(color, ListedColormap) else color
     else:
-        color = default_colormap.colors
+        color = get_default_colormap().colors
     if scale:
         scale = (
             scale if isinstance(scale, Scales)
             else Scales[scale.upper()])
 
     # Extract information
-    periods   = list(range(d[0], d[1] + 1))
-    titles    = [cashflow.get_title() for cashflow in cashflows] 
-    cashflows = [
-        [cashflow[n].amount for cashflow in cashflows]
-        for n in periods
-    ]
+    periods = np.arange(d[0], d[1] + 1)
+    titles = [cashflow.get_title() for cashflow in cashflows]
+    amounts = get_amounts(cashflows, periods)
 
     # Format information
     if net:
-        cashflows = [[sum(cashflows[n])] for n in periods]
+        titles, amounts = ["Net"], amounts.sum(axis=0, keepdims=True)
     if scale:
-        cashflows = [
-            [cashflow * scale.value for cashflow in cashflows[n]]
-            for n in periods
-        ]
+        amounts *= scale.value
+    colors = [color[k % len(color)] for k in range(len(titles))]
+    titles, amounts, colors = _group_minor(titles, amounts, colors, max_series)
+    labels, amounts = _bin_periods(periods, amounts, max_bars)
+
+    # Plot the Cashflow Diagram with matplotlib, stacking positive and
+    # negative amounts separately
+    if ax is None:
+        from matplotlib import pyplot as plt
 
-    # Plot the Cashflow Diagram with matplotlib
-    plotdata = pd.DataFrame(cashflows, index=periods, columns=titles)
-    fig, ax = plt.subplots()
+        fig, ax = plt.subplots()
+    else:
+        fig = ax.figure
+    positions = np.arange(len(labels))
+    above, below = np.zeros(len(labels)), np.zeros(len(labels))
+    for series, row, c in zip(titles, amounts, colors):
+        bottom = np.where(row >= 0, above, below)
+        ax.bar(positions, row, width=0.5, bottom=bottom, color=c, label=series, **kwargs)
+        above += np.maximum(row, 0)
+        below += np.minimum(row, 0)
 
-    plotdata.plot(kind="bar", stacked="true", ax=ax, color=color, **kwargs)
+    step = max(1, -(-len(labels) // 20))  # Labels at most 20 ticks
+    ax.set_xticks(positions[::step])
+    ax.set_xticklabels(labels[::step], rotation=90)
+    ax.legend()
     ax.set_title(title)
     ax.set_ylabel("Cashflows" + (f" [{scale.name.title()}]" if scale else ""))
     ax.set_xlabel("Period")
     ax.axhline()
-            
+
     return fig, ax
 
+
+def _group_minor(titles, amounts, colors, max_series):
+    """ Combines the smallest series beyond max_series into an "Other" series """
+    if len(titles) <= max_series:
+        return titles, amounts, colors
+
+    totals = np.abs(amounts).sum(axis=1)
+    major = np.sort(np.argsort(-totals, kind="stable")[:max_series - 1])
+    minor = np.setdiff1d(np.arange(len(titles)), major)
+    return (
+        [titles[k] for k in major] + [f"Other ({len(minor)})"],
+        np.vstack((amounts[major], amounts[minor].sum(axis=0))),
+        [colors[k] for k in major] + [other_color],
+    )
+
+
+def _bin_periods(periods, amounts, max_bars):
+    """ Sums amounts over bins of consecutive periods, returning tick labels """
+    if len(periods) <= max_bars:
+        return [str(n) for n in periods], amounts
+
+    width = -(-len(periods) // max_bars)
+    starts = np.arange(0, len(periods), width)
+    labels = [
+        f"{periods[start]}-{periods[min(start + width, len(periods)) - 1]}"
+        for start in starts]
+    return labels, np.add.reduceat(amounts, starts, axis=1)
@@ -0,0 +1,112 @@
+import numpy as np
+from ..utilities import Scales
+
+
+def _parse_scale(scale):
+    if scale:
+        return scale if isinstance(scale, Scales) else Scales[scale.upper()]
+    return None
+
+
+def _label(name, scale):
+    return name + (f" [{scale.name.title()}]" if scale else "")
+
+
+def generate_histogram(counts, edges, scale=None, title=None, xlabel="Valuation", **kwargs):
+    """ Generates a histogram of simulated valuations
+
+    Note that this function does not display the produced plot; call
+    matplotlib.pyplot.show() to view the plot.
+
+    Args:
+        counts: A sequence of the number of valuations in each bin
+        edges: A sequence of the len(counts) + 1 bin edges
+        scale: Optional; The x-axis scale; must be a member or key of Scales
+        title: Optional; A title for the plot
+        xlabel: Optional; A label for the x-axis
+        kwargs: Keyword arguments to be passed to Axes.stairs()
+
+    Returns:
+        A Figure and Axis for the plot
+    """
+    from matplotlib import pyplot as plt
+
+    scale = _parse_scale(scale)
+    edges = np.asarray(edges, dtype=float) * (scale.value if scale else 1)
+
+    fig, ax = plt.subplots()
+    ax.stairs(counts, edges, fill=True, **kwargs)
+    ax.set_title(title)
+    ax.set_xlabel(_label(xlabel, scale))
+    ax.set_ylabel("Iterations")
+    ax.axvline(color="black", linewidth=0.8)
+    return fig, ax
+
+
+def generate_cdf(values, probabilities, scale=None, title=None, xlabel="Valuation", **kwargs):
+    """ Generates a plot of the cumulative distribution of simulated valuations
+
+    Args:
+        values: A sorted sequence of valuations
+        probabilities: The cumulative probability at each valuation
+        scale: Optional; The x-axis scale; must be a member or key of Scales
+        title: Optional; A title for the plot
+        xlabel: Optional; A label for the x-axis
+        kwargs: Keyword arguments to be passed to Axes.step()
+
+    Returns:
+        A Figure and Axis for the plot
+    """
+    from matplotlib import pyplot as plt
+
+    scale = _parse_scale(scale)
+    values = np.asarray(values, dtype=float) * (scale.value if scale else 1)
+
+    fig, ax = plt.subplots()
+    ax.step(values, probabilities, where="post", **kwargs)
+    ax.set_title(title)
+    ax.set_xlabel(_label(xlabel, scale))
+    ax.set_ylabel("Cumulative Probability")
+    ax.set_ylim(0, 1)
+    ax.axvline(color="black", linewidth=0.8)
+    return fig, ax
+
+
+def generate_fan_chart(bands, qs, scale=None, title=None, **kwargs):
+    """ Generates a fan chart of simulated net cashflows by period
+
+    Shades the region between each pair of percentiles symmetric about the
+    median, and draws the median itself as a line.
+
+    Args:
+        bands: A two-dimensional array whose rows are percentiles of the net
+            cashflow in each period, as given by SimulationPaths.fan_chart
+        qs: The percentiles corresponding to the rows of bands
+        scale: Optional; The y-axis scale; must be a member or key of Scales
+        title: Optional; A title for the plot
+        kwargs: Keyword arguments to be passed to Axes.fill_between()
+
+    Returns:
+        A Figure and Axis for the plot
+    """
+    from matplotlib import pyplot as plt
+
+    scale = _parse_scale(scale)
+    bands = np.asarray(bands, dtype=float) * (scale.value if scale else 1)
+    qs = list(qs)
+    periods = np.arange(bands.shape[1])
+
+    fig, ax = plt.subplots()
+    for k in range(len(qs) // 2):
+        lower, upper = k, len(qs) - 1 - k
+        ax.fill_between(
+            periods, bands[lower], bands[upper], alpha=0.25, linewidth=0,
+            label=f"P{qs[lower]:g}-P{qs[upper]:g}", **kwargs)
+    if len(qs) % 2:
+        ax.plot(periods, bands[len(qs) // 2], label=f"P{qs[len(qs) // 2]:g}")
+    ax.set_title(title)
+    ax.set_xlabel("Period")
+    ax.set_ylabel(_label("Net Cashflow", scale))
+    ax.axhline(color="black", linewidth=0.8)
+    ax.legend()
+    return fig, ax
@@ -1,7 +1,12 @@
 from ..cashflow import SinglePaymentFactory as sp
 from ..cashflow import UniformSeriesFactory as us
+from ..utilities import get_amounts
+from collections.abc import Mapping
+from contextlib import nullcontext
 from enum import Enum
 
+import numpy as np
+
 
 class SpreadsheetFeature(Enum):
     NPW = "Net Present Worth"
@@ -9,85 +14,227 @@ class SpreadsheetFeature(Enum):
     # TODO Add more things here (e.g. BCR)
 
 
-def write_csv(filename, project):
-    import csv
+TAIL_MARKER = "..."  # Marks cashflows continuing beyond the final period
+
+
+def write_csv(filename, projects, long=False, after_tax=True, zeros=None, chunksize=4096):
+    """ Writes the cashflows of one or many projects to a CSV file
+
+    In the wide format, the file has a row per period and a column per
+    cashflow (including taxflows) of a single project. In the long format,
+    the file has a row per (project, cashflow, period, amount), so that many
+    projects may be written to one file.
 
-    titles = ["Period"] + [cf.get_title() for cf in project.get_taxed_cashflows()]
-    with open(filename, "w  ", newline="") as csvfile:
-        writer = csv.writer(csvfile)
-        writer.writerow(titles)
+    Rows are streamed in chunks of periods, each evaluated for every cashflow
+    at once, through a single buffered file handle. Cashflows which continue
+    beyond the final finite period, such as perpetuities, are followed by a
+    row whose period is TAIL_MARKER.
 
-        for n in range(project._periods + 1):
-            nextrow = ["n"]
-            for cf in project[n]:
-                for title in titles:
-                    if cf.title == title:  # This can only happen once!
-                        nextrow.append(cf[n].amount)
-                        break
-                    else:
-                        nextrow.append(0)
-            writer.writerow(nextrow)
+    Args:
+        filename: The path of the file to write, or a writable text file
+        projects: A Project or, in the long format, a sequence of Projects
+        long: Optional; If true, the long format is written
+        after_tax: Optional; If true, taxflows are included
+        zeros: Optional; If true, zero amounts are written. Otherwise, they
+            are left blank in the wide format, and their rows are omitted in
+            the long format. Defaults to true in the wide format, and false
+            in the long format
+        chunksize: Optional; The number of periods evaluated at once
 
+    Raises:
+        ValueError: Several projects were given for the wide format
+    """
+    import csv
 
-def write_excel(filename, project, features=[]):
+    projects = [projects] if hasattr(projects, "get_cashflows") else list(projects)
+    if not long and len(projects) != 1:
+        raise ValueError("The wide format holds a single project; use long=True")
+    zeros = (not long) if zeros is None else zeros
+
+    if hasattr(filename, "write"):
+        csvfile = nullcontext(filename)
+    else:
+        csvfile = open(filename, "w", newline="", buffering=1 << 20)
+
+    with csvfile as f:
+        writer = csv.writer(f)
+        if long:
+            writer.writerow(["Project", "Cashflow", "Period", "Amount"])
+            for project in projects:
+                _write_long(writer, project, after_tax, zeros, chunksize)
+        else:
+            _write_wide(writer, projects[0], after_tax, zeros, chunksize)
+
+
+def _write_wide(writer, project, after_tax, zeros, chunksize):
+    cashflows = project.get_taxed_cashflows() if after_tax else project.get_cashflows()
+    writer.writerow(["Period"] + [cashflow.get_title() for cashflow in cashflows])
+
+    nf = project.get_final_period(finite=True)
+    for start in range(0, nf + 1, chunksize):
+        ns = np.arange(start, min(start + chunksize, nf + 1))
+        amounts = get_amounts(cashflows, ns).T.tolist()
+        if not zeros:
+            amounts = [[amount or "" for amount in row] for row in amounts]
+        writer.writerows([[n, *row] for n, row in zip(ns.tolist(), amounts)])
+
+    perpetual = [_is_perpetual(cashflow) for cashflow in cashflows]
+    if any(perpetual):
+        writer.writerow([TAIL_MARKER] + [TAIL_MARKER if p else "" for p in perpetual])
+
+
+def _write_long(writer, project, after_tax, zeros, chunksize):
+    cashflows = project.get_taxed_cashflows() if after_tax else project.get_cashflows()
+    titles = [cashflow.get_title() for cashflow in cashflows]
+    title = project.title
+
+    nf = project.get_final_period(finite=True)
+    for start in range(0, nf + 1, chunksize):
+        ns = np.arange(start, min(start + chunksize, nf + 1))
+        amounts = get_amounts(cashflows, ns)
+        rows, cols = np.nonzero(amounts) if not zeros else np.indices(amounts.shape).reshape(2, -1)
+        writer.writerows(zip(
+            [title] * len(rows),
+            [titles[r] for r in rows.tolist()],
+            ns[cols].tolist(),
+            amounts[rows, cols].tolist()))
+
+    writer.writerows([
+        (title, cashflow.get_title(), TAIL_MARKER, "")
+        for cashflow in cashflows if _is_perpetual(cashflow)])
+
+
+def _is_perpetual(cashflow):
+    """ Returns true if a cashflow continues beyond the final finite period """
+    if isinstance(cashflow, (us.Perpetuity, us.GeoPerpetuity)):
+        return True
+    return bool(getattr(cashflow, "is_perpetual", lambda: False)())
+
+
+def write_excel(filename, projects=(), features=[], simulations=None):
+    """ Writes projects and simulation summaries to an Excel workbook
+
+    Each project is written to its own worksheet, with a row per period and
+    a column per cashflow (including taxflows), followed by a column per
+    feature. Each simulation summary is also written to its own worksheet.
+
+    The workbook is written in xlsxwriter's constant memory mode: every sheet
+    is computed as a matrix of period arrays and streamed to disk row by row,
+    so memory use is bounded by the largest single project.
+
+    Args:
+        filename: The path of the workbook to write
+        projects: Optional; A Project or sequence of Projects
+        features: Optional; A sequence of SpreadsheetFeatures (or their
+            values) to append to the cashflows of each project
+        simulations: Optional; A SimulationResult, or a sequence or Mapping
+            of SimulationResults keyed by sheet name
+    """
     import xlsxwriter
 
-    for i, feature in enumerate(features):
-        if isinstance(feature, SpreadsheetFeature):
-            features[i] = feature.value
+    projects = [projects] if hasattr(projects, "get_cashflows") else list(projects)
+    features = [
+        feature.value if isinstance(feature, SpreadsheetFeature) else feature
+        for feature in features]
+    if simulations is None:
+        simulations = dict()
+    elif not isinstance(simulations, Mapping):
+        if hasattr(simulations, "summary"):
+            simulations = [simulations]
+        simulations = {simulation.title: simulation for simulation in simulations}
+
+    with xlsxwriter.Workbook(filename, {"constant_memory": True}) as wb:
+        formats = {
+            "bld": wb.add_format({"bold": True}),
+            "pct": wb.add_format({"num_format": "0.00%"}),
+            "fin": wb.add_format(
+                {"num_format": '_-$* #,##0.00_-;[Red]-$* #,##0.00_-;_-$* "-"??_-;_-@_-'}),
+        }
+        names = set()
+        for project in projects:
+            ws = wb.add_worksheet(_sheet_name(project.title, names))
+            _write_project(ws, project, features, formats)
+        for name, simulation in simulations.items():
+            ws = wb.add_worksheet(_sheet_name(name, names))
+            _write_simulation(ws, simulation, formats)
+
+
+def _write_project(ws, project, features, formats):
+    """ Streams the cashflows of a project to a worksheet, row by row """
+    bld, pct, fin = formats["bld"], formats["pct"], formats["fin"]
+    row = 0
+
+    # HEADER
+    ws.write(row, 0, project.title, bld)
+    row += 1
+
+    ws.write(row, 0, "Interest", bld)
+    ws.write(row, 1, project.interest, pct)
+    row += 2  # Add space between header and cashflow content
+
+    # TITLES
+    cashflows = project.get_taxed_cashflows()
+    cf_titles = [cf.get_title() for cf in cashflows]
+    ws.write_row(row, 0, ["Period", *cf_titles, *features], bld)
+    row += 1
+
+    # CASHFLOWS AND FEATURES, as columns of a single matrix
+    nf = project.get_final_period(finite=True)
+    columns = [get_amounts(cashflows, range(nf + 1))]
+    for feature in features:
+        if feature == SpreadsheetFeature.NPW.value:
+            columns.append(project.discounted_net_cashflows(n=nf)[None, :])
+        elif feature == SpreadsheetFeature.CNPW.value:
+            columns.append(project.cumulative_npw(n=nf)[None, :])
+        else:
+            columns.append(np.full((1, nf + 1), np.nan))
+    table = np.concatenate(columns).T
+
+    for n, values in enumerate(table.tolist()):
+        ws.write_number(row, 0, n)
+        for col, value in enumerate(values, start=1):
+            if value == value:  # Leaves unrecognized features blank
+                ws.write_number(row, col, value, fin)
+        row += 1
 
-    with xlsxwriter.Workbook(filename) as wb:
-        bld = wb.add_format({"bold": True})
-        pct = wb.add_format({"num_format": "0.00%"})
-        fin = wb.add_format(
-            {"num_format": '_-$* #,##0.00_-;[Red]-$* #,##0.00_-;_-$* "-"??_-;_-@_-'}
-        )
+    # Marks the columns of perpetuities, which continue beyond the table
+    for col, cashflow in enumerate(cashflows, start=1):
+        if _is_perpetual(cashflow):
+            ws.write(row, col, TAIL_MARKER)
 
-        ws = wb.add_worksheet()
 
-        row, col = 0, 0
+def _write_simulation(ws, simulation, formats):
+    """ Streams the summary of a SimulationResult to a worksheet """
+    bld, fin = formats["bld"], formats["fin"]
 
-        # HEADER
-        ws.write(row, 0, project.get_title(), bld)
-        row += 1
+    ws.write(0, 0, simulation.title, bld)
+    ws.write(1, 0, "Iterations", bld)
+    ws.write_number(1, 1, len(simulation))
 
-        ws.write(row, 0, "Interest", bld)
-        ws.write(row, 1, project.get_interest(), pct)
-        row += 2  # Add space between header and cashflow content
+    row = 3
+    for statistic, value in simulation.summary().items():
+        ws.write(row, 0, statistic, bld)
+        if value == value:  # Leaves NaN blank
+            ws.write_number(row, 1, value, formats["pct"] if statistic == "p_loss" else fin)
+        row += 1
 
-        # TITLES
-        cf_titles = [cf.get_title() for cf in project.get_taxed_cashflows()]
-        titles = ["Period", *cf_titles, *features]
-        ws.write_row(row, 0, titles, bld)
+    row += 1
+    ws.write_row(row, 0, ["Percentile", "Valuation"], bld)
+    row += 1
+    qs = (1, 5, 10, 25, 50, 75, 90, 95, 99)
+    for q, value in zip(qs, np.atleast_1d(simulation.percentiles(qs)).tolist()):
+        ws.write_number(row, 0, q / 100, formats["pct"])
+        if value == value:
+            ws.write_number(row, 1, value, fin)
         row += 1
 
-        # PERIODS
-        period_col = list(range(project._periods + 1))
-        ws.write_column(row, col, period_col)
-        col += 1
-
-        # CASHFLOWS
-        for cashflow in project.get_taxed_cashflows():
-            cashflow_list = [cashflow[n].amount for n in range(project._periods + 1)]
-            ws.write_column(row, col, cashflow_list, fin)
-            if isinstance(cashflow, us.Perpetuity):
-                ws.write(row + len(cashflow_list), col, "...")
-            col += 1
-
-        # FEATURES
-        for feature in features:
-            if feature == SpreadsheetFeature.NPW.value:
-                npws = [
-                    ncf.to_pv(project.interest).amount for ncf in project.get_ncfs()
-                ]
-                ws.write_column(row, col, npws, fin)
-            elif feature == SpreadsheetFeature.CNPW.value:
-                npws = [
-                    ncf.to_pv(project.interest).amount for ncf in project.get_ncfs()
-                ]
-                cnpws = npws
-                for i in range(1, len(npws)):
-                    cnpws[i] += npws[i - 1]
-                ws.write_column(row, col, cnpws, fin)
-
-            col += 1
+
+def _sheet_name(title, names):
+    """ Makes a unique, valid worksheet name from a title """
+    name = "".join([c for c in str(title) if c not in "[]:*?/\\"]).strip("'")[:31] or "Sheet"
+    candidate, k = name, 1
+    while candidate.lower() in names:
+        suffix = f" ({k})"
+        candidate, k = name[:31 - len(suffix)] + suffix, k + 1
+    names.add(candidate.lower())
+    return candidate
@@ -0,0 +1,318 @@
+from os import makedirs
+from os.path import exists, join
+
+import numpy as np
+
+from .Columns import Strings, Ragged
+from .Portfolio import Portfolio
+from ..valuation import irr_batch, payback_periods
+
+TABLES = ("projects", "cashflows", "taxes", "depreciations")
+SCHEDULES = "schedules"
+VALUATIONS = "valuations"
+SIMULATIONS = "simulations"
+SIMULATION_PATHS = "simulation_paths"
+
+CHUNK_ELEMENTS = 2 ** 22  # Array elements written per Parquet row group
+
+
+def to_arrow(portfolio):
+    """ Converts the definitions of projects to Arrow tables
+
+    The tables share the buffers of the portfolio's columns rather than
+    copying them: numeric columns become primitive arrays, string columns
+    become large_string arrays, and ragged columns become large_list arrays.
+    Kinds become dictionary arrays of their names.
+
+    Args:
+        portfolio: A Portfolio, or a sequence of Project instances
+
+    Returns:
+        A dict mapping the names of the projects, cashflows, taxes and
+        depreciations tables to pyarrow Tables
+
+    See Also:
+        from_arrow
+    """
+    import pyarrow as pa
+
+    portfolio = _as_portfolio(portfolio)
+    tables = dict()
+    for name, table, schema in portfolio._tables():
+        kinds = Portfolio.DEPRECIATION_KINDS if name == "depreciations" else Portfolio.KINDS
+        columns = dict()
+        for column, kind in schema.items():
+            array = _to_arrow_array(table[column])
+            if column == "kind":
+                array = pa.DictionaryArray.from_arrays(array, pa.array(kinds))
+            columns[column] = array
+        tables[name] = pa.table(columns)
+    return tables
+
+
+def from_arrow(tables):
+    """ Converts Arrow tables of project definitions to a Portfolio
+
+    The inverse of to_arrow. Columns are read from the Arrow buffers without
+    copying wherever their types allow.
+
+    Args:
+        tables: A dict mapping table names to pyarrow Tables. The taxes and
+            depreciations tables may be omitted.
+
+    Returns:
+        A Portfolio
+    """
+    columns = dict()
+    for name, schema in (
+            ("projects", Portfolio.PROJECT_COLUMNS),
+            ("cashflows", Portfolio.CASHFLOW_COLUMNS),
+            ("taxes", Portfolio.TAX_COLUMNS),
+            ("depreciations", Portfolio.DEPRECIATION_COLUMNS)):
+        if name not in tables:
+            columns[name] = None
+            continue
+        kinds = Portfolio.DEPRECIATION_KINDS if name == "depreciations" else Portfolio.KINDS
+        table = tables[name]
+        columns[name] = {
+            column: _from_arrow_array(table.column(column).combine_chunks(), kind, kinds)
+            for column, kind in schema.items()}
+    return Portfolio(**columns)
+
+
+def schedule_table(portfolio, n=None, after_tax=True):
+    """ Tabulates the net cashflows of every project by period
+
+    Args:
+        portfolio: A Portfolio, or a sequence of Project instances
+        n: Optional; The final period. Defaults to the final finite period
+            across all projects
+        after_tax: Optional; If true, taxflows are included
+
+    Returns:
+        A pyarrow Table of project, period, net_cashflow and
+        discounted_cashflow, with a row per project and period
+    """
+    import pyarrow as pa
+
+    portfolio = _as_portfolio(portfolio)
+    net = portfolio.net_cashflows(n, after_tax)
+    periods = np.arange(net.shape[1])
+    discounted = net * (1 + portfolio.get_interests()[:, None]) ** -periods.astype(float)
+    return pa.table({
+        "project": _to_arrow_array(np.repeat(np.arange(len(portfolio)), net.shape[1])),
+        "period": _to_arrow_array(np.tile(periods, len(portfolio))),
+        "net_cashflow": _to_arrow_array(net.ravel()),
+        "discounted_cashflow": _to_arrow_array(discounted.ravel()),
+    })
+
+
+def valuation_table(portfolio, after_tax=True):
+    """ Tabulates the valuations of every project
+
+    Args:
+        portfolio: A Portfolio, or a sequence of Project instances
+        after_tax: Optional; If true, taxes are applied
+
+    Returns:
+        A pyarrow Table of project, title, interest, npw, irr, payback and
+        discounted_payback, with a row per project. Undefined valuations,
+        such as the IRR of a project without a sign change, are NaN. IRRs
+        include the payments of perpetuities, as Project.irr does.
+    """
+    import pyarrow as pa
+
+    portfolio = _as_portfolio(portfolio)
+    interests = portfolio.get_interests()
+    net = portfolio.net_cashflows(after_tax=after_tax)
+
+    n = net.shape[1] - 1
+
+    def tails(i):
+        return portfolio.tail_worths(n, i, after_tax)
+
+    discounted_payback = np.full(len(portfolio), np.nan)
+    for i in np.unique(interests):
+        rows = np.flatnonzero(interests == i)
+        discounted_payback[rows] = payback_periods(net[rows], float(i))
+
+    return pa.table({
+        "project": _to_arrow_array(np.arange(len(portfolio))),
+        "title": _to_arrow_array(portfolio.projects["title"]),
+        "interest": _to_arrow_array(interests),
+        "npw": _to_arrow_array(portfolio.npw(after_tax=after_tax)),
+        "irr": _to_arrow_array(irr_batch(net, tails=tails)),
+        "payback": _to_arrow_array(payback_periods(net)),
+        "discounted_payback": _to_arrow_array(discounted_payback),
+    })
+
+
+def write_parquet(
+        directory, portfolio, schedules=True, valuations=True, simulations=None,
+        after_tax=True):
+    """ Writes projects and their outputs to Parquet files in a directory
+
+    The definitions of the projects are written to projects.parquet,
+    cashflows.parquet, taxes.parquet and depreciations.parquet, from which
+    read_parquet rebuilds them. Outputs are written alongside them:
+
+        schedules.parquet: See schedule_table
+        valuations.parquet: See valuation_table
+        simulations.parquet: simulation, iteration and valuation, with a
+            row per iteration of each simulation
+        simulation_paths.parquet: simulation, iteration, period and
+            net_cashflow, with a row per period of each iteration of each
+            simulation stored on disk by simulate_paths
+
+    Simulation samples are written in row groups of chunks of iterations,
+    so that simulations stored on disk are never loaded whole.
+
+    Args:
+        directory: The directory to write to, which is created if needed
+        portfolio: A Portfolio, or a sequence of Project instances
+        schedules: Optional; If true, schedules.parquet is written
+        valuations: Optional; If true, valuations.parquet is written
+        simulations: Optional; A dict mapping titles to SimulationResult or
+            SimulationPaths instances, or arrays of valuations
+        after_tax: Optional; If true, taxes are applied to the outputs
+
+    See Also:
+        read_parquet
+    """
+    import pyarrow.parquet as pq
+
+    portfolio = _as_portfolio(portfolio)
+    makedirs(directory, exist_ok=True)
+    for name, table in to_arrow(portfolio).items():
+        pq.write_table(table, join(directory, f"{name}.parquet"))
+    if schedules:
+        pq.write_table(
+            schedule_table(portfolio, after_tax=after_tax),
+            join(directory, f"{SCHEDULES}.parquet"))
+    if valuations:
+        pq.write_table(
+            valuation_table(portfolio, after_tax=after_tax),
+            join(directory, f"{VALUATIONS}.parquet"))
+    if simulations:
+        _write_simulations(directory, simulations)
+
+
+def read_parquet(directory, memory_map=True):
+    """ Reads the definitions of projects written by write_parquet
+
+    Args:
+        directory: The directory written to by write_parquet
+        memory_map: Optional; If true, the files are memory-mapped
+
+    Returns:
+        A Portfolio, from which Project instances may be created in bulk
+        with Portfolio.to_projects
+    """
+    import pyarrow.parquet as pq
+
+    tables = dict()
+    for name in TABLES:
+        path = join(directory, f"{name}.parquet")
+        if exists(path):
+            tables[name] = pq.read_table(path, memory_map=memory_map)
+    return from_arrow(tables)
+
+
+def read_projects(directory):
+    """ Reads the projects written by write_parquet as Project instances """
+    return read_parquet(directory).to_projects()
+
+
+def _write_simulations(directory, simulations):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        ("simulation", pa.large_string()), ("iteration", pa.int64()), ("valuation", pa.float64())])
+    with pq.ParquetWriter(join(directory, f"{SIMULATIONS}.parquet"), schema) as writer:
+        for title, simulation in simulations.items():
+            valuations = _valuations(simulation)
+            for start in range(0, len(valuations), CHUNK_ELEMENTS):
+                chunk = np.ascontiguousarray(valuations[start:start + CHUNK_ELEMENTS])
+                writer.write_table(pa.table({
+                    "simulation": pa.array([title] * len(chunk), pa.large_string()),
+                    "iteration": _to_arrow_array(np.arange(start, start + len(chunk))),
+                    "valuation": _to_arrow_array(chunk),
+                }, schema=schema))
+
+    stored = {title: sim for title, sim in simulations.items() if hasattr(sim, "get_paths")}
+    if not stored:
+        return
+
+    schema = pa.schema([
+        ("simulation", pa.large_string()), ("iteration", pa.int64()),
+        ("period", pa.int64()), ("net_cashflow", pa.float64())])
+    with pq.ParquetWriter(join(directory, f"{SIMULATION_PATHS}.parquet"), schema) as writer:
+        for title, simulation in stored.items():
+            paths = simulation.get_paths()
+            iterations, periods = paths.shape
+            step = max(1, CHUNK_ELEMENTS // max(periods, 1))
+            for start in range(0, iterations, step):
+                chunk = np.ascontiguousarray(paths[start:start + step])
+                writer.write_table(pa.table({
+                    "simulation": pa.array([title] * chunk.size, pa.large_string()),
+                    "iteration": _to_arrow_array(
+                        np.repeat(np.arange(start, start + len(chunk)), periods)),
+                    "period": _to_arrow_array(np.tile(np.arange(periods), len(chunk))),
+                    "net_cashflow": _to_arrow_array(chunk.ravel()),
+                }, schema=schema))
+
+
+def _valuations(simulation):
+    if hasattr(simulation, "get_valuations"):
+        return simulation.get_valuations()
+    return np.asarray(simulation, dtype=float)
+
+
+def _as_portfolio(portfolio):
+    return portfolio if isinstance(portfolio, Portfolio) else Portfolio.from_projects(portfolio)
+
+
+def _to_arrow_array(column):
+    """ Wraps a column in an Arrow array which shares its buffers """
+    import pyarrow as pa
+
+    if isinstance(column, Strings):
+        return pa.Array.from_buffers(
+            pa.large_string(), len(column),
+            [None, pa.py_buffer(_contiguous(column.offsets, np.int64)),
+             pa.py_buffer(_contiguous(column.data, np.uint8))])
+    elif isinstance(column, Ragged):
+        return pa.LargeListArray.from_arrays(
+            _to_arrow_array(_contiguous(column.offsets, np.int64)),
+            _to_arrow_array(column.values))
+    column = _contiguous(column, column.dtype)
+    return pa.Array.from_buffers(
+        pa.from_numpy_dtype(column.dtype), len(column), [None, pa.py_buffer(column)])
+
+
+def _from_arrow_array(array, kind, kinds=()):
+    """ Converts an Arrow array to a column of a type, sharing its buffers """
+    import pyarrow as pa
+
+    if pa.types.is_dictionary(array.type):
+        codes = np.array([kinds.index(name) for name in array.dictionary.to_pylist()], dtype=kind)
+        return codes[array.indices.to_numpy(zero_copy_only=False)]
+    elif kind == "str":
+        array = array.cast(pa.large_string())
+        validity, offsets, data = array.buffers()
+        return Strings(
+            np.frombuffer(data, dtype=np.uint8) if data is not None else np.zeros(0, np.uint8),
+            np.frombuffer(offsets, dtype=np.int64, count=len(array) + 1, offset=8 * array.offset))
+    elif kind.endswith("[]"):
+        array = array.cast(pa.large_list(pa.large_string() if kind == "str[]" else pa.int64()))
+        return Ragged(
+            _from_arrow_array(array.values, kind[:-2]),
+            array.offsets.to_numpy(zero_copy_only=False))
+    elif pa.types.is_string(array.type) or pa.types.is_large_string(array.type):
+        return np.array([kinds.index(name) for name in array.to_pylist()], dtype=kind)
+    return array.cast(pa.from_numpy_dtype(np.dtype(kind))).to_numpy(zero_copy_only=False)
+
+
+def _contiguous(array, dtype):
+    return np.ascontiguousarray(array, dtype=dtype)
@@ -0,0 +1,138 @@
+import json
+import struct
+
+import numpy as np
+
+from .Columns import Strings, Ragged
+from .Portfolio import Portfolio
+
+MAGIC = b"PYEEAPF\x00"
+VERSION = 1
+ALIGNMENT = 64  # Bytes; every buffer starts at a multiple of this
+EXTENSION = ".pyeea"
+
+
+def write_binary(path, portfolio):
+    """ Writes projects to a single compact binary file
+
+    The file holds a short JSON header describing every column of the
+    portfolio, followed by the raw bytes of each column's buffers, aligned
+    so that they may be memory-mapped in place. Strings are stored as one
+    UTF-8 buffer and an offset buffer per column rather than as objects.
+
+    The layout is:
+
+        MAGIC, 8 bytes
+        The length of the header in bytes, as a little-endian uint64
+        The header, as UTF-8 encoded JSON
+        The buffers, each padded to a multiple of ALIGNMENT bytes
+
+    Args:
+        path: The path of the file to write, conventionally ending EXTENSION
+        portfolio: A Portfolio, or a sequence of Project instances
+
+    See Also:
+        read_binary
+    """
+    if not isinstance(portfolio, Portfolio):
+        portfolio = Portfolio.from_projects(portfolio)
+
+    buffers = []
+    tables = dict()
+    for name, table, schema in portfolio._tables():
+        tables[name] = {
+            column: {"type": kind, "buffers": _describe(table[column], buffers)}
+            for column, kind in schema.items()}
+
+    header = {"version": VERSION, "rows": len(portfolio), "tables": tables}
+    encoded = json.dumps(header, separators=(",", ":")).encode()
+    start = _align(len(MAGIC) + 8 + len(encoded))
+
+    with open(path, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<Q", len(encoded)))
+        f.write(encoded)
+        f.write(bytes(start - f.tell()))
+        for array in buffers:
+            f.write(memoryview(array).cast("B"))
+            f.write(bytes(_align(array.nbytes) - array.nbytes))
+
+
+def read_binary(path, mmap=True):
+    """ Reads projects written by write_binary
+
+    With mmap, the file is memory-mapped and every column is a read-only
+    view into it, so that reading is near-instant regardless of the number
+    of cashflows; the operating system pages columns in as they are used.
+
+    Args:
+        path: The path of a file written by write_binary
+        mmap: Optional; If true, the file is memory-mapped. Otherwise, it
+            is read into memory whole.
+
+    Returns:
+        A Portfolio
+
+    Raises:
+        ValueError: The file was not written by write_binary, or by a newer
+            version of it
+    """
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a PyEEA binary file")
+        (length,) = struct.unpack("<Q", f.read(8))
+        header = json.loads(f.read(length).decode())
+    if header["version"] > VERSION:
+        raise ValueError(f"{path} was written by a newer version (v{header['version']})")
+
+    start = _align(len(MAGIC) + 8 + length)
+    if mmap:
+        blob = np.memmap(path, dtype=np.uint8, mode="r")
+    else:
+        blob = np.fromfile(path, dtype=np.uint8)
+    blob = blob[start:]
+
+    tables = {
+        name: {
+            column: _column(blob, spec["type"], spec["buffers"])
+            for column, spec in columns.items()}
+        for name, columns in header["tables"].items()}
+    return Portfolio(**tables)
+
+
+def _describe(column, buffers):
+    """ Appends the buffers of a column to buffers, and describes them """
+    if isinstance(column, Strings):
+        return {
+            "data": _buffer(column.data, buffers),
+            "offsets": _buffer(column.offsets, buffers)}
+    elif isinstance(column, Ragged):
+        return {
+            "values": _describe(column.values, buffers),
+            "offsets": _buffer(column.offsets, buffers)}
+    return _buffer(column, buffers)
+
+
+def _buffer(array, buffers):
+    offset = sum(_align(buffer.nbytes) for buffer in buffers)
+    array = np.ascontiguousarray(array)
+    buffers.append(array)
+    return {"dtype": array.dtype.str, "offset": offset, "length": len(array)}
+
+
+def _column(blob, kind, spec):
+    if kind == "str":
+        return Strings(_view(blob, spec["data"]), _view(blob, spec["offsets"]))
+    elif kind.endswith("[]"):
+        return Ragged(_column(blob, kind[:-2], spec["values"]), _view(blob, spec["offsets"]))
+    return _view(blob, spec)
+
+
+def _view(blob, spec):
+    dtype = np.dtype(spec["dtype"])
+    stop = spec["offset"] + spec["length"] * dtype.itemsize
+    return blob[spec["offset"]:stop].view(dtype)
+
+
+def _align(nbytes):
+    return -(-nbytes // ALIGNMENT) * ALIGNMENT
@@ -0,0 +1,87 @@
+import numpy as np
+
+
+class Strings:
+    """ An immutable sequence of strings stored in a single UTF-8 buffer
+
+    The strings are the slices data[offsets[k]:offsets[k + 1]], which is
+    the layout of an Arrow large_string array, so that string columns can be
+    exchanged with Arrow and memory-mapped files without copying. Strings are
+    decoded only when they are accessed.
+
+    Attributes:
+        data: A uint8 NumPy array of UTF-8 encoded bytes
+        offsets: An int64 NumPy array of len(self) + 1 offsets into data
+    """
+
+    def __init__(self, data, offsets):
+        self.data = data
+        self.offsets = offsets
+
+    @classmethod
+    def from_list(cls, strings):
+        encoded = [str(string).encode() for string in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(e) for e in encoded], out=offsets[1:])
+        return cls(np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets)
+
+    def tolist(self):
+        blob = self.data.tobytes()
+        bounds = self.offsets.tolist()
+        return [blob[a:b].decode() for a, b in zip(bounds[:-1], bounds[1:])]
+
+    def take(self, indices):
+        """ Returns the strings at some indices as a new Strings """
+        blob = self.data.tobytes()
+        bounds = self.offsets
+        return Strings.from_list([
+            blob[bounds[k]:bounds[k + 1]].decode() for k in np.asarray(indices).tolist()])
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, k):
+        if isinstance(k, slice):
+            return [self[j] for j in range(*k.indices(len(self)))]
+        return self.data[self.offsets[k]:self.offsets[k + 1]].tobytes().decode()
+
+    def __iter__(self):
+        return iter(self.tolist())
+
+
+class Ragged:
+    """ A sequence of variable-length sequences
+
+    The k-th sequence is values[offsets[k]:offsets[k + 1]], which is the
+    layout of an Arrow large_list array.
+
+    Attributes:
+        values: A NumPy array or Strings of the concatenated sequences
+        offsets: An int64 NumPy array of len(self) + 1 offsets into values
+    """
+
+    def __init__(self, values, offsets):
+        self.values = values
+        self.offsets = offsets
+
+    @classmethod
+    def from_lists(cls, lists, dtype=None):
+        """ Creates a Ragged from lists of strings, or of numbers of a dtype """
+        lists = [list(values) for values in lists]
+        offsets = np.zeros(len(lists) + 1, dtype=np.int64)
+        np.cumsum([len(values) for values in lists], out=offsets[1:])
+        flat = [value for values in lists for value in values]
+        values = Strings.from_list(flat) if dtype is None else np.array(flat, dtype=dtype)
+        return cls(values, offsets)
+
+    def tolist(self):
+        values = self.values.tolist()
+        bounds = self.offsets.tolist()
+        return [values[a:b] for a, b in zip(bounds[:-1], bounds[1:])]
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, k):
+        values = self.values[self.offsets[k]:self.offsets[k + 1]]
+        return values if isinstance(values, list) else values.tolist()
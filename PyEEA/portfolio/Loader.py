@@ -0,0 +1,443 @@
+import json
+from math import inf, isinf
+
+import numpy as np
+
+from .Columns import Strings, Ragged
+from .Portfolio import Portfolio
+
+# The fields of each kind of record, beyond those common to their table.
+# Fields map to whether they are required.
+CASHFLOW_FIELDS = {
+    "Present": {},
+    "Future": {"n": True},
+    "Annuity": {"d": True},
+    "Gradient": {"G": True, "d": True},
+    "Geometric": {"g": True, "d": True},
+    "Perpetuity": {"d0": False},
+    "GeoPerpetuity": {"g": True, "d0": False},
+    "LearningCurve": {"learning_rate": True, "d": True, "final_amount": False},
+}
+DEPRECIATION_FIELDS = {
+    "StraightLine": {},
+    "SumOfYearsDigits": {},
+    "DecliningBalance": {"rate": True, "first_claim": False},
+}
+COMMON_FIELDS = {
+    "project": {"title": False, "interest": True, "cashflows": False, "taxes": False,
+                "depreciations": False},
+    "cashflow": {"kind": True, "amount": True, "title": False, "tags": False},
+    "tax": {"tag": True, "rate": True, "title": False, "carry_back": False,
+            "carry_forward": False},
+    "depreciation": {"kind": True, "cashflows": True, "d": True, "salvage": False,
+                     "title": False, "tags": False},
+}
+
+
+def load_json(source):
+    """ Loads a portfolio of projects from JSON
+
+    See load_dict for the structure of the document.
+
+    Args:
+        source: The path of a JSON file, or a readable file
+
+    Returns:
+        A Portfolio
+    """
+    if hasattr(source, "read"):
+        return load_dict(json.load(source))
+    with open(source) as f:
+        return load_dict(json.load(f))
+
+
+def load_yaml(source):
+    """ Loads a portfolio of projects from YAML; requires PyYAML
+
+    See load_dict for the structure of the document.
+
+    Args:
+        source: The path of a YAML file, or a readable file
+
+    Returns:
+        A Portfolio
+    """
+    import yaml
+
+    if hasattr(source, "read"):
+        return load_dict(yaml.safe_load(source))
+    with open(source) as f:
+        return load_dict(yaml.safe_load(f))
+
+
+def load_dict(document):
+    """ Parses a document of project definitions into a Portfolio
+
+    The records are validated and written straight to the columns of a
+    Portfolio, without constructing any Cashflow, Tax or Depreciation
+    objects; Project instances may be created on demand from the portfolio.
+
+    The document is a list of projects, or a dict whose "projects" entry is.
+    Each project is a dict of:
+
+        title: Optional; The title of the project
+        interest: The interest rate of the project
+        cashflows: Optional; A list of cashflows, each a dict of a kind (the
+            name of a Cashflow class), an amount, an optional title and
+            tags, and the arguments of its kind named as in its constructor
+            (as listed in CASHFLOW_FIELDS). The first amount of a
+            LearningCurve is its amount.
+        taxes: Optional; A list of taxes, each a dict of a tag, a rate, and
+            an optional title, carry_back and carry_forward
+        depreciations: Optional; A list of depreciations, each a dict of a
+            kind, the cashflows depreciated (as indices into the project's
+            cashflows, or their titles), d, an optional salvage, title and
+            tags, and the arguments of its kind (see DEPRECIATION_FIELDS)
+
+    Periods d are given as accepted by the constructors: an end period, or a
+    list of a start and end period.
+
+    For example:
+
+        {"projects": [{
+            "title": "Plant", "interest": 0.08,
+            "cashflows": [
+                {"kind": "Present", "amount": -1000, "title": "Capital"},
+                {"kind": "Annuity", "amount": 150, "d": [0, 10], "tags": "Sales"}],
+            "taxes": [{"tag": "Sales", "rate": 0.3}],
+            "depreciations": [
+                {"kind": "StraightLine", "cashflows": ["Capital"], "d": 10}]}]}
+
+    Returns:
+        A Portfolio
+
+    Raises:
+        ValueError: The document is invalid; the message locates the first
+            invalid entry
+    """
+    if isinstance(document, dict):
+        if "projects" not in document:
+            raise ValueError("document: missing the field 'projects'")
+        document, where = document["projects"], "projects"
+    else:
+        where = "document"
+    if not isinstance(document, list):
+        raise ValueError(f"{where}: expected a list of projects")
+
+    projects = _Records(document, where)
+    projects.check_fields(COMMON_FIELDS["project"])
+    cashflows = _Records(document, where, "cashflows")
+    taxes = _Records(document, where, "taxes")
+    depreciations = _Records(document, where, "depreciations")
+
+    every = range(len(projects))
+    cf = _parse_cashflows(cashflows)
+    return Portfolio(
+        {
+            "title": projects.strings("title", every, [f"Project {p + 1}" for p in every]),
+            "interest": projects.numbers("interest", every),
+        },
+        cf,
+        _parse_taxes(taxes),
+        _parse_depreciations(depreciations, cashflows, cf))
+
+
+class _Records:
+    """ The records of a table, gathered from every project
+
+    Fields are read and validated a column at a time, and the location of
+    a record within the document is only formatted to report an error.
+    """
+
+    def __init__(self, projects, where, table=None):
+        self.where = where
+        self.table = table
+        if table is None:
+            self.records = projects
+            self.owners = np.arange(len(projects))
+            return
+
+        self.records, counts = [], []
+        for p, project in enumerate(projects):
+            records = project.get(table) or [] if type(project) is dict else []
+            if type(records) is not list:
+                raise ValueError(f"{where}[{p}].{table}: expected a list")
+            self.records.extend(records)
+            counts.append(len(records))
+        self.owners = np.repeat(np.arange(len(projects)), counts)
+        self.first = np.concatenate(([0], np.cumsum(counts, dtype=np.int64)))
+
+    def __len__(self):
+        return len(self.records)
+
+    def locate(self, row, field=None):
+        owner = self.owners[row]
+        location = f"{self.where}[{owner}]"
+        if self.table is not None:
+            location += f".{self.table}[{row - self.first[owner]}]"
+        return location if field is None else f"{location}.{field}"
+
+    def check_fields(self, fields, kinds=None):
+        """ Checks that every record is a dict with only the fields of its
+        kind, including those required
+
+        Args:
+            fields: A dict mapping the fields common to every record to
+                whether they are required
+            kinds: Optional; A list of the kind of each record, and a dict
+                mapping kinds to the dicts of the fields specific to them
+
+        Returns:
+            A dict mapping each kind present to the list of its rows
+        """
+        groups = dict()
+        if kinds is None:
+            kinds = ([None] * len(self), {None: {}})
+        for row, (record, kind) in enumerate(zip(self.records, kinds[0])):
+            if type(record) is not dict:
+                raise ValueError(f"{self.locate(row)}: expected a dict")
+            groups.setdefault(kind, []).append(row)
+
+        for kind, rows in groups.items():
+            allowed = {**fields, **kinds[1][kind]}
+            required = {field for field, needed in allowed.items() if needed}
+            records = [self.records[row] for row in rows]
+            if not set().union(*records) <= allowed.keys() \
+                    or not all([required <= record.keys() for record in records]):
+                for row, record in zip(rows, records):
+                    if unknown := sorted(record.keys() - allowed.keys()):
+                        raise ValueError(f"{self.locate(row)}: unknown field '{unknown[0]}'")
+                    if missing := sorted(required - record.keys()):
+                        raise ValueError(f"{self.locate(row)}: missing the field '{missing[0]}'")
+        return groups
+
+    def kinds(self, names):
+        """ Returns the kind of every record, which must be one of names """
+        kinds = [
+            record.get("kind") if type(record) is dict else None for record in self.records]
+        for row, kind in enumerate(kinds):
+            if kind not in names:
+                raise ValueError(
+                    f"{self.locate(row, 'kind')}: expected one of "
+                    f"{', '.join(names)}, not {kind!r}")
+        return kinds
+
+    def values(self, field, rows, default=None):
+        values = [self.records[row].get(field) for row in rows]
+        if default is not None:
+            values = [default if value is None else value for value in values]
+        return values
+
+    def numbers(self, field, rows, default=None):
+        values = self.values(field, rows, default)
+        if not set(map(type, values)) <= {int, float}:
+            for row, value in zip(rows, values):
+                if type(value) not in (int, float):
+                    raise ValueError(
+                        f"{self.locate(row, field)}: expected a number, not {value!r}")
+        return np.array(values, dtype=float)
+
+    def integers(self, field, rows, default=None):
+        values = self.numbers(field, rows, default)
+        invalid = np.flatnonzero(values != np.round(values))
+        if len(invalid):
+            row = rows[invalid[0]]
+            raise ValueError(
+                f"{self.locate(row, field)}: expected a whole number, "
+                f"not {self.records[row][field]!r}")
+        return values
+
+    def windows(self, field, rows):
+        """ Parses optional carry windows, which are NaN where absent """
+        values = self.numbers(field, rows, np.nan)
+        with np.errstate(invalid="ignore"):
+            whole = (values >= 0) & (values == np.round(values))
+            valid = np.isnan(values) | (values == inf) | whole
+        invalid = np.flatnonzero(~valid)
+        if len(invalid):
+            row = rows[invalid[0]]
+            raise ValueError(
+                f"{self.locate(row, field)}: expected a non-negative whole number "
+                f"of periods, not {self.records[row][field]!r}")
+        return values
+
+    def periods(self, field, rows):
+        """ Parses d as parse_d does, returning arrays of start and end periods """
+        d0, d1 = np.zeros(len(rows)), np.zeros(len(rows))
+        ends = [self.records[row][field] for row in rows]
+        if set(map(type, ends)) <= {int}:
+            d1[:] = ends
+            if not (d1 >= 0).all():
+                row = rows[np.flatnonzero(d1 < 0)[0]]
+                raise ValueError(
+                    f"{self.locate(row, field)}: the start period exceeds the end period")
+            return d0, d1
+
+        for k, row in enumerate(rows):
+            d = self.records[row][field]
+            if type(d) is not list:
+                d = [0, d]
+            elif len(d) == 1:
+                d = [0, *d]
+            if len(d) != 2 or not _is_integer(d[0]) or not (_is_integer(d[1]) or d[1] == inf):
+                raise ValueError(
+                    f"{self.locate(row, field)}: expected an end period, or [start, end]")
+            if d[1] < d[0]:
+                raise ValueError(
+                    f"{self.locate(row, field)}: the start period exceeds the end period")
+            d0[k], d1[k] = d
+        return d0, d1
+
+    def strings(self, field, rows, defaults):
+        values = self.values(field, rows)
+        if not set(map(type, values)) <= {str, type(None)}:
+            for row, value in zip(rows, values):
+                if value is not None and type(value) is not str:
+                    raise ValueError(
+                        f"{self.locate(row, field)}: expected a string, not {value!r}")
+        return Strings.from_list([
+            default if value is None else value for value, default in zip(values, defaults)])
+
+    def tags(self, rows):
+        tags = []
+        for row, value in zip(rows, self.values("tags", rows)):
+            if not value:
+                value = []
+            elif type(value) is str:
+                value = [value]
+            elif type(value) is not list or not all(type(tag) is str for tag in value):
+                raise ValueError(
+                    f"{self.locate(row, 'tags')}: expected a string or list of strings")
+            tags.append(value)
+        return Ragged.from_lists(tags)
+
+
+def _parse_cashflows(records):
+    kinds = records.kinds(CASHFLOW_FIELDS)
+    groups = records.check_fields(COMMON_FIELDS["cashflow"], (kinds, CASHFLOW_FIELDS))
+    every = range(len(records))
+
+    d0, d1 = np.zeros(len(records)), np.zeros(len(records))
+    param, final = np.full(len(records), np.nan), np.full(len(records), np.nan)
+    for kind, rows in groups.items():
+        if kind == "Present":
+            d0[rows], d1[rows] = -1, 0
+        elif kind == "Future":
+            d1[rows] = records.integers("n", rows)
+            d0[rows] = d1[rows] - 1
+        elif kind in ("Perpetuity", "GeoPerpetuity"):
+            d0[rows], d1[rows] = records.integers("d0", rows, 0), inf
+        else:
+            d0[rows], d1[rows] = records.periods("d", rows)
+
+        if kind == "Gradient":
+            param[rows] = records.numbers("G", rows)
+        elif kind in ("Geometric", "GeoPerpetuity"):
+            param[rows] = records.numbers("g", rows)
+        elif kind == "LearningCurve":
+            param[rows] = records.numbers("learning_rate", rows)
+            final[rows] = records.numbers("final_amount", rows, np.nan)
+
+    return {
+        "project": records.owners.astype(np.int64),
+        "kind": np.array([Portfolio.KINDS.index(kind) for kind in kinds], dtype=np.int8),
+        "amount": records.numbers("amount", every),
+        "d0": d0,
+        "d1": d1,
+        "param": param,
+        "final": final,
+        "title": records.strings("title", every, [
+            f"{kind} {row + 1}" for row, kind in enumerate(kinds)]),
+        "tags": records.tags(every),
+    }
+
+
+def _parse_taxes(records):
+    records.check_fields(COMMON_FIELDS["tax"])
+    every = range(len(records))
+    tags = records.strings("tag", every, [None] * len(records))
+    return {
+        "project": records.owners.astype(np.int64),
+        "tag": tags,
+        "rate": records.numbers("rate", every),
+        "carry_back": records.windows("carry_back", every),
+        "carry_forward": records.windows("carry_forward", every),
+        "title": records.strings("title", every, [f"Tax on {tag}" for tag in tags]),
+    }
+
+
+def _parse_depreciations(records, cashflows, cf):
+    kinds = records.kinds(DEPRECIATION_FIELDS)
+    records.check_fields(COMMON_FIELDS["depreciation"], (kinds, DEPRECIATION_FIELDS))
+    every = range(len(records))
+    d0, d1 = records.periods("d", every)
+
+    titles = dict()  # Maps (project, title) to the first row of that cashflow
+    if len(records):
+        for row, (project, title) in enumerate(zip(cashflows.owners.tolist(), cf["title"])):
+            titles.setdefault((project, title), row)
+
+    depreciated = []
+    for row in every:
+        rows = _depreciated(records, row, cashflows, cf, titles)
+        n = cf["d1"][rows[0]]
+        if d0[row] < n <= d1[row]:
+            raise ValueError(
+                f"{records.locate(row, 'cashflows')}: paid within the depreciation period")
+        depreciated.append(rows)
+
+    declining = np.array([kind == "DecliningBalance" for kind in kinds], dtype=bool)
+    rate, first_claim = np.full(len(records), np.nan), np.full(len(records), np.nan)
+    rows = np.flatnonzero(declining).tolist()
+    rate[rows] = records.numbers("rate", rows)
+    first_claim[rows] = records.numbers("first_claim", rows, 1.0)
+
+    return {
+        "project": records.owners.astype(np.int64),
+        "kind": np.array([Portfolio.DEPRECIATION_KINDS.index(kind) for kind in kinds], dtype=np.int8),
+        "d0": d0,
+        "d1": d1,
+        "salvage": records.numbers("salvage", every, 0.0),
+        "rate": rate,
+        "first_claim": first_claim,
+        "base": np.array([cf["amount"][rows].sum() for rows in depreciated]),
+        "n": np.array([cf["d1"][rows[0]] for rows in depreciated]),
+        "title": records.strings("title", every, [
+            f"{kind} {row + 1}" for row, kind in enumerate(kinds)]),
+        "tags": records.tags(every),
+        "cashflows": Ragged.from_lists(depreciated, dtype=np.int64),
+    }
+
+
+def _depreciated(records, row, cashflows, cf, titles):
+    """ Returns the rows of the single payments depreciated, in one period """
+    references = records.records[row]["cashflows"]
+    if type(references) is not list:
+        references = [references]
+    if not references:
+        raise ValueError(f"{records.locate(row, 'cashflows')}: expected at least one cashflow")
+
+    project = records.owners[row]
+    first, count = cashflows.first[project], cashflows.first[project + 1] - cashflows.first[project]
+    rows = []
+    for reference in references:
+        if type(reference) is str and (project, reference) in titles:
+            cashflow = titles[project, reference]
+        elif _is_integer(reference) and 0 <= reference < count:
+            cashflow = int(first + reference)
+        else:
+            raise ValueError(
+                f"{records.locate(row, 'cashflows')}: no cashflow {reference!r} in the project")
+        if Portfolio.KINDS[cf["kind"][cashflow]] not in ("Present", "Future"):
+            raise ValueError(
+                f"{records.locate(row, 'cashflows')}: {reference!r} is not a single payment")
+        rows.append(cashflow)
+    if len({cf["d1"][cashflow] for cashflow in rows}) != 1:
+        raise ValueError(
+            f"{records.locate(row, 'cashflows')}: "
+            "depreciated cashflows must occur in the same period")
+    return rows
+
+
+def _is_integer(value):
+    return type(value) in (int, float) and not isinf(value) and int(value) == value
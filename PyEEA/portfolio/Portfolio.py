@@ -0,0 +1,498 @@
+from math import inf, isnan, log
+
+import numpy as np
+
+from .Columns import Strings, Ragged
+from ..Project import Project
+from ..cashflow import (
+    Present,
+    Future,
+    Annuity,
+    Gradient,
+    Geometric,
+    Perpetuity,
+    GeoPerpetuity,
+    LearningCurve,
+)
+from ..taxation import Tax, StraightLine, SumOfYearsDigits, DecliningBalance
+from ..valuation import tail_worths
+from ..instrumentation import instrument
+
+
+class Portfolio:
+    """ Many projects stored as columns of arrays
+
+    Rather than as a graph of Project, Cashflow, Tax and Depreciation
+    objects, a Portfolio stores the definitions of many projects as four
+    tables of equal-length columns:
+
+        projects: title, interest
+        cashflows: project, kind, amount, d0, d1, param, final, title, tags
+        taxes: project, tag, rate, carry_back, carry_forward, title
+        depreciations: project, kind, d0, d1, salvage, rate, first_claim,
+            base, n, title, tags, cashflows
+
+    The project column of the other tables is the index of a project. Kinds
+    are indices into KINDS (or DEPRECIATION_KINDS). Every cashflow pays in
+    the periods d0 < n <= d1, so a Future paid in period n has d0 = n - 1 and
+    d1 = n, and perpetuities have d1 = inf. The param column holds G for a
+    Gradient, g for a Geometric or GeoPerpetuity, and the learning rate of a
+    LearningCurve, whose final amount is held in final. Undefined values,
+    such as the carry windows of a Tax without any, are NaN. Tags exclude the
+    title, and the cashflows column of depreciations holds the rows of the
+    depreciated cashflows.
+
+    Numeric columns are NumPy arrays, and string columns are Strings and
+    Ragged instances, so a Portfolio can be exchanged with Arrow and with
+    memory-mapped files without converting any objects. Project objects are
+    only created on demand, as views which may be edited without affecting
+    the portfolio. Cashflows before tax are valued in vectorized closed form.
+
+    Attributes:
+        projects, cashflows, taxes, depreciations: Dicts mapping column
+            names to columns. Taxes and depreciations may be omitted.
+
+    See Also:
+        Project
+    """
+
+    KINDS = (
+        "Present", "Future", "Annuity", "Gradient", "Geometric", "Perpetuity",
+        "GeoPerpetuity", "LearningCurve")
+    DEPRECIATION_KINDS = ("StraightLine", "SumOfYearsDigits", "DecliningBalance")
+
+    # Column types: NumPy dtypes, "str" for Strings, and "[]" for Ragged
+    PROJECT_COLUMNS = {"title": "str", "interest": "f8"}
+    CASHFLOW_COLUMNS = {
+        "project": "i8", "kind": "i1", "amount": "f8", "d0": "f8", "d1": "f8",
+        "param": "f8", "final": "f8", "title": "str", "tags": "str[]"}
+    TAX_COLUMNS = {
+        "project": "i8", "tag": "str", "rate": "f8", "carry_back": "f8",
+        "carry_forward": "f8", "title": "str"}
+    DEPRECIATION_COLUMNS = {
+        "project": "i8", "kind": "i1", "d0": "f8", "d1": "f8", "salvage": "f8",
+        "rate": "f8", "first_claim": "f8", "base": "f8", "n": "f8", "title": "str",
+        "tags": "str[]", "cashflows": "i8[]"}
+
+    CHUNK_ELEMENTS = 2 ** 22  # Array elements evaluated at once
+
+    def __init__(self, projects, cashflows, taxes=None, depreciations=None):
+        self.projects = dict(projects)
+        self.cashflows = dict(cashflows)
+        self.taxes = dict(taxes) if taxes is not None else _empty(self.TAX_COLUMNS)
+        self.depreciations = (
+            dict(depreciations) if depreciations is not None
+            else _empty(self.DEPRECIATION_COLUMNS))
+
+        for name, table, schema in self._tables():
+            if missing := [column for column in schema if column not in table]:
+                raise ValueError(f"Columns {missing} are missing from the {name} table")
+            if len({len(column) for column in table.values()}) > 1:
+                raise ValueError(f"Columns of the {name} table differ in length")
+        self._groups = dict()  # Rows of each table, grouped by project
+
+    def _tables(self):
+        return [
+            ("projects", self.projects, self.PROJECT_COLUMNS),
+            ("cashflows", self.cashflows, self.CASHFLOW_COLUMNS),
+            ("taxes", self.taxes, self.TAX_COLUMNS),
+            ("depreciations", self.depreciations, self.DEPRECIATION_COLUMNS),
+        ]
+
+    @classmethod
+    def from_projects(cls, projects):
+        """ Converts Project instances to a Portfolio
+
+        Raises:
+            TypeError: A cashflow or depreciation is of a kind which cannot be
+                stored as columns, such as Dynamic
+        """
+        kinds = {kind: code for code, kind in enumerate(cls.KINDS)}
+        dp_kinds = {kind: code for code, kind in enumerate(cls.DEPRECIATION_KINDS)}
+        projects = list(projects)
+
+        cf_rows, tax_rows, dp_rows = [], [], []
+        for p, project in enumerate(projects):
+            rows = dict()  # Maps each cashflow to its (final) row
+            for cashflow in project.get_cashflows():
+                kind = type(cashflow).__name__
+                if kind not in kinds:
+                    raise TypeError(f"Cashflows of type {kind} cannot be stored as columns")
+                rows[id(cashflow)] = len(cf_rows)
+                cf_rows.append(
+                    (p, kinds[kind], cashflow.amount) + _describe_cashflow(cashflow)
+                    + (cashflow.title, cashflow.tags[1:]))
+
+            for tax in project.get_taxes():
+                carry_back, carry_forward = tax.get_carry_windows()
+                tax_rows.append((
+                    p, tax.get_tag(), tax.get_rate(), _nan(carry_back), _nan(carry_forward),
+                    tax.get_title()))
+
+            for dp in project.get_depreciations():
+                kind = type(dp).__name__
+                if kind not in dp_kinds:
+                    raise TypeError(f"Depreciations of type {kind} cannot be stored as columns")
+                dp_rows.append((
+                    p, dp_kinds[kind], dp.d[0], dp.d[1], dp.salvage,
+                    dp.rate if kind == "DecliningBalance" else np.nan,
+                    getattr(dp, "_first_claim", np.nan), dp.base,
+                    dp.get_cashflows()[0].n, dp.get_title(), dp.tags[1:],
+                    [rows[id(cf)] for cf in dp.get_cashflows() if id(cf) in rows]))
+
+        projects = _columns(
+            [(project.title, project.interest) for project in projects], cls.PROJECT_COLUMNS)
+        cashflows = _columns(cf_rows, cls.CASHFLOW_COLUMNS)
+        taxes = _columns(tax_rows, cls.TAX_COLUMNS)
+        depreciations = _columns(dp_rows, cls.DEPRECIATION_COLUMNS)
+        return cls(projects, cashflows, taxes, depreciations)
+
+    def __len__(self):
+        return len(self.projects["interest"])
+
+    def __getitem__(self, k):
+        return self.get_project(k)
+
+    def __iter__(self):
+        return (self.get_project(k) for k in range(len(self)))
+
+    def get_titles(self):
+        return self.projects["title"].tolist()
+
+    def get_interests(self):
+        return self.projects["interest"]
+
+    def get_rows(self, table, k):
+        """ Returns the rows of a table ("cashflows", "taxes" or
+        "depreciations") belonging to project k, in order
+        """
+        if table not in self._groups:
+            projects = getattr(self, table)["project"]
+            order = np.argsort(projects, kind="stable")
+            bounds = np.searchsorted(projects[order], np.arange(len(self) + 1))
+            self._groups[table] = (order, bounds)
+        order, bounds = self._groups[table]
+        return order[bounds[k]:bounds[k + 1]]
+
+    def get_project(self, k):
+        """ Creates a Project instance from the definition of project k """
+        rows = self.get_rows("cashflows", k)
+        cashflows = {row: self._make_cashflow(row) for row in rows.tolist()}
+        depreciations = [
+            self._make_depreciation(row, cashflows)
+            for row in self.get_rows("depreciations", k).tolist()]
+        taxes = [self._make_tax(row) for row in self.get_rows("taxes", k).tolist()]
+        return Project.from_components(
+            self.projects["title"][k], float(self.projects["interest"][k]),
+            cashflows.values(), depreciations, taxes)
+
+    def to_projects(self):
+        """ Creates a Project instance for every project of the portfolio """
+        return list(self)
+
+    def _make_cashflow(self, row):
+        c = self.cashflows
+        kind = self.KINDS[c["kind"][row]]
+        amount, param = float(c["amount"][row]), float(c["param"][row])
+        d = [int(c["d0"][row]), _period(c["d1"][row])]
+        title, tags = c["title"][row], c["tags"][row]
+
+        if kind == "Present":
+            return Present(amount, title, tags)
+        elif kind == "Future":
+            return Future(amount, d[1], title, tags)
+        elif kind == "Annuity":
+            return Annuity(amount, d, title, tags)
+        elif kind == "Gradient":
+            return Gradient(amount, param, d, title, tags)
+        elif kind == "Geometric":
+            return Geometric(amount, param, d, title, tags)
+        elif kind == "Perpetuity":
+            return Perpetuity(amount, d[0], title, tags)
+        elif kind == "GeoPerpetuity":
+            return GeoPerpetuity(amount, param, d[0], title, tags)
+        else:
+            final = float(c["final"][row])
+            return LearningCurve(amount, param, d, None if isnan(final) else final, title, tags)
+
+    def _make_depreciation(self, row, cashflows):
+        c = self.depreciations
+        kind = self.DEPRECIATION_KINDS[c["kind"][row]]
+        d = [int(c["d0"][row]), int(c["d1"][row])]
+        salvage, title, tags = float(c["salvage"][row]), c["title"][row], c["tags"][row]
+
+        depreciated = [cashflows[r] for r in c["cashflows"][row] if r in cashflows]
+        if not depreciated:
+            depreciated = [Future(float(c["base"][row]), int(c["n"][row]))]
+
+        if kind == "StraightLine":
+            depreciation = StraightLine(depreciated, d, salvage, title, tags)
+        elif kind == "SumOfYearsDigits":
+            depreciation = SumOfYearsDigits(depreciated, d, salvage, title, tags)
+        else:
+            depreciation = DecliningBalance(
+                depreciated, float(c["rate"][row]), d, salvage,
+                float(c["first_claim"][row]), title, tags)
+        depreciation.tags = [title, *tags]
+        return depreciation
+
+    def _make_tax(self, row):
+        c = self.taxes
+        return Tax(
+            c["tag"][row], float(c["rate"][row]), c["title"][row],
+            _none(c["carry_back"][row]), _none(c["carry_forward"][row]))
+
+    def get_final_period(self):
+        """ Returns the final finite period of every project
+
+        As Project.get_final_period(finite=True), perpetuities count up to
+        their first period only.
+        """
+        c = self.cashflows
+        finals = np.where(np.isinf(c["d1"]), c["d0"], c["d1"])
+        result = np.zeros(len(self))
+        np.maximum.at(result, c["project"], finals)
+        return result.astype(np.int64)
+
+    @instrument("portfolio")
+    def amounts(self, ns, rows=None):
+        """ Evaluates cashflows over many periods at once
+
+        Args:
+            ns: A sequence of periods
+            rows: Optional; The rows of the cashflows to evaluate. Defaults
+                to every cashflow
+
+        Returns:
+            A float array whose rows correspond to cashflows and whose
+            columns correspond to periods
+        """
+        c = self.cashflows
+        rows = np.arange(len(c["kind"])) if rows is None else np.asarray(rows)
+        ns = np.asarray(ns, dtype=float)[None, :]
+        kind = c["kind"][rows]
+        amount, param = c["amount"][rows, None], c["param"][rows, None]
+        d0, d1 = c["d0"][rows, None], c["d1"][rows, None]
+
+        active = (d0 < ns) & (ns <= d1)
+        k = np.where(active, ns - d0 - 1, 0)  # The number of payments made before
+        amounts = np.broadcast_to(amount, active.shape).copy()
+
+        gradient = kind == self.KINDS.index("Gradient")
+        amounts[gradient] += param[gradient] * k[gradient]
+        geometric = np.isin(kind, [self.KINDS.index(kind) for kind in ("Geometric", "GeoPerpetuity")])
+        amounts[geometric] *= (1 + param[geometric]) ** k[geometric]
+
+        learning = np.flatnonzero(kind == self.KINDS.index("LearningCurve"))
+        if len(learning):
+            b = np.log(param[learning]) / log(2.0)
+            curve = amount[learning] * (k[learning] + 1) ** b
+            final = c["final"][rows][learning, None]
+            direction = np.copysign(1.0, final - amount[learning])
+            passed = ~np.isnan(final) & (direction * (curve - amount[learning]) < 0)
+            amounts[learning] = np.where(passed, final, curve)
+
+        return np.where(active, amounts, 0.0)
+
+    @instrument("portfolio")
+    def present_worths(self, i=None):
+        """ Returns the present worth of every cashflow
+
+        Args:
+            i: Optional; The interest rate. Defaults to that of each project
+
+        Returns:
+            A float array with an element per cashflow
+        """
+        c = self.cashflows
+        i = self.projects["interest"][c["project"]] if i is None else np.full(len(c["kind"]), float(i))
+        kind, amount, param = c["kind"], c["amount"], c["param"]
+        d0, d1 = c["d0"], c["d1"]
+        D = d1 - d0
+        pv = np.full(len(kind), np.nan)
+
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            discount = (1 + i) ** -d0
+            apwf = np.where(i == 0, D, (1 - (1 + i) ** -D) / i)
+
+            annuity = kind == self.KINDS.index("Annuity")
+            pv[annuity] = (amount * apwf)[annuity]
+
+            gradient = kind == self.KINDS.index("Gradient")
+            gpwf = np.where(
+                i == 0, (D ** 2 - D) / 2, ((1 + i) ** D - i * D - 1) / (i ** 2 * (1 + i) ** D))
+            pv[gradient] = (amount * apwf + param * gpwf)[gradient]
+
+            geometric = kind == self.KINDS.index("Geometric")
+            gpv = np.where(
+                i == param, amount * D / (1 + i),
+                amount * (1 - ((1 + param) / (1 + i)) ** D) / (i - param))
+            pv[geometric] = gpv[geometric]
+
+            perpetuity = kind == self.KINDS.index("Perpetuity")
+            pv[perpetuity] = (amount / i)[perpetuity]
+
+            geo_perpetuity = kind == self.KINDS.index("GeoPerpetuity")
+            pv[geo_perpetuity] = np.where(i > param, amount / (i - param), np.nan)[geo_perpetuity]
+
+            pv *= discount
+
+            single = np.isin(kind, [self.KINDS.index(k) for k in ("Present", "Future")])
+            pv[single] = (amount * (1 + i) ** -d1)[single]
+
+        learning = np.flatnonzero(kind == self.KINDS.index("LearningCurve"))
+        if len(learning):
+            pv[learning] = self._discounted_sums(learning, i[learning])
+        return pv
+
+    def _discounted_sums(self, rows, i):
+        """ Sums the discounted amounts of finite cashflows, in chunks of rows """
+        ns = np.arange(int(self.cashflows["d1"][rows].max()) + 1)
+        sums = np.zeros(len(rows))
+        step = max(1, self.CHUNK_ELEMENTS // len(ns))
+        for start in range(0, len(rows), step):
+            chunk = slice(start, start + step)
+            discount = (1 + i[chunk, None]) ** -ns[None, :].astype(float)
+            sums[chunk] = (self.amounts(ns, rows[chunk]) * discount).sum(axis=1)
+        return sums
+
+    def tail_worths(self, n, i=None, after_tax=True):
+        """ Returns the present worth of every project's payments after period n
+
+        Only perpetuities make payments beyond the final finite period. Under
+        taxes, the tax on their payments after each project's final finite
+        period is added in proportion, as TaxCashflow.to_pv does, since
+        net_cashflows only includes taxes up to that period.
+
+        Args:
+            n: The final period excluded from the tails, which should be at
+                least the final finite period of every project
+            i: Optional; An interest rate, or an array of interest rates with
+                an element per project. Defaults to that of each project
+            after_tax: Optional; If true, taxes are applied
+
+        Returns:
+            A float array with an element per project
+        """
+        c = self.cashflows
+        rows = np.flatnonzero(np.isin(
+            c["kind"], [self.KINDS.index(k) for k in ("Perpetuity", "GeoPerpetuity")]))
+        projects = c["project"][rows]
+        rates = np.broadcast_to(self.get_interests() if i is None else i, len(self))[projects]
+        g = np.nan_to_num(c["param"][rows])
+        worths = tail_worths(c["amount"][rows], g, c["d0"][rows], n, rates)
+
+        if after_tax and len(self.taxes["project"]):
+            tax_rates = np.zeros(len(rows))
+            for k, row in enumerate(rows.tolist()):
+                tags = {c["title"][row], *c["tags"][row]}
+                taxes = self.get_rows("taxes", projects[k]).tolist()
+                tax_rates[k] = sum(
+                    [self.taxes["rate"][t] for t in taxes if self.taxes["tag"][t] in tags])
+            horizons = self.get_final_period()[projects]
+            taxed = tail_worths(c["amount"][rows], g, c["d0"][rows], horizons, rates)
+            with np.errstate(invalid="ignore"):
+                worths = np.where(
+                    rates > g, worths + tax_rates * taxed,
+                    np.sign(c["amount"][rows] * (1 + tax_rates)) * np.inf)
+        return np.bincount(projects, weights=worths, minlength=len(self))
+
+    @instrument("portfolio")
+    def npw(self, i=None, after_tax=True):
+        """ Returns the Net Present Worth of every project
+
+        Cashflows are valued in vectorized closed form. Projects with taxes or
+        depreciations are valued after tax through a Project view, if after_tax.
+
+        Args:
+            i: Optional; The interest rate. Defaults to that of each project
+            after_tax: Optional; If true, taxes are applied
+
+        Returns:
+            A float array with an element per project
+        """
+        npws = np.bincount(
+            self.cashflows["project"], weights=self.present_worths(i), minlength=len(self))
+        if after_tax:
+            for k in self._taxed_projects().tolist():
+                npws[k] = self.get_project(k).npw(i).amount
+        return npws
+
+    @instrument("portfolio")
+    def net_cashflows(self, n=None, after_tax=True):
+        """ Returns the net cashflows of every project
+
+        Args:
+            n: Optional; The final period. Defaults to the final finite
+                period across all projects
+            after_tax: Optional; If true, taxflows are included
+
+        Returns:
+            A float array whose rows correspond to projects and whose columns
+            correspond to periods from zero to n
+        """
+        n = int(n if n is not None else self.get_final_period().max(initial=0))
+        ns = np.arange(n + 1)
+        result = np.zeros((len(self), n + 1))
+        rows = np.arange(len(self.cashflows["kind"]))
+        step = max(1, self.CHUNK_ELEMENTS // (n + 1))
+        for start in range(0, len(rows), step):
+            chunk = rows[start:start + step]
+            np.add.at(result, self.cashflows["project"][chunk], self.amounts(ns, chunk))
+        if after_tax:
+            for k in self._taxed_projects().tolist():
+                result[k] = self.get_project(k).net_cashflows(n, after_tax)
+        return result
+
+    def _taxed_projects(self):
+        return np.unique(np.concatenate((self.taxes["project"], self.depreciations["project"])))
+
+
+def _describe_cashflow(cashflow):
+    """ Returns the d0, d1, param and final columns of a cashflow """
+    if isinstance(cashflow, Future):
+        return cashflow.n - 1, cashflow.n, np.nan, np.nan
+    d0, d1 = cashflow.d
+    if isinstance(cashflow, Gradient):
+        param = cashflow.G
+    elif isinstance(cashflow, Geometric):
+        param = cashflow.g
+    elif isinstance(cashflow, LearningCurve):
+        final = cashflow.final_amount
+        return d0, d1, cashflow.learning_rate, np.nan if final is None else final
+    else:
+        param = np.nan
+    return d0, d1, param, np.nan
+
+
+def _columns(rows, schema):
+    """ Converts rows of values to the columns of a table """
+    return {
+        name: _column([row[position] for row in rows], kind)
+        for position, (name, kind) in enumerate(schema.items())}
+
+
+def _column(values, kind):
+    if kind == "str":
+        return Strings.from_list(values)
+    elif kind == "str[]":
+        return Ragged.from_lists(values)
+    elif kind.endswith("[]"):
+        return Ragged.from_lists(values, dtype=kind[:-2])
+    return np.array(values, dtype=kind)
+
+
+def _empty(schema):
+    return _columns([], schema)
+
+
+def _nan(value):
+    return np.nan if value is None else float(value)
+
+
+def _none(value):
+    return None if isnan(value) else float(value)
+
+
+def _period(value):
+    return inf if np.isinf(value) else int(value)
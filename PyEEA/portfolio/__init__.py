@@ -0,0 +1,15 @@
+# __init__.py
+
+from .Columns import Strings, Ragged
+from .Portfolio import Portfolio
+from .ArrowExport import (
+    to_arrow,
+    from_arrow,
+    schedule_table,
+    valuation_table,
+    write_parquet,
+    read_parquet,
+    read_projects,
+)
+from .BinaryFormat import write_binary, read_binary
+from .Loader import load_dict, load_json, load_yaml
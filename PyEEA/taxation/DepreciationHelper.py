@@ -4,7 +4,10 @@ from abc import ABC, abstractmethod
 from ..cashflow import Cashflow, NullCashflow
 from ..cashflow.SinglePaymentFactory import Present, Future
 
-from ..utilities import parse_d, parse_ns
+from ..utilities import parse_d, parse_ns, as_periods
+from ..instrumentation import instrument
+
+import numpy as np
 
 
 class Depreciation(ABC):
@@ -75,6 +78,16 @@ class Depreciation(ABC):
         """
         pass
 
+    @instrument("depreciation", per_type=True)
+    def amounts_at(self, ns):
+        """
+        Parameters: ns [tuple(int)] - The periods to get the depreciation expense at.
+        Returns: A NumPy array of depreciation expenses, one per period.
+        """
+        ns = as_periods(ns)
+        return np.array(
+            [self.depreciation_at((n,)).amount for n in ns.tolist()], dtype=float)
+
     def show(self):
         from ..output import generate_cashflow_diagram
         from matplotlib.pyplot import show
@@ -105,6 +118,12 @@ class StraightLine(Depreciation):
 
         return dps[0] if len(dps) == 1 else dps
 
+    @instrument("depreciation", per_type=True)
+    def amounts_at(self, ns):
+        ns = as_periods(ns)
+        expense = (self.base - self.salvage) * self.rate
+        return np.where((self.d[0] < ns) & (ns <= self.d[1]), expense, 0.0)
+
 
 class SumOfYearsDigits(Depreciation):
     def __init_(self, cashflows, d, salvage=0, title=None, tags=None):
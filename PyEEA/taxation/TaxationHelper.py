@@ -1,20 +1,87 @@
 from ..cashflow import Cashflow, NullCashflow
-from ..cashflow import Future, Perpetuity, Dynamic
+from ..cashflow import Present, Future, Perpetuity, GeoPerpetuity, Dynamic
 
-from ..utilities import parse_ns, parse_d, get_final_period
+from ..utilities import parse_ns, parse_d, get_final_period, as_periods
+from ..instrumentation import instrument
 
-from copy import deepcopy
+from math import isinf
+
+import numpy as np
+
+_carry_sweep = None  # _carry_losses, compiled by numba if available, on first use
 
 
 class Tax:
-    def __init__(self, tag, rate, title=None):
+    """ A taxation model applied to tagged cashflows
+
+    Taxes every cashflow carrying a given tag at a flat rate, after
+    shielding by any depreciations carrying the same tag. By default, each
+    period is taxed independently, so that a negative taxable income in
+    some period produces a negative tax (that is, an immediate refund).
+
+    Where losses are instead relieved against the income of other periods,
+    carry-back and carry-forward windows may be supplied. A loss is first
+    carried back against the taxed income of up to carry_back prior periods,
+    generating a refund in the period of the loss, and the remainder is
+    carried forward against the income of up to carry_forward subsequent
+    periods, after which it expires. Losses are always relieved against the
+    oldest eligible income first.
+
+    Attributes:
+        tag: Cashflows and depreciations with this tag are taxed
+        rate: The tax rate, expressed as a decimal
+        carry_back: Optional; The number of prior periods a loss may be
+            carried back to. May be infinite.
+        carry_forward: Optional; The number of subsequent periods a loss may
+            be carried forward to. May be infinite.
+
+    Raises:
+        ValueError: A carry window is negative or not a whole number
+    """
+    def __init__(self, tag, rate, title=None, carry_back=None, carry_forward=None):
+        _check_window("carry_back", carry_back)
+        _check_window("carry_forward", carry_forward)
         self._tag = tag
         self._rate = rate
         self._title = title or ("Tax on %s" % self._tag)
+        self._carry_back = carry_back
+        self._carry_forward = carry_forward
 
     def get_title(self):
         return self._title
 
+    def get_tag(self):
+        return self._tag
+
+    def get_rate(self):
+        return self._rate
+
+    def get_carry_windows(self):
+        """ Returns the carry-back and carry-forward windows, or None for each """
+        return self._carry_back, self._carry_forward
+
+    def is_linear(self):
+        """ Returns true if the tax is proportional to each taxed cashflow
+
+        Without loss carry windows, each period is taxed independently and
+        the tax generated by a cashflow does not depend on any other.
+        """
+        return self._carry_back is None and self._carry_forward is None
+
+    @instrument("taxation")
+    def assess(self, income):
+        """ Computes the taxes due on a series of taxable incomes
+
+        Args:
+            income: A float array of taxable income per period, or a
+                two-dimensional array whose rows are independent series
+
+        Returns:
+            A float array of taxes of the same shape as income
+        """
+        return assess_taxes(income, self._rate, self._carry_back, self._carry_forward)
+
+    @instrument("taxation")
     def generate_cashflow(self, cashflows=[], depreciations=[]):
         # Remove any irrelevant cashflows
         taxable_cashflows = [cf for cf in cashflows if self._tag in cf.tags] or [
@@ -32,40 +99,200 @@ class Tax:
             get_final_period(cashflows, finite=True),
             title=self.get_title(),
             tags=self._tag,
+            carry_back=self._carry_back,
+            carry_forward=self._carry_forward,
         )
 
 
 class TaxCashflow(Dynamic):
-    def __init__(self, rate, cashflows, depreciations, d, title=None, tags=None):
+    def __init__(
+        self, rate, cashflows, depreciations, d, title=None, tags=None,
+        carry_back=None, carry_forward=None
+    ):
         super().__init__(TaxCashflow.tax_fun, d, title, tags)
         self._rate = rate
         self._cashflows = cashflows
         self._depreciations = depreciations
+        self._carry_back = carry_back
+        self._carry_forward = carry_forward
+        self._taxes = None  # Computed lazily by get_taxes()
 
     def to_shorthand(self):
         return "Tax(%s, %.2f%%)" % (self.tags[0], self._rate * 100)
 
+    def get_taxable_income(self):
+        """ Returns the net taxable income for each period from zero to d1 """
+        ns = np.arange(self.d[1] + 1)
+        taxable = sum([cashflow.amounts_at(ns) for cashflow in self._cashflows])
+        shielding = sum([depreciation.amounts_at(ns) for depreciation in self._depreciations])
+        return taxable - shielding
+
+    def get_taxes(self):
+        """ Returns the tax amount for each period from zero to d1
+
+        Taxes are computed once for all periods by a single forward sweep over
+        the taxable income, then reused for every subsequent evaluation of
+        this TaxCashflow.
+        """
+        if self._taxes is None:
+            self._taxes = assess_taxes(
+                self.get_taxable_income(),
+                self._rate,
+                self._carry_back,
+                self._carry_forward)
+        return self._taxes
+
+    def is_perpetual(self):
+        """ Returns true if any taxed cashflow pays beyond the horizon d """
+        return any([
+            isinstance(cashflow, (Perpetuity, GeoPerpetuity)) for cashflow in self._cashflows])
+
+    def amounts_at(self, ns):
+        ns = as_periods(ns)
+        taxes = self.get_taxes()
+        inrange = (0 <= ns) & (ns < len(taxes))
+        return np.where(inrange, taxes[np.clip(ns, 0, len(taxes) - 1)], 0.0)
+
     def to_pv(self, i):
-        # Handles every cashflow in range d
-        pv = super().to_pv(i)
+        """ Converts the taxes to an equivalent Present cashflow
 
-        # Check for Perpetuities
-        if perpetuities := [cf for cf in self._cashflows if isinstance(cf, Perpetuity)]:
-            perpetuities = deepcopy(perpetuities)
-            for perpetuity in perpetuities:
-                perpetuity.amount = perpetuity[self.d[1] + 1].amount
-                perpetuity.d0 = self.d[1]
-            pv += sum([perpetuity.to_pv(i) for perpetuity in perpetuities]) * self._rate
+        Taxes over the finite horizon d are discounted as a single vector.
+        Taxed Perpetuity and GeoPerpetuity instances continue to pay beyond
+        the horizon, so the tax on their remaining payments is added as a
+        closed-form tail, taxed at the flat rate. Loss carry windows apply
+        within the finite horizon only.
+        """
+        ns = np.arange(self.d[0], self.d[1] + 1)
+        discounted = np.dot(self.amounts_at(ns), (1 + i) ** -ns.astype(float))
 
-        return pv
+        tail = sum([
+            cashflow.tail_pv(i, self.d[1]).amount
+            for cashflow in self._cashflows
+            if isinstance(cashflow, (Perpetuity, GeoPerpetuity))
+        ])
+
+        return Present(discounted + tail * self._rate, self.title, self.tags)
 
     # Because of the way Dynamic is set up, we want to reference self. At the same time,
     # we need the function to be static, so that we can manually supply 'self'.
     @staticmethod
     def tax_fun(self, n):
-        taxable_sum = sum([cashflow[n] for cashflow in self._cashflows])
-        shielding_sum = sum([depreciation[n] for depreciation in self._depreciations])
+        taxes = self.get_taxes()
+        taxed_amount = taxes[n] if 0 <= n < len(taxes) else 0.0
+        return Future(taxed_amount, n, self.title, self.tags)
+
+
+def assess_taxes(income, rate, carry_back=None, carry_forward=None):
+    """ Computes the taxes due on one or many series of taxable incomes
+
+    See Tax. Without carry windows, each period is taxed independently.
+    Otherwise, losses are relieved by a forward sweep over each series.
+
+    Raises:
+        ValueError: A carry window is negative or not a whole number
+    """
+    _check_window("carry_back", carry_back)
+    _check_window("carry_forward", carry_forward)
+    income = np.asarray(income, dtype=float)
+    if carry_back is None and carry_forward is None:
+        return income * rate
+
+    series = np.atleast_2d(income)
+    back = _window(carry_back, series.shape[1])
+    forward = _window(carry_forward, series.shape[1])
+    sweep = _get_carry_sweep()
+    assessed = np.array([sweep(row, back, forward) for row in series])
+    return assessed.reshape(income.shape) * rate
+
+
+def _check_window(name, periods):
+    """ Raises a ValueError unless a carry window is None, infinite or a whole number """
+    if periods is None:
+        return
+    try:
+        valid = periods >= 0 and (isinf(periods) or int(periods) == periods)
+    except (TypeError, ValueError):
+        valid = False
+    if not valid:
+        raise ValueError(f"{name} must be a non-negative whole number of periods, not {periods!r}")
+
+
+def _window(periods, n_periods):
+    """ Converts an optional, possibly infinite carry window to an integer """
+    if periods is None:
+        return 0
+    return n_periods if isinf(periods) else int(periods)
+
+
+def _carry_losses(income, carry_back, carry_forward):
+    """ Applies loss carry-back and carry-forward to per-period income
+
+    Performs a single forward sweep over the taxable income of each period.
+    Positive income is first reduced by any unexpired losses carried forward,
+    oldest first. Negative income (a loss) is first carried back against the
+    remaining assessed income of the preceding carry_back periods, oldest
+    first, and any remainder is held to be carried forward for at most
+    carry_forward periods.
+
+    Because losses and absorbable income are both consumed in the order in
+    which they arose, two pointers suffice to track the oldest unconsumed
+    entries, and the sweep runs in linear time regardless of window length.
+
+    Args:
+        income: A float array of taxable income per period
+        carry_back: The number of prior periods a loss may be carried to
+        carry_forward: The number of subsequent periods a loss may be carried to
+
+    Returns:
+        A float array of assessed income per period. Negative values are
+        refunds generated by carrying a loss back.
+    """
+    n_periods = income.shape[0]
+    assessed = np.zeros(n_periods)
+    absorbable = np.zeros(n_periods)  # Taxed income still open to carry-back
+    losses = np.zeros(n_periods)  # Unrelieved losses open to carry-forward
+    head_back = 0
+    head_forward = 0
+
+    for n in range(n_periods):
+        amount = income[n]
+        if amount >= 0:
+            head_forward = max(head_forward, n - carry_forward)
+            while head_forward < n and amount > 0:
+                if losses[head_forward] > amount:
+                    losses[head_forward] -= amount
+                    amount = 0.0
+                else:
+                    amount -= losses[head_forward]
+                    losses[head_forward] = 0.0
+                    head_forward += 1
+            assessed[n] = amount
+            absorbable[n] = amount
+        else:
+            loss = -amount
+            head_back = max(head_back, n - carry_back)
+            while head_back < n and loss > 0:
+                if absorbable[head_back] > loss:
+                    absorbable[head_back] -= loss
+                    assessed[n] -= loss
+                    loss = 0.0
+                else:
+                    loss -= absorbable[head_back]
+                    assessed[n] -= absorbable[head_back]
+                    absorbable[head_back] = 0.0
+                    head_back += 1
+            losses[n] = loss
+
+    return assessed
 
-        taxed_amount = (taxable_sum - shielding_sum) * self._rate
-        return taxed_amount
 
+def _get_carry_sweep():
+    """ Returns _carry_losses, compiled by numba (an optional accelerator) if available """
+    global _carry_sweep
+    if _carry_sweep is None:
+        try:
+            from numba import njit
+            _carry_sweep = njit(cache=True)(_carry_losses)
+        except ImportError:
+            _carry_sweep = _carry_losses
+    return _carry_sweep
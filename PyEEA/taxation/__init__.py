@@ -6,4 +6,4 @@ from .DepreciationHelper import (
     SumOfYearsDigits,
     DecliningBalance,
 )
-from .TaxationHelper import Tax
+from .TaxationHelper import Tax, assess_taxes
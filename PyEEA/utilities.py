@@ -100,3 +100,40 @@ def get_final_period(cashflows, finite=True):
         n = final_period(cashflow)
         final_n = n if n > final_n else final_n
     return final_n
+
+
+def as_periods(ns):
+    """ Converts a nonspecific period argument into an array of periods
+
+    Accepts the same arguments as parse_ns, as well as ranges and arrays,
+    and returns a one-dimensional integer NumPy array. Used by vectorized
+    evaluations such as Cashflow.amounts_at().
+    """
+    import numpy as np
+
+    if isinstance(ns, slice):
+        ns = parse_ns(ns)
+    return np.atleast_1d(np.asarray(ns, dtype=int))
+
+
+def get_amounts(cashflows, ns):
+    """ Evaluates many cashflows over many periods at once
+
+    Args:
+        cashflows: A Cashflow or sequence of objects providing amounts_at(),
+            such as Cashflows and Depreciations
+        ns: The periods to evaluate, in any form accepted by as_periods
+
+    Returns:
+        A two-dimensional float NumPy array whose rows correspond to
+        cashflows and whose columns correspond to periods
+    """
+    import numpy as np
+
+    cashflows = list(cashflows) if isinstance(cashflows, Iterable) else [cashflows]
+    ns = as_periods(ns)
+
+    amounts = np.zeros((len(cashflows), len(ns)))
+    for row, cashflow in enumerate(cashflows):
+        amounts[row] = cashflow.amounts_at(ns)
+    return amounts
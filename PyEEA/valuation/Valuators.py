@@ -1,8 +1,12 @@
 from ..cashflow import NullCashflow, Present, Future, Annuity, Perpetuity
-from ..utilities import get_final_period
+from ..utilities import get_final_period, get_amounts
+from ..instrumentation import instrument, count
 from math import isinf
 
+import numpy as np
 
+
+@instrument("valuator")
 def npw(cashflows, i, title=None) -> Present:
     """ Computes the Net Present Worth of a sequence of cashflows
 
@@ -36,6 +40,7 @@ def npw(cashflows, i, title=None) -> Present:
     return npw
 
 
+@instrument("valuator")
 def nfw(cashflows, i, n, title=None) -> Future:
     """ Computes the Net Future Worth of a sequence of cashflows
 
@@ -59,10 +64,11 @@ def nfw(cashflows, i, n, title=None) -> Future:
         Future
     """
     nfw = sum([cf.to_fv(i, n) for cf in cashflows]) or NullCashflow()
-    npw.set_title(title or f"Net Future Worth")
+    nfw.set_title(title or f"Net Future Worth")
     return nfw
 
 
+@instrument("valuator")
 def eacf(cashflows, i, d, title=None) -> Annuity:
     """ Computes the Equivalent Annual Cashflow of a sequence of cashflows
 
@@ -90,6 +96,7 @@ def eacf(cashflows, i, d, title=None) -> Annuity:
     return eacf
 
 
+@instrument("valuator")
 def epcf(cashflows, i, d0, title=None) -> Perpetuity:
     """ Computes the Net Present Worth of a sequence of cashflows
 
@@ -120,6 +127,7 @@ def epcf(cashflows, i, d0, title=None) -> Perpetuity:
     return epcf
 
 
+@instrument("valuator")
 def bcr(cashflows, i=0) -> float:
     """ Computes a Benefit-To-Cost ratio for a sequence of cashflows
 
@@ -148,7 +156,8 @@ def bcr(cashflows, i=0) -> float:
     else:
         return None
 
-def irr(cashflows, i0=0.1) -> float:
+@instrument("valuator")
+def irr(cashflows, i0=0.1, net_cashflows=None) -> float:
     """ Computes the Internal Rate of Return for a sequence of Cashflows
     
     Computes the interest rate for which the net present value of the Cashflow
@@ -163,6 +172,8 @@ def irr(cashflows, i0=0.1) -> float:
     Args:
         cashflows: A sequence of Cashflow instances
         i0: An initial guess for the solver
+        net_cashflows: Optional; The net cashflow amounts per period, if they
+            have already been computed, e.g. by Project.net_cashflows()
 
     Returns:
         The internal rate of return expressed as a decimal, or None if it
@@ -170,26 +181,26 @@ def irr(cashflows, i0=0.1) -> float:
     """
     # IRR only exists if we have both net positive AND net negative cashflows
     # over all periods.
-    nf = get_final_period(cashflows, finite=True)
-    # Note that we need to check longer than the final finite period to account
-    # for cashflows incurred via perpetuities.
-    net_cashflows = [sum([cf[n] for cf in cashflows]) for n in range(nf + 2)]
-    if not all([
-            any([ncf > 0 for ncf in net_cashflows]),
-            any([ncf < 0 for ncf in net_cashflows]),
-    ]):
+    if net_cashflows is None:
+        # Note that we need to check longer than the final finite period to
+        # account for cashflows incurred via perpetuities.
+        nf = get_final_period(cashflows, finite=True)
+        net_cashflows = get_net_cashflows(cashflows, nf + 1)
+    if not (np.any(net_cashflows > 0) and np.any(net_cashflows < 0)):
         return None
 
     # Compute IRR by solving where NPW is zero
     from scipy.optimize import fsolve
     def irr_fun(i):
         return npw(cashflows, i[0]).amount
-    irrs, _, success, _ = fsolve(irr_fun, i0, factor=0.1, full_output=True)
+    irrs, info, success, _ = fsolve(irr_fun, i0, factor=0.1, full_output=True)
+    count("solver", "irr.fsolve_evaluations", info["nfev"])
 
     return irrs[0] if success else None
 
 
-def mirr(cashflows, e_inv, e_fin) -> float:
+@instrument("valuator")
+def mirr(cashflows, e_inv, e_fin, net_cashflows=None) -> float:
     """ Computes the Modified IRR for a sequence of cashflows
 
     Computes the interest rate for which the Net Present Worth of a sequence 
@@ -204,6 +215,8 @@ def mirr(cashflows, e_inv, e_fin) -> float:
     Args:
         e_inv: Investment rate, expressed as a decimal
         e_fin: Finance rate, expressed as a decimal
+        net_cashflows: Optional; The net cashflow amounts from period zero to
+            the final period, if they have already been computed
 
     Returns:
         The Modified Internal Rate of Return, expressed as a decimal
@@ -211,19 +224,224 @@ def mirr(cashflows, e_inv, e_fin) -> float:
     nf = get_final_period(cashflows)
     if isinf(nf):
         return None
-   
-    net_cashflows = [sum([cf[n] for cf in cashflows]) for n in range(nf + 1)]
-    if not all(
-        [
-            any([ncf > 0 for ncf in net_cashflows]),
-            any([ncf < 0 for ncf in net_cashflows]),
-        ]
-    ):
+
+    if net_cashflows is None:
+        net_cashflows = get_net_cashflows(cashflows, nf)
+    net_cashflows = net_cashflows[:nf + 1]
+    if not (np.any(net_cashflows > 0) and np.any(net_cashflows < 0)):
         return None
 
-    fv_rvnu = sum([ncf.to_fv(e_fin, nf) for ncf in net_cashflows if ncf > 0]) or NullCashflow()
-    pv_cost = sum([ncf.to_pv(e_inv) for ncf in net_cashflows if ncf < 0])
+    ns = np.arange(nf + 1)
+    fv_rvnu = np.dot(np.clip(net_cashflows, 0, None), (1 + e_fin) ** (nf - ns))
+    pv_cost = np.dot(np.clip(net_cashflows, None, 0), (1 + e_inv) ** -ns.astype(float))
+
+    mirr = (fv_rvnu / -pv_cost)**(1/nf) - 1
+    return float(mirr)
+
+
+@instrument("valuator")
+def payback(cashflows, net_cashflows=None) -> float:
+    """ Computes the simple payback period for a sequence of cashflows
+
+    Finds the period from which the cumulative net cashflow remains
+    non-negative, interpolating linearly within that period. Interest is
+    NOT considered; refer to discounted_payback for the discounted form.
+
+    Args:
+        cashflows: A sequence of Cashflow instances
+        net_cashflows: Optional; The net cashflow amounts per period, if they
+            have already been computed
+
+    Returns:
+        The payback period as a float, or None if the cashflows are never
+            paid back within the final finite period.
+    """
+    return discounted_payback(cashflows, 0, net_cashflows)
+
+
+@instrument("valuator")
+def discounted_payback(cashflows, i, net_cashflows=None) -> float:
+    """ Computes the discounted payback period for a sequence of cashflows
+
+    Finds the period from which the cumulative net present worth remains
+    non-negative, interpolating linearly within that period.
+
+    Args:
+        cashflows: A sequence of Cashflow instances
+        i: An interest rate, expressed as a decimal
+        net_cashflows: Optional; The net cashflow amounts per period, if they
+            have already been computed
+
+    Returns:
+        The payback period as a float, or None if the cashflows are never
+            paid back within the final finite period.
+
+    See Also:
+        payback_periods: Batch form across many projects and interest rates
+    """
+    if net_cashflows is None:
+        net_cashflows = get_net_cashflows(
+            cashflows, get_final_period(cashflows, finite=True))
+    pbp = payback_periods([net_cashflows], i)[0]
+    return None if np.isnan(pbp) else float(pbp)
+
+
+@instrument("valuator")
+def payback_periods(net_cashflows, i=0):
+    """ Computes payback periods for many projects and interest rates at once
+
+    Discounts the net cashflows of every project at every interest rate,
+    takes the cumulative sum over periods, and locates the period following
+    the last in which it is negative, all as array operations. The payback
+    period is interpolated linearly within that period. Cashflows whose
+    cumulative sum is never negative pay back at their first nonzero
+    period.
+
+    Args:
+        net_cashflows: A sequence of net cashflow arrays, one per project,
+            indexed by period. Arrays of differing lengths are zero-padded.
+        i: Optional; An interest rate or sequence of interest rates. Zero
+            gives the simple payback period.
+
+    Returns:
+        If i is a number, a float array of payback periods, one per project;
+        If i is a sequence, a two-dimensional float array whose rows
+            correspond to projects and whose columns correspond to rates.
+        Projects never paid back have a payback period of NaN.
+    """
+    rates = np.atleast_1d(np.asarray(i, dtype=float))
+    ncfs = stack_net_cashflows(net_cashflows)
+
+    ns = np.arange(ncfs.shape[1], dtype=float)
+    discounted = ncfs[:, None, :] * (1 + rates)[None, :, None] ** -ns
+    cumulative = np.cumsum(discounted, axis=-1)
+
+    # Payback occurs in the period after the last negative cumulative, if
+    # there is such a period
+    negative = cumulative < 0
+    length = ncfs.shape[1]
+    previous = (length - 1 - np.argmax(negative[..., ::-1], axis=-1))[..., None]
+    n = np.minimum(previous + 1, length - 1)
+    found = negative.any(axis=-1) & (previous[..., 0] < length - 1)
+
+    shortfall = -np.take_along_axis(cumulative, previous, axis=-1)
+    recovery = np.take_along_axis(discounted, n, axis=-1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pbps = np.where(found, (previous + shortfall / recovery)[..., 0], np.nan)
+
+    # Cashflows never in deficit pay back at their first nonzero period
+    nonzero = discounted != 0
+    first = np.argmax(nonzero, axis=-1).astype(float)
+    surplus = ~negative.any(axis=-1) & nonzero.any(axis=-1)
+    pbps = np.where(surplus, first, pbps)
+
+    return pbps if np.ndim(i) else pbps[:, 0]
+
+
+@instrument("valuator")
+def irr_batch(net_cashflows, lo=-0.5, hi=10.0, tol=1e-10, maxiter=200, tails=None):
+    """ Computes the Internal Rate of Return for many net cashflow series
+
+    Solves for the interest rate at which the net present worth of each
+    series is zero by bisection, advancing every series at once as array
+    operations. Unlike irr, no initial guess is needed, but the IRR must be
+    bracketed by lo and hi. Where a series has several IRRs within the
+    bracket, any one of them may be returned.
+
+    Args:
+        net_cashflows: A two-dimensional array, or sequence of arrays of
+            possibly differing lengths, of net cashflows indexed by period
+        lo: Optional; The lowest interest rate searched
+        hi: Optional; The highest interest rate searched
+        tol: Optional; The tolerance on the interest rate
+        maxiter: Optional; The maximum number of bisections
+        tails: Optional; A function of a float array of interest rates, one
+            per series, returning the present worth of each series beyond
+            its final period, such as that of perpetuities (see tail_worths)
+
+    Returns:
+        A float array of IRRs, one per series. Series whose net present
+            worth does not change sign over the bracket, or is zero at both
+            ends of it, have an IRR of NaN.
+    """
+    ncfs = stack_net_cashflows(net_cashflows)
+    ns = np.arange(ncfs.shape[1], dtype=float)
+
+    def npws(i):
+        with np.errstate(over="ignore", invalid="ignore"):
+            worths = np.sum(ncfs * (1 + i)[:, None] ** -ns, axis=1)
+            return worths if tails is None else worths + tails(i)
+
+    lo = np.full(ncfs.shape[0], float(lo))
+    hi = np.full(ncfs.shape[0], float(hi))
+    f_lo, f_hi = npws(lo), npws(hi)
+    # Series of zero worth everywhere, such as all-zero series, have no IRR
+    degenerate = (f_lo == 0) & (f_hi == 0)
+    if tails is None:
+        degenerate |= ~np.any(ncfs, axis=1)
+    bracketed = (np.sign(f_lo) * np.sign(f_hi) <= 0) & ~degenerate
+
+    bisections = 0
+    for bisections in range(1, maxiter + 1):
+        mid = (lo + hi) / 2
+        f_mid = npws(mid)
+        left = np.sign(f_mid) == np.sign(f_lo)
+        lo, f_lo = np.where(left, mid, lo), np.where(left, f_mid, f_lo)
+        hi = np.where(left, hi, mid)
+        if np.all(hi - lo < tol):
+            break
+    count("solver", "irr_batch.bisections", bisections)
+
+    return np.where(bracketed, (lo + hi) / 2, np.nan)
+
+
+def tail_worths(amounts, g, d0, n, i):
+    """ Computes the present worth of the payments of perpetuities after period n
+
+    Vectorized form of Perpetuity.tail_pv and GeoPerpetuity.tail_pv, whose
+    arguments are broadcast against each other. Tails which do not converge,
+    where i does not exceed g, are infinite in the sign of their amount.
 
-    mirr = (fv_rvnu.amount / -pv_cost.amount)**(1/nf) - 1
-    return mirr
+    Args:
+        amounts: The amount of each perpetuity
+        g: The growth rate of each perpetuity; zero for a Perpetuity
+        d0: The period preceding the first payment of each perpetuity
+        n: The final period excluded from the tails
+        i: The interest rates, expressed as decimals
+
+    Returns:
+        A float array of present worths
+    """
+    amounts, g, i = np.asarray(amounts, float), np.asarray(g, float), np.asarray(i, float)
+    m = np.maximum(n, d0)
+    with np.errstate(divide="ignore", over="ignore", invalid="ignore"):
+        worths = amounts * (1 + g) ** (m - d0) / (i - g) * (1 + i) ** -m
+    return np.where(i > g, worths, np.sign(amounts) * np.inf)
+
+
+def stack_net_cashflows(net_cashflows):
+    """ Stacks net cashflow arrays of differing lengths into a 2D array
+
+    Shorter arrays are zero-padded, as a project has no cashflows after its
+    final period.
+    """
+    if isinstance(net_cashflows, np.ndarray) and net_cashflows.ndim == 2:
+        return net_cashflows.astype(float, copy=False)
+    nf = max([len(ncfs) for ncfs in net_cashflows])
+    stacked = np.zeros((len(net_cashflows), nf))
+    for row, ncfs in enumerate(net_cashflows):
+        stacked[row, :len(ncfs)] = ncfs
+    return stacked
 
+
+def get_net_cashflows(cashflows, n):
+    """ Computes the net cashflow amount in each period from zero to n
+
+    Args:
+        cashflows: A sequence of Cashflow instances
+        n: The final period to evaluate
+
+    Returns:
+        A float NumPy array of length n + 1
+    """
+    return get_amounts(cashflows, range(int(n) + 1)).sum(axis=0)
@@ -1,3 +1,16 @@
 # __init__
 
-from .Valuators import npw, nfw, eacf, epcf, bcr, irr, mirr
+from .Valuators import (
+    npw,
+    nfw,
+    eacf,
+    epcf,
+    bcr,
+    irr,
+    mirr,
+    payback,
+    discounted_payback,
+    payback_periods,
+    irr_batch,
+    tail_worths,
+)
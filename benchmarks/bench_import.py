@@ -0,0 +1,93 @@
+""" Import-time regression benchmark
+
+Times `import PyEEA` in fresh interpreters, and checks that heavy
+dependencies (which are needed only for plotting, DataFrame export, IRR
+solving and spreadsheet output) are not imported along with the package.
+
+Usage:
+    python benchmarks/bench_import.py [--repeat N] [--budget SECONDS] [--profile]
+
+Exits with a nonzero status if the median import time exceeds the budget, or
+if a heavy dependency is imported eagerly.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from statistics import median
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Dependencies which must only be imported on use
+HEAVY_MODULES = ("pandas", "matplotlib", "scipy", "xlsxwriter", "pyarrow", "yaml", "asyncio",
+                 "numba")
+
+PROBE = f"""
+import json, sys, time
+start = time.perf_counter()
+import PyEEA
+seconds = time.perf_counter() - start
+print(json.dumps({{
+    "seconds": seconds,
+    "heavy": [m for m in {HEAVY_MODULES!r} if m in sys.modules],
+}}))
+"""
+
+
+def measure(repeat=7):
+    """ Returns the import times, in seconds, and the heavy modules imported """
+    env = dict(os.environ, PYTHONPATH=ROOT, PYTHONDONTWRITEBYTECODE="1")
+    times, heavy = [], set()
+    for _ in range(repeat):
+        result = subprocess.run(
+            [sys.executable, "-c", PROBE], env=env, cwd=ROOT,
+            capture_output=True, text=True, check=True)
+        sample = json.loads(result.stdout.strip().splitlines()[-1])
+        times.append(sample["seconds"])
+        heavy.update(sample["heavy"])
+    return times, sorted(heavy)
+
+
+def profile(top=15):
+    """ Prints the slowest modules imported with PyEEA, by cumulative time """
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import PyEEA"], env=env, cwd=ROOT,
+        capture_output=True, text=True, check=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line and "cumulative" not in line:
+            _, cumulative, module = line[len("import time:"):].split("|")
+            rows.append((int(cumulative), module.rstrip()))
+    for cumulative, module in sorted(rows, reverse=True)[:top]:
+        print(f"{cumulative / 1000:10.1f} ms  {module}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=7, help="Fresh interpreters to time")
+    parser.add_argument("--budget", type=float, default=0.5, help="Median budget, in seconds")
+    parser.add_argument("--profile", action="store_true", help="Print the slowest imports")
+    args = parser.parse_args(argv)
+
+    times, heavy = measure(args.repeat)
+    print(
+        f"import PyEEA: median {median(times) * 1000:.1f} ms, "
+        f"min {min(times) * 1000:.1f} ms over {len(times)} runs "
+        f"(budget {args.budget * 1000:.0f} ms)")
+    if args.profile:
+        profile()
+
+    failed = False
+    if heavy:
+        print(f"FAIL: imported eagerly: {', '.join(heavy)}")
+        failed = True
+    if median(times) > args.budget:
+        print("FAIL: import time exceeds the budget")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
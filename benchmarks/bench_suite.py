@@ -0,0 +1,247 @@
+""" Benchmark suite covering the hot paths of PyEEA
+
+Times valuations, taxflow generation, exports and analyses on synthetic
+projects (see synthetic.py), scaling one dimension of the project at a
+time while holding the others at their defaults, and reports a scaling
+curve per benchmark: the fastest time at each size, and the exponent of a
+power law fitted to them. Results may be saved as a baseline, and compared
+against a saved baseline to detect regressions. Everything runs offline.
+
+Usage:
+    python benchmarks/bench_suite.py [--quick] [--only NAME ...]
+        [--save [PATH]] [--compare [PATH]] [--tolerance RATIO] [--plot PATH]
+
+Exits with a nonzero status if --compare finds a regression.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.dirname(os.path.abspath(__file__))]
+
+import numpy as np  # noqa: E402
+
+import PyEEA  # noqa: E402
+from PyEEA.analysis import simulation_analysis, sensitivity_analysis  # noqa: E402
+from PyEEA.output import write_excel  # noqa: E402
+from PyEEA.utilities import get_amounts  # noqa: E402
+from synthetic import REVENUE, make_project  # noqa: E402
+
+BASELINE = os.path.join(ROOT, "benchmarks", "baselines", "baseline.json")
+
+DEFAULTS = {"cashflows": 30, "horizon": 30, "taxes": 1, "depreciations": 1}
+SIZES = {
+    "full": {
+        "cashflows": [10, 30, 100, 300],
+        "horizon": [10, 30, 100, 300, 1000],
+        "taxes": [0, 1, 2, 4],
+        "depreciations": [0, 1, 4, 16],
+    },
+    "quick": {
+        "cashflows": [10, 30, 100],
+        "horizon": [10, 100, 1000],
+        "taxes": [0, 1, 4],
+        "depreciations": [0, 1, 4],
+    },
+}
+
+
+def _taxflows(project):
+    horizon = project.get_final_period(finite=True)
+    return get_amounts(project.get_taxflows(), np.arange(horizon + 1))
+
+
+def _write_excel(project):
+    with tempfile.TemporaryDirectory() as directory:
+        write_excel(os.path.join(directory, "bench.xlsx"), [project])
+
+
+def _simulation(project):
+    return simulation_analysis(project, {REVENUE: 0.1}, iterations=20)
+
+
+def _sensitivity(project):
+    titles = [cf.get_title() for cf in project.get_cashflows()][:10]
+    return sensitivity_analysis(project, [0.8, 0.9, 1.0, 1.1, 1.2], titles)
+
+
+# Maps benchmark names to functions of a project
+BENCHMARKS = {
+    "npw": lambda project: project.npw(),
+    "irr": lambda project: project.irr(),
+    "mirr": lambda project: project.mirr(),
+    "eacf": lambda project: project.eacf(),
+    "taxflows": _taxflows,
+    "to_dataframe": lambda project: project.to_dataframe(),
+    "write_excel": _write_excel,
+    "simulation_analysis": _simulation,
+    "sensitivity_analysis": _sensitivity,
+}
+
+
+def measure(benchmark, project, repeat=5, budget=2.0, min_time=0.2):
+    """ Returns the fastest time, in seconds, of a benchmark on a project
+
+    As timeit recommends, the fastest of several runs is taken, as the
+    least affected by other processes. Fast benchmarks are run more than
+    repeat times, until their runs take min_time in total, and slow ones
+    fewer, once their runs exceed the budget. Cached period series are
+    cleared before every run, so that each run values the project from
+    scratch. An untimed run first warms up imports and compiled functions.
+    """
+    benchmark(project)
+    times = []
+    while len(times) < 1000:
+        project._touch()
+        start = time.perf_counter()
+        benchmark(project)
+        times.append(time.perf_counter() - start)
+        total = sum(times)
+        if total > budget or (len(times) >= repeat and total > min_time):
+            break
+    return min(times)
+
+
+def run(names, profile="full", repeat=5, budget=2.0, log=print):
+    """ Runs benchmarks over every size of every dimension
+
+    Returns:
+        A dict mapping benchmark names to dicts mapping dimensions to dicts
+        mapping sizes (as strings) to times in seconds
+    """
+    results = {name: dict() for name in names}
+    for dimension, sizes in SIZES[profile].items():
+        for size in sizes:
+            project = make_project(**{**DEFAULTS, dimension: size})
+            for name in names:
+                seconds = measure(BENCHMARKS[name], project, repeat, budget)
+                results[name].setdefault(dimension, dict())[str(size)] = seconds
+                log(f"  {name:<22} {dimension:<14} {size:>6}  {seconds * 1000:10.3f} ms")
+    return results
+
+
+def exponent(curve):
+    """ Fits time = c * size ** k to a scaling curve, returning k """
+    sizes = np.array([float(size) for size in curve])
+    times = np.array(list(curve.values()))
+    valid = (sizes > 0) & (times > 0)
+    if valid.sum() < 2:
+        return float("nan")
+    return float(np.polyfit(np.log(sizes[valid]), np.log(times[valid]), 1)[0])
+
+
+def report(results):
+    """ Prints the scaling curve of every benchmark """
+    for name, dimensions in results.items():
+        print(f"\n{name}")
+        for dimension, curve in dimensions.items():
+            points = "  ".join(f"{size}: {seconds * 1000:.3f}" for size, seconds in curve.items())
+            print(f"  {dimension:<14} k={exponent(curve):5.2f}  [ms] {points}")
+
+
+def compare(results, baseline, tolerance=1.3):
+    """ Prints the ratio of every time to its baseline, returning regressions
+
+    Returns:
+        A list of (name, dimension, size, ratio) whose time exceeds the
+        baseline by more than the tolerance ratio
+    """
+    regressions = []
+    print(f"\nCompared with the baseline of {baseline['meta']['date']}:")
+    if baseline["meta"]["machine"] != _meta("")["machine"]:
+        print("  (Note: the baseline was recorded on a different machine)")
+    for name, dimensions in results.items():
+        for dimension, curve in dimensions.items():
+            for size, seconds in curve.items():
+                try:
+                    before = baseline["results"][name][dimension][size]
+                except KeyError:
+                    continue
+                ratio = seconds / before if before else float("inf")
+                flag = ""
+                if ratio > tolerance:
+                    regressions.append((name, dimension, size, ratio))
+                    flag = "  REGRESSION"
+                elif ratio < 1 / tolerance:
+                    flag = "  improved"
+                print(f"  {name:<22} {dimension:<14} {size:>6}  x{ratio:6.2f}{flag}")
+    return regressions
+
+
+def plot(results, path):
+    """ Saves the scaling curves as a grid of log-log plots """
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    dimensions = list(next(iter(results.values())))
+    fig = Figure(figsize=(4 * len(dimensions), 4))
+    FigureCanvasAgg(fig)
+    for k, dimension in enumerate(dimensions):
+        ax = fig.add_subplot(1, len(dimensions), k + 1)
+        for name, curves in results.items():
+            curve = curves[dimension]
+            sizes = [float(size) for size in curve]
+            ax.plot(sizes, [seconds * 1000 for seconds in curve.values()], marker="o", label=name)
+        ax.set_xscale("symlog")
+        ax.set_yscale("log")
+        ax.set_xlabel(dimension)
+        ax.set_ylabel("Time [ms]")
+    fig.axes[0].legend(fontsize="small")
+    fig.tight_layout()
+    fig.savefig(path)
+
+
+def _meta(profile):
+    return {
+        "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "profile": profile,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pyeea": PyEEA.__version__,
+        "machine": f"{platform.system()} {platform.machine()} {platform.processor()}".strip(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--quick", action="store_true", help="Use fewer, smaller sizes")
+    parser.add_argument("--only", nargs="+", choices=BENCHMARKS, help="Benchmarks to run")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per measurement")
+    parser.add_argument("--save", nargs="?", const=BASELINE, help="Save results as a baseline")
+    parser.add_argument("--compare", nargs="?", const=BASELINE, help="Compare with a baseline")
+    parser.add_argument(
+        "--tolerance", type=float, default=1.3, help="Slowdown ratio counted as a regression")
+    parser.add_argument("--plot", help="Save the scaling curves to an image")
+    args = parser.parse_args(argv)
+
+    profile = "quick" if args.quick else "full"
+    names = args.only or list(BENCHMARKS)
+    print(f"Running {len(names)} benchmarks ({profile} profile)")
+    results = run(names, profile, args.repeat)
+    report(results)
+
+    if args.plot:
+        plot(results, args.plot)
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, "w") as f:
+            json.dump({"meta": _meta(profile), "results": results}, f, indent=1)
+        print(f"\nSaved the baseline to {args.save}")
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regressions beyond x{args.tolerance}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
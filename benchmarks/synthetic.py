@@ -0,0 +1,87 @@
+""" Synthetic projects for benchmarking
+
+Projects are generated deterministically from a seed, with a configurable
+number of cashflows, horizon, and mix of taxes and depreciations, so that
+benchmark results are comparable between runs and machines.
+"""
+import numpy as np
+
+from PyEEA import (
+    Project,
+    Present,
+    Future,
+    Annuity,
+    Gradient,
+    Geometric,
+    LearningCurve,
+)
+from PyEEA.taxation import Tax, StraightLine, SumOfYearsDigits, DecliningBalance
+
+REVENUE = "Revenue"
+COST = "Cost"
+
+
+def make_project(cashflows=30, horizon=30, taxes=1, depreciations=1, seed=0, interest=0.08):
+    """ Generates a project of finite cashflows
+
+    The first cashflow is a capital cost; the rest cycle through Annuity,
+    Gradient, Geometric, Future and LearningCurve cashflows, alternately
+    tagged as revenues and costs, with random amounts and periods within
+    the horizon. Revenues exceed costs, so the project has an IRR.
+
+    Args:
+        cashflows: Optional; The number of cashflows, excluding depreciated
+            capital
+        horizon: Optional; The final period
+        taxes: Optional; The number of taxes. The first taxes revenues with
+            a carry-forward window; the rest tax costs without one
+        depreciations: Optional; The number of depreciations, each of a
+            further capital cost, cycling through StraightLine,
+            SumOfYearsDigits and DecliningBalance
+        seed: Optional; The seed of the random amounts and periods
+        interest: Optional; The interest rate of the project
+
+    Returns:
+        A Project
+    """
+    rng = np.random.default_rng(seed)
+    project = Project(f"Synthetic {cashflows}x{horizon}", interest)
+
+    cfs = [Present(-4.0 * cashflows * horizon, "Capital", COST)]
+    for k in range(1, cashflows):
+        tag = REVENUE if k % 2 else COST
+        amount = float(rng.uniform(50, 150)) * (1 if tag == REVENUE else -0.4)
+        d0 = int(rng.integers(0, max(1, horizon // 2)))
+        d = [d0, int(rng.integers(d0 + 1, horizon + 1))]
+        kind = k % 5
+        if kind == 0:
+            cf = Annuity(amount, d, f"CF {k}", tag)
+        elif kind == 1:
+            cf = Gradient(amount, amount / 20, d, f"CF {k}", tag)
+        elif kind == 2:
+            cf = Geometric(amount, 0.02, d, f"CF {k}", tag)
+        elif kind == 3:
+            cf = Future(amount * horizon / 4, d[1], f"CF {k}", tag)
+        else:
+            cf = LearningCurve(amount, 0.9, d, None, f"CF {k}", tag)
+        cfs.append(cf)
+    project.add_cashflows(cfs)
+
+    for k in range(taxes):
+        if k == 0:
+            project.add_tax(Tax(REVENUE, 0.3, carry_forward=5))
+        else:
+            project.add_tax(Tax(COST, 0.05, f"Tax {k} on {COST}"))
+
+    kinds = (StraightLine, SumOfYearsDigits, DecliningBalance)
+    life = max(1, horizon // 2)
+    for k in range(depreciations):
+        capital = Future(-1.0 * cashflows * horizon, 0, f"Equipment {k}", COST)
+        kind = kinds[k % len(kinds)]
+        if kind is DecliningBalance:
+            dp = DecliningBalance(capital, 0.2, life, 0, title=f"Depreciation {k}", tags=REVENUE)
+        else:
+            dp = kind(capital, life, 0, f"Depreciation {k}", REVENUE)
+        project.add_depreciation(dp)
+
+    return project
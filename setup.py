@@ -12,13 +12,16 @@ setup(
   keywords = ['Engineering', 'Economic', 'Analysis', 'Finance'],
   packages = [
     'PyEEA',
+    'PyEEA.aio',
     'PyEEA.analysis',
     'PyEEA.cashflow',
     'PyEEA.output',
+    'PyEEA.portfolio',
     'PyEEA.taxation',
     'PyEEA.valuation'
   ],
   install_requires = [
+    'numpy',
     'pandas',
     'matplotlib',
     'scipy'
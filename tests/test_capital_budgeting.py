@@ -0,0 +1,27 @@
+import numpy as np
+import pytest
+
+from PyEEA.analysis import select_portfolio, portfolio_frontier
+
+
+def test_dp_without_budget_selects_nothing_costly():
+    selected, value = select_portfolio([10], [5], 0, method="dp")
+    assert not selected.any() and value == 0
+
+    selected, value = select_portfolio([10, 4, -1], [5, 0, 0], 0, method="dp")
+    assert selected.tolist() == [False, True, False] and value == 4
+
+
+@pytest.mark.parametrize("method", [None, "dp", "milp"])
+def test_frontier_without_budget_selects_nothing(method):
+    values, selections = portfolio_frontier([10, 6], [5, 3], [0], method=method)
+    assert values.tolist() == [0]
+    assert selections.shape == (1, 2) and not selections.any()
+
+
+def test_frontier_with_nonpositive_levels():
+    values, selections = portfolio_frontier(
+        [10, 6], [5, 3], [-2, 0, 3, 8], method="dp", resolution=8)
+    np.testing.assert_allclose(values, [0, 0, 6, 16])
+    assert not selections[:2].any()
+    assert selections[3].all()
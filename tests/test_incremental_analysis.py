@@ -0,0 +1,40 @@
+import pytest
+
+from PyEEA import Project, Present, Future, Annuity
+from PyEEA.analysis import incremental_analysis
+
+
+def make_project(title, amounts):
+    project = Project(title, 0.1)
+    project.add_cashflows([
+        Present(amount, f"{title} {n}") if n == 0 else Future(amount, n, f"{title} {n}")
+        for n, amount in enumerate(amounts)])
+    return project
+
+
+@pytest.mark.parametrize("criterion", ["irr", "npw", "bcr"])
+def test_identical_alternatives_tie(criterion):
+    a = make_project("A", [-1000, 300, 300, 300, 300, 300])
+    b = make_project("B", [-1000, 300, 300, 300, 300, 300])
+    preferred, comparisons = incremental_analysis(
+        [a, b], 0.1, criterion=criterion, full_output=True)
+    assert preferred is a
+    assert comparisons[-1]["tied"] and not comparisons[-1]["accepted"]
+
+
+def test_irr_agrees_with_npw_on_borrowing_increment():
+    # B - A is +50, +100, -200: a borrowing whose IRR exceeds the MARR,
+    # but whose NPW is negative
+    a = make_project("A", [-100, 200])
+    b = make_project("B", [-50, 300, -200])
+    by_irr = incremental_analysis([a, b], 0.1, criterion="irr", do_nothing=False)
+    by_npw = incremental_analysis([a, b], 0.1, criterion="npw", do_nothing=False)
+    assert by_irr is by_npw is a
+
+
+def test_irr_agrees_with_npw_on_investment_increment():
+    a = make_project("A", [-100, 120])
+    b = make_project("B", [-300, 150, 150, 150])
+    by_irr = incremental_analysis([a, b], 0.1, criterion="irr")
+    by_npw = incremental_analysis([a, b], 0.1, criterion="npw")
+    assert by_irr is by_npw is b
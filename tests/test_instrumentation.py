@@ -0,0 +1,13 @@
+import numpy as np
+
+from PyEEA import Profiler
+from PyEEA.cashflow import Cashflow, Dynamic, Future
+
+
+def test_inherited_amounts_at_is_instrumented():
+    dynamic = Dynamic(lambda self, n: Future(10 * n, n), [0, 5])
+    with Profiler() as profiler:
+        amounts = dynamic.amounts_at(np.arange(6))
+    np.testing.assert_allclose(amounts, [0, 10, 20, 30, 40, 50])
+    assert profiler.report()["categories"]["cashflow"]["Dynamic.amounts_at"]["calls"] == 1
+    assert Dynamic.amounts_at is Cashflow.amounts_at
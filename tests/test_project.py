@@ -0,0 +1,35 @@
+import copy
+import pickle
+
+from PyEEA import Project, Present, Annuity
+from PyEEA.analysis import ScalarAnalysis
+
+
+def make_incremental_project():
+    project = Project("Incremental", 0.1, incremental=True)
+    project.add_cashflows([Present(-1000, "Capital"), Annuity(300, [0, 5], "Sales")])
+    project.npw()  # Builds the running worth
+    return project
+
+
+def test_scalar_analysis_of_valued_incremental_project():
+    project = make_incremental_project()
+    analysis = ScalarAnalysis(project)
+    analysis.apply({"Sales": 2})
+
+    expected = Project("Expected", 0.1)
+    expected.add_cashflows([Present(-1000), Annuity(600, [0, 5])])
+    assert abs(analysis.valuate("npw").amount - expected.npw().amount) < 1e-9
+    assert abs(project.npw().amount - make_incremental_project().npw().amount) < 1e-9
+
+
+def test_copies_rebuild_running_worth():
+    project = make_incremental_project()
+    for duplicate in (copy.deepcopy(project), pickle.loads(pickle.dumps(project))):
+        sales = duplicate.get_cashflows("Sales")[0]
+        duplicate.scale_cashflow(sales, 0.5)
+        duplicate.remove_cashflow(sales)
+        duplicate.add_cashflow(Annuity(100, [0, 5], "Sales"))
+        rebuilt = Project("Rebuilt", 0.1)
+        rebuilt.add_cashflows(duplicate.get_cashflows())
+        assert abs(duplicate.npw().amount - rebuilt.npw().amount) < 1e-9